@@ -1,17 +1,59 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime,timedelta
-import chardet
-from src.predictores.predicciones_ML import predict_all
-from src.utils.CRUD import crear_prediccion, ver_predicciones_guardadas
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP, codificar_fila
+from src.predictores.cache_predicciones import cache, predict_all_cacheado
+from src.predictores.deduplicacion import estadisticas_dedup
+from src.predictores.escenarios import EDADES_HTS, extremos_ica, predict_grid
+from src.predictores.deriva import mostrar_alertas, panel_deriva
+from src.predictores.predicciones_ML import monitor_entradas, precalentar_modelos
+from src.predictores.registro_modelos import registro
+from src.utils.CRUD import cola_predicciones, crear_predicciones_bulk, encolar_prediccion, obtener_cliente, ver_predicciones_guardadas
+from src.utils.analitica import agregados, panel_analitica
 #from utils.formateoValoresdicy import formatear_valores
-from src.utils.sharepointUtill import append_a_excel_existente
+from src.utils.sharepointUtill import append_a_excel_existente, gestor_sharepoint
+from src.utils.lote_streaming import ErrorValidacion, RegistrosDiferidos
+from src.utils.cache_archivos import cache_archivos, predecir_archivo_cacheado
+from src.utils.formatos_columnares import FORMATOS_SALIDA
+from src.utils.trabajos_lote import COMPLETADO, ERROR, gestor_trabajos
+from src.utils.instrumentacion import metricas, panel_diagnostico
 import io
 import pytz
 # Configuración inicial de session state
 if 'predicciones' not in st.session_state:
     st.session_state.predicciones = None
 
+# Precalentamos los modelos una sola vez por proceso (en segundo plano),
+# así la primera predicción no paga el costo de carga.
+@st.cache_resource
+def precalentar():
+    return precalentar_modelos(en_segundo_plano=True)
+
+precalentar()
+
+# Los trabajos en segundo plano que quedaron a medias (p. ej. por un
+# reinicio) se reanudan desde su último punto de control.
+@st.cache_resource
+def reanudar_trabajos():
+    return gestor_trabajos.reanudar_pendientes()
+
+reanudar_trabajos()
+
+with st.sidebar.expander('⚙️ Estado de los modelos'):
+    st.dataframe(pd.DataFrame(registro.estadisticas()))
+    st.markdown("**Caché de predicciones**")
+    st.json(cache.estadisticas())
+    st.markdown("**Caché de archivos subidos**")
+    st.json(cache_archivos.estadisticas())
+    st.markdown("**Filas repetidas en los lotes**")
+    st.json(estadisticas_dedup.estadisticas())
+    st.markdown("**Cola de escritura a Supabase**")
+    st.json(cola_predicciones.estadisticas())
+    st.markdown("**Cola de agregados de analítica**")
+    st.json(agregados.estadisticas())
+    st.markdown("**Sesiones de SharePoint**")
+    st.json(gestor_sharepoint.estadisticas())
+
 # Configuración de la aplicación
 st.title('🐥 Predicción de Parámetros Avícolas')
 st.subheader('Predicciones de Mortalidad, Consumo, ICA y Peso Promedio Final')
@@ -19,14 +61,6 @@ st.subheader('Ingrese los datos para realizar las predicciones')
 
 
 
-# Mapeos
-SEXO_MAP = {'Ma': 1, 'He': 0}
-AREA_MAP = {
-    'Calidad': 1, 'I. Respiratoria': 2, 'S. esquelético': 3,
-    'I. Intestinal': 4, 'Coccidia': 5, 'C. tóxico': 6,
-    'C. metabólico': 7, 'S. Inmunitario': 8
-}
-
 # Entrada de datos manuales
 nombre_user = st.text_input('👤 Nombre del usuario')
 cargo_user = st.text_input('💼 Cargo del usuario')
@@ -41,25 +75,16 @@ with col2:
     edadHTs = st.selectbox('🗖️ Edad al sacrificio(HTS) (días)', [14, 21, 28, 35])
     edadventa = st.number_input('📦 Edad de venta(Granja) (días)', min_value=0, max_value=5000, value=1000)
 
-# Transformación de datos
-datos_prediccion = {
-    'areaAn': AREA_MAP.get(areaAn),
-    'sexo': SEXO_MAP.get(sexo),
-    'edadHTs': edadHTs,
-    'edadventa': edadventa
-}
-
-input_data = [[
-    datos_prediccion['areaAn'],
-    datos_prediccion['sexo'],
-    datos_prediccion['edadHTs'],
-    datos_prediccion['edadventa']
-]]
+# Transformación de datos (mismo codificador que la carga de archivos)
+input_data = codificar_fila(areaAn, sexo, edadHTs, edadventa)
 
 # Botón para realizar todas las predicciones
 if st.button('🔮 Realizar todas las predicciones'):
-    st.session_state.predicciones = predict_all(input_data)
+    # Las combinaciones repetidas se responden desde la caché compartida.
+    with metricas.medir('prediccion_formulario', filas=1):
+        st.session_state.predicciones = predict_all_cacheado(input_data)
     st.success("✅ Predicciones realizadas correctamente!")
+    mostrar_alertas(monitor_entradas)
 
 # Mostrar resultados si existen
 if st.session_state.predicciones is not None:
@@ -110,8 +135,9 @@ if st.session_state.predicciones is not None:
     if st.button("📂 Guardar predicciones"):
         if opcion_guardado == "Supabase":
             try:
-                crear_prediccion(datos_ingresados)
-                st.success("✅ Predicciones guardadas correctamente en Supabase.")
+                # Se guarda en segundo plano (por lotes y con reintentos).
+                encolar_prediccion(datos_ingresados)
+                st.success("✅ Predicción en cola: se guardará en Supabase en segundo plano.")
             except Exception as e:
                 st.error(f"❌ Error al guardar en Supabase: {str(e)}")
         elif opcion_guardado == "SharePoint":
@@ -136,114 +162,232 @@ if st.session_state.predicciones is not None:
             except Exception as e:
                 st.error(f"❌ Error inesperado: {str(e)}")
 
+    # El guardado es asíncrono: las filas que agotaron sus reintentos se informan aquí.
+    estado_cola = cola_predicciones.estadisticas()
+    if estado_cola['fallidas']:
+        st.error(f"❌ {estado_cola['fallidas']} predicción(es) no se pudieron guardar en Supabase: "
+                 f"{estado_cola['ultimo_error']}")
+        if st.button("🔁 Reintentar guardado", key='reintentar_fallidas'):
+            st.info(f"{cola_predicciones.reintentar_fallidas()} predicción(es) en cola de nuevo.")
+
+    # El historial queda abierto entre reruns para poder paginar y filtrar.
     if st.button('🔍 Verificar predicciones'):
+        st.session_state.ver_historial = True
+    if st.session_state.get('ver_historial'):
         ver_predicciones_guardadas()
 else:
     st.info('Ingrese los datos y haga clic en "Realizar todas las predicciones"')
 
+# ============================
+# Escenarios (qué pasa si)
+# ============================
+
+st.markdown("---")
+st.header("📈 Escenarios: curvas por edad")
+st.caption(f"Predice de una vez todas las combinaciones de edad HTS y edad de granja para el área **{areaAn}** y el sexo **{sexo}** elegidos arriba.")
+
+col_esc1, col_esc2 = st.columns(2)
+with col_esc1:
+    rango_venta = st.slider('📦 Rango de edad de venta (Granja) (días)', 0, 5000, (30, 60))
+    paso_venta = st.number_input('Paso (días)', min_value=1, max_value=500, value=1)
+with col_esc2:
+    edades_hts_grilla = st.multiselect('🗖️ Edades HTS (días)', list(EDADES_HTS), default=list(EDADES_HTS))
+
+if st.button('📈 Calcular curvas'):
+    try:
+        with metricas.medir('predict_grid'):
+            curvas = predict_grid(areaAn, sexo, range(rango_venta[0], rango_venta[1] + 1, paso_venta), edades_hts_grilla)
+        st.session_state.escenarios = curvas
+    except ValueError as e:
+        st.error(f"❌ {e}")
+
+curvas = st.session_state.get('escenarios')
+if curvas is not None and not curvas.empty:
+    st.success(f"✅ {len(curvas):,} escenarios calculados en una sola llamada ({curvas['Area'].iloc[0]}, {curvas['Sexo'].iloc[0]}).")
+    nombres = {'prePorcMort': 'Mortalidad (%)', 'prePorcCon': 'Consumo', 'preICA': 'ICA', 'prePeProFin': 'Peso final'}
+    for pestana, (columna, titulo) in zip(st.tabs(list(nombres.values())), nombres.items()):
+        with pestana:
+            st.line_chart(curvas.pivot(index='Edad Granja', columns='Edad HTS', values=columna), y_label=titulo)
+    st.markdown("**Menor y mayor ICA por edad HTS**")
+    st.dataframe(extremos_ica(curvas), hide_index=True)
+    st.download_button(
+        label="📥 Descargar escenarios como CSV",
+        data=curvas.to_csv(index=False).encode('utf-8'),
+        file_name=f"escenarios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime='text/csv'
+    )
+
 # ============================
 # Predicción desde archivo
 # ============================
 
 st.markdown("---")
 st.header("Predicción desde Archivo")
-st.subheader("Sube un archivo `.csv` o `.xlsx` para predicciones en lote")
+st.subheader("Sube un archivo `.csv`, `.xlsx`, `.parquet` o `.arrow` para predicciones en lote")
 
 st.markdown("El archivo debe contener las siguientes columnas obligatorias:")
 st.code("Sexo, Area, Edad HTS, Edad Granja")
 
-archivo = st.file_uploader("Selecciona tu archivo", type=["csv", "xlsx", "xlsm"])
+archivo = st.file_uploader("Selecciona tu archivo", type=["csv", "xlsx", "xlsm", "parquet", "pq", "arrow", "feather", "ipc"])
+formato_salida = st.selectbox(
+    "Formato de descarga", list(FORMATOS_SALIDA),
+    help="Parquet y Arrow guardan las predicciones en float32 y las columnas de texto como diccionarios."
+)
+destino_lote = st.radio("💾 Guardar también los resultados en:", ["No guardar", "Supabase", "SharePoint"], horizontal=True)
+if destino_lote == "SharePoint":
+    # Mismo libro que el guardado de una fila; cada bloque del archivo sube como una parte.
+    sp_lote = {
+        'site_url': st.text_input("URL del sitio (ej. https://empresa.sharepoint.com/sites/tu-sitio)", key='lote_sp_sitio'),
+        'carpeta_relativa': st.text_input("Ruta relativa de carpeta (ej. /sites/tu-sitio/Shared Documents)", key='lote_sp_carpeta'),
+        'username': st.text_input("Correo SharePoint", placeholder="ej. jose@empresa.com", key='lote_sp_usuario'),
+        'password': st.text_input("Contraseña", type="password", key='lote_sp_clave'),
+    }
+    if not all(sp_lote.values()):
+        st.warning("Complete las credenciales de SharePoint para guardar los resultados.")
+        destino_lote = "No guardar"
+guardar_lote = destino_lote != "No guardar"
+en_segundo_plano = st.checkbox("⏳ Procesar en segundo plano (archivos grandes: el avance no se pierde si la página se recarga)")
+
+
+def panel_trabajo(id_trabajo):
+    """Muestra el avance de un trabajo en segundo plano, consultándolo cada 2 s mientras corre."""
+    corriendo = gestor_trabajos.estado(id_trabajo)['estado'] not in (COMPLETADO, ERROR)
+
+    @st.fragment(run_every=2 if corriendo else None)
+    def _panel():
+        estado = gestor_trabajos.estado(id_trabajo)
+        if estado['estado'] == ERROR:
+            st.error(f"❌ Error: {estado['error']}")
+            if estado['detalle']:
+                st.info(estado['detalle'])
+        elif estado['estado'] != COMPLETADO:
+            st.progress(estado['fraccion'], text=f"Trabajo {id_trabajo}: {estado['filas_leidas']:,} filas procesadas "
+                                                 f"({estado['bloques_completados']} bloques guardados)")
+        elif corriendo:
+            # Terminó mientras se consultaba: se vuelve a dibujar la página para dejar de consultar.
+            st.rerun()
+        else:
+            st.success(f"✅ Trabajo {id_trabajo} completado: {estado['filas_leidas']:,} filas procesadas, "
+                       f"{estado['filas_escritas']:,} en el resultado.")
+            st.dataframe(gestor_trabajos.vista_previa(id_trabajo))
+            extension, mime = FORMATOS_SALIDA[formato_salida]
+            with open(gestor_trabajos.ruta_resultado(id_trabajo, formato_salida), 'rb') as resultado:
+                st.download_button(
+                    label=f"📥 Descargar resultados como {formato_salida.upper()}",
+                    data=resultado.read(),
+                    file_name=f"predicciones_{id_trabajo}{extension}",
+                    mime=mime
+                )
+    _panel()
+
 
-if archivo is not None:
+if archivo is not None and en_segundo_plano:
+    if guardar_lote:
+        st.info(f"El guardado en {destino_lote} solo está disponible en el procesamiento normal.")
+    # El id depende del contenido y del usuario: tras una recarga, volver a
+    # subir el mismo archivo retoma el mismo trabajo en vez de empezar otro.
+    panel_trabajo(gestor_trabajos.enviar(archivo, archivo.name, nombre_user, cargo_user, formato_salida))
+elif archivo is not None:
     try:
-        # --- PASO 1: LEER EL ARCHIVO DE FORMA SEGURA ---
-        if archivo.name.endswith('.csv'):
-            # Detección de codificación para evitar errores con caracteres especiales
-            raw_data = archivo.read()
-            resultado_encoding = chardet.detect(raw_data)
-            encoding_detectado = resultado_encoding['encoding'] or 'latin1'
-            archivo.seek(0) # Volver al inicio del archivo para que pandas pueda leerlo
-            df_subido = pd.read_csv(archivo, encoding=encoding_detectado)
-        else:
-            df_subido = pd.read_excel(archivo)
+        # Cada archivo se guarda una sola vez aunque Streamlit vuelva a ejecutar el script.
+        # Los registros se insertan después de validar el archivo completo (ver `RegistrosDiferidos`).
+        registros_lote = None
+        clave_guardado = (archivo.file_id, destino_lote)
+        if guardar_lote and st.session_state.get('lote_guardado') != clave_guardado:
+            fecha_lote = (datetime.now(pytz.utc) - timedelta(hours=5)).strftime('%Y-%m-%d %H:%M')
+            registros_lote = RegistrosDiferidos(fecha_lote)
+
+        # --- PASO 1: LEER, VALIDAR Y PREDECIR POR BLOQUES ---
+        # El archivo se procesa en streaming: la codificación se detecta con
+        # una muestra y cada bloque se valida, se mapea, se predice y se
+        # escribe al CSV de salida (en un temporal en disco) antes de leer el
+        # siguiente. Así la memoria no crece con el tamaño del archivo.
+        # El resultado queda en caché (por contenido del archivo y versión de
+        # los modelos): los reruns siguientes y la descarga no recalculan.
+        barra_progreso = st.progress(0.0, text="Procesando archivo...")
+        salida_csv, resumen, desde_cache = predecir_archivo_cacheado(
+            archivo, archivo.name,
+            nombre_user=nombre_user, cargo_user=cargo_user,
+            progreso=lambda fraccion, texto: barra_progreso.progress(fraccion, text=texto),
+            al_procesar_bloque=registros_lote, formato=formato_salida,
+        )
+        # st.download_button no acepta el temporal en disco (io.BufferedRandom):
+        # se le pasan los bytes y el temporal se cierra aquí.
+        with salida_csv:
+            datos_descarga = salida_csv.read()
+        if desde_cache:
+            barra_progreso.empty()
+            st.caption("⚡ Resultados recuperados de la caché (mismo archivo y misma versión de los modelos).")
+        if registros_lote is not None:
+            # Si un intento anterior con este archivo se cortó a mitad de la
+            # inserción, se sigue desde el primer bloque que no se insertó.
+            archivo_previo, insertados = st.session_state.get('lote_bloques_insertados', (None, 0))
+            if archivo_previo != clave_guardado:
+                insertados = 0
+            try:
+                for i, registros in enumerate(registros_lote.leer()):
+                    if i < insertados:
+                        continue
+                    if destino_lote == "Supabase":
+                        crear_predicciones_bulk(registros)
+                    else:
+                        # Cada bloque sube como una parte; el gestor las consolida en el libro.
+                        exito, mensaje = append_a_excel_existente(
+                            nombre_archivo_destino="predicciones.xlsx", df_nuevo=registros, **sp_lote
+                        )
+                        if not exito:
+                            raise RuntimeError(f"No se pudo guardar en SharePoint: {mensaje}")
+                    st.session_state.lote_bloques_insertados = (clave_guardado, i + 1)
+            finally:
+                registros_lote.cerrar()
+            st.session_state.lote_guardado = clave_guardado
+            st.success(f"✅ {resumen['filas_escritas']:,} predicciones guardadas en {destino_lote}.")
 
         st.markdown("#### ✅ Archivo cargado correctamente. Vista previa de los datos:")
-        st.dataframe(df_subido.head())
-
-        # --- PASO 2: VALIDAR Y LIMPIAR EL DATAFRAME ---
-        # Normalizar nombres de columnas (eliminar espacios extra)
-        df_subido.columns = df_subido.columns.str.strip()
-        
-        # Verificar que todas las columnas necesarias existan
-        columnas_necesarias = ['Sexo', 'Area', 'Edad HTS', 'Edad Granja']
-        columnas_faltantes = [col for col in columnas_necesarias if col not in df_subido.columns]
-
-        if columnas_faltantes:
-            st.error(f"❌ Error: Faltan las siguientes columnas en el archivo: **{', '.join(columnas_faltantes)}**")
-        else:
-            # Crear una copia para no alterar el dataframe original que se muestra
-            df_procesado = df_subido.copy()
-
-            # Limpiar los datos de las columnas de texto ANTES de mapear
-            df_procesado['Sexo'] = df_procesado['Sexo'].astype(str).str.strip()
-            df_procesado['Area'] = df_procesado['Area'].astype(str).str.strip()
-
-            # --- PASO 3: APLICAR EL MAPEO ---
-            df_procesado['sexo_num'] = df_procesado['Sexo'].map(SEXO_MAP)
-            df_procesado['area_num'] = df_procesado['Area'].map(AREA_MAP)
-
-            # --- PASO 4: VALIDACIÓN DETALLADA POST-MAPEO ---
-            error_encontrado = False
-            # Verificar si hay valores nulos en 'sexo_num' (significa que un valor no se pudo mapear)
-            if df_procesado['sexo_num'].isnull().any():
-                st.error(f"❌ Error en la columna 'Sexo'. Se encontraron valores no reconocidos.")
-                st.info(f"Valores válidos para 'Sexo': **{list(SEXO_MAP.keys())}**. Revisa tu archivo.")
-                error_encontrado = True
-            
-            # Verificar si hay valores nulos en 'area_num'
-            if df_procesado['area_num'].isnull().any():
-                st.error(f"❌ Error en la columna 'Area'. Se encontraron valores no reconocidos.")
-                st.info(f"Valores válidos para 'Area': **{list(AREA_MAP.keys())}**. Revisa tu archivo.")
-                error_encontrado = True
-
-            # --- PASO 5: REALIZAR PREDICCIONES SI NO HAY ERRORES ---
-            if not error_encontrado:
-                st.success("✅ Datos validados. Realizando predicciones...")
-
-                input_batch = df_procesado[['area_num', 'sexo_num', 'Edad HTS', 'Edad Granja']].values.tolist()
-                
-                # 1. Llamar a la función predict_all, que devuelve un DataFrame
-                resultados_df = predict_all(input_batch)
-
-                # 2. YA NO SE USA formatear_valores
-
-                # 3. Crear el DataFrame final
-                df_resultado = df_subido[columnas_necesarias].copy()
-                df_resultado['Nombre Usuario'] = nombre_user if nombre_user else "No especificado"
-                df_resultado['Cargo Usuario'] = cargo_user if cargo_user else "No especificado"
-                
-                
-                # 4. Asignar las columnas directamente desde el DataFrame de resultados
-                df_resultado['Galpon'] = df_subido['Galpon']
-                df_resultado['prePorcMort'] = resultados_df['prePorcMort']
-                df_resultado['prePorcCon'] = resultados_df['prePorcCon']
-                df_resultado['preICA'] = resultados_df['preICA']
-                df_resultado['prePeProFin'] = resultados_df['prePeProFin']
-
-                # 5. Eliminando columnas innecesarias
-                df_resultado = df_resultado.drop(columns=['Area', 'Sexo','Edad Granja'])
-                # 6. valores unicos de galponb
-                df_resultado_unico = df_resultado.drop_duplicates(subset=['Galpon'], keep='first')
-                st.markdown("---")
-                st.subheader("📈 Resultados de la Predicción")
-                st.dataframe(df_resultado_unico)
-
-                csv = df_resultado_unico.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="📥 Descargar resultados como CSV",
-                    data=csv,
-                    file_name=f"predicciones_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime='text/csv'
-                )
+        st.dataframe(resumen['entrada_previa'])
+        st.success(f"✅ Datos validados. Se predijeron {resumen['filas_leidas']:,} filas.")
+        if resumen['filas_leidas']:
+            st.caption(
+                f"Los modelos evaluaron {resumen['filas_unicas']:,} combinaciones distintas "
+                f"({1 - resumen['filas_unicas'] / resumen['filas_leidas']:.0%} de las filas eran repetidas)."
+            )
+
+        # --- PASO 2: MOSTRAR Y DESCARGAR RESULTADOS ---
+        st.markdown("---")
+        st.subheader("📈 Resultados de la Predicción")
+        if resumen['filas_escritas'] > len(resumen['vista_previa']):
+            st.caption(f"Mostrando las primeras {len(resumen['vista_previa']):,} de {resumen['filas_escritas']:,} filas.")
+        st.dataframe(resumen['vista_previa'])
+        # Entradas lejos de las de entrenamiento (recientes, no solo este archivo).
+        mostrar_alertas(monitor_entradas)
+
+        extension, mime = FORMATOS_SALIDA[formato_salida]
+        st.download_button(
+            label=f"📥 Descargar resultados como {formato_salida.upper()}",
+            data=datos_descarga,
+            file_name=f"predicciones_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+            mime=mime
+        )
+    except ErrorValidacion as e:
+        st.error(f"❌ Error: {e}")
+        if e.detalle:
+            st.info(e.detalle)
     except Exception as e:
-        st.error(f"❌ Ocurrió un error inesperado al procesar el archivo: {e}")
\ No newline at end of file
+        st.error(f"❌ Ocurrió un error inesperado al procesar el archivo: {e}")
+
+# ============================
+# Analítica (solo agregados)
+# ============================
+
+st.markdown("---")
+# Media y percentiles por área, sexo y mes desde la tabla de agregados:
+# no se leen las predicciones guardadas. Queda abierta entre reruns.
+if st.button('📊 Ver analítica de predicciones'):
+    st.session_state.ver_analitica = True
+if st.session_state.get('ver_analitica'):
+    panel_analitica(obtener_cliente())
+
+# Tiempos, filas y memoria por etapa, acumulados en el proceso (con INSTRUMENTACION=1).
+panel_diagnostico(st.sidebar)
+# Deriva de las entradas respecto de los datos de entrenamiento.
+panel_deriva(st.sidebar, monitor_entradas)
@@ -1,68 +1,67 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
-import tensorflow as tf
-from tensorflow.keras.models import load_model
+import tempfile
+from datetime import datetime
+from src.predictores.deriva import mostrar_alertas, panel_deriva
+from src.predictores.predicciones_DL import (
+    FEATURES, MOTOR_DL, TARGETS, monitor_entradas, obtener_modelo_keras, predecir_dl, version_mlp
+)
+from src.predictores.registro_modelos import registro
+from src.utils.formatos_columnares import FORMATOS_SALIDA
+from src.utils.lote_dl import predecir_archivo_dl_en_bloques
+from src.utils.lote_streaming import ErrorValidacion
+from src.utils.instrumentacion import metricas, panel_diagnostico
 
 # ====================================================================
-# CONFIGURACIÓN Y CARGA DE RECURSOS (USANDO CACHING DE STREAMLIT)
+# CONFIGURACIÓN Y CARGA DE RECURSOS (REGISTRO DE MODELOS COMPARTIDO)
 # ====================================================================
 
-# Títulos de las variables de entrada y salida
-FEATURES = [
-    'PorcMortSem4','PorcMortSem5', 'PorcMortSem6','PesoSem4', 'PesoSem5', 'Pob Inicial',
-    'Edad HTS', 'Edad Granja', 'Area'
-]
+# FEATURES, TARGETS y los artefactos (modelo, escaladores y encoder) se
+# definen y registran en `src/predictores/predicciones_DL.py`: se cargan la
+# primera vez que se piden, se comparten entre sesiones y se recargan solos
+# si el archivo cambia en disco. Con PREDICCION_MOTOR_DL=numpy la red se
+# evalúa con NumPy y TensorFlow no se importa.
 
-TARGETS = ['Peso Prom. Final', 'Porc Consumo', 'ICA', 'Por_Mort._Final']
-
-# @st.cache_resource asegura que el modelo y los escaladores se carguen solo una vez
-@st.cache_resource
 def load_resources():
-    """Carga el modelo y los escaladores para evitar recargas constantes."""
+    """Comprueba que el modelo esté disponible y obtiene el encoder de 'Area'."""
     try:
-        model = load_model("modelosPkl/modelo_9vars_multisalida.keras")
-        X_scaler = joblib.load("modelosPkl/X_scaler_9vars.pkl")
-        y_scaler = joblib.load("modelosPkl/y_scaler_4targets.pkl")
+        if MOTOR_DL == 'numpy':
+            # Exporta la red si hace falta y la deja abierta para el primer clic.
+            predecir_dl(np.zeros((1, len(FEATURES))), monitorear=False)
+        else:
+            obtener_modelo_keras()
         
         le_area = None
         area_options = None
         try:
-            le_area = joblib.load("modelosPkl/label_encoder_tipo_area.pkl")
+            le_area = registro.obtener('le_area')
             area_options = le_area.classes_
         except FileNotFoundError:
             # Si el encoder no existe, Area se maneja como numérica si el usuario la ingresa.
             pass
             
-        return model, X_scaler, y_scaler, le_area, area_options
+        return True, le_area, area_options
     except FileNotFoundError as e:
         st.error(f"Error: No se encontró el archivo necesario para el despliegue: {e}. Asegúrese de que todos los archivos (.keras, .pkl) están presentes.")
-        return None, None, None, None, None
+        return False, None, None
 
 # Cargar todos los recursos al inicio
-model, X_scaler, y_scaler, le_area, AREA_OPTIONS = load_resources()
+recursos_ok, le_area, AREA_OPTIONS = load_resources()
 
 # ====================================================================
 # FUNCIÓN DE PREDICCIÓN (DEBE SER MUY EFICIENTE)
 # ====================================================================
 
 def predict(input_data_dict):
-    """Procesa los datos de entrada, escala, predice e invierte la escala."""
-    
-    # 1. Convertir a DataFrame en el orden correcto
-    df_input = pd.DataFrame([input_data_dict], columns=FEATURES)
-    
-    # 2. ESCALAR la entrada (X)
-    X_input_scaled = X_scaler.transform(df_input)
-    
-    # 3. PREDICCIÓN
-    y_pred_scaled = model.predict(X_input_scaled, verbose=0)
+    """Ordena los datos de entrada según FEATURES y predice los 4 objetivos."""
     
-    # 4. INVERTIR la predicción (Y) a la escala original
-    y_pred_original = y_scaler.inverse_transform(y_pred_scaled)[0]
+    # 1. Armar la fila en el orden correcto (sin pasar por un DataFrame)
+    X_input = np.array([[input_data_dict[feature] for feature in FEATURES]], dtype=np.float64)
     
-    return y_pred_original
+    # 2. PREDICCIÓN en la escala original (el motor se encarga del escalado)
+    with metricas.medir('prediccion_formulario_dl', filas=1):
+        return predecir_dl(X_input)[0]
 
 # ====================================================================
 # INTERFAZ STREAMLIT
@@ -76,7 +75,7 @@ st.markdown("---")
 st.markdown("Utilice el formulario a continuación para ingresar los parámetros de **9 variables de entrada** y obtener la predicción de **4 variables de rendimiento** mediante un modelo MLP optimizado.")
 
 
-if model is None:
+if not recursos_ok:
     st.stop() # Detiene la ejecución si los archivos no se cargaron correctamente
 
 # 1. Crear el formulario principal
@@ -127,6 +126,7 @@ if submitted:
         predictions = predict(input_values)
         
         st.success("✅ Predicción Completada")
+        mostrar_alertas(monitor_entradas)
         
         st.header("Resultados de la Predicción")
         
@@ -151,3 +151,78 @@ if submitted:
         st.table(results_df.set_index('Variable'))
         
         st.balloons() # Pequeña celebración visual para el usuario
+
+# ====================================================================
+# PREDICCIÓN DESDE ARCHIVO (LOTES)
+# ====================================================================
+
+st.markdown("---")
+st.header("Predicción desde Archivo")
+st.markdown("El archivo (`.csv`, `.xlsx`, `.parquet` o `.arrow`) debe contener las siguientes columnas obligatorias:")
+st.code(", ".join(FEATURES))
+
+archivo = st.file_uploader("Selecciona tu archivo", type=["csv", "xlsx", "xlsm", "parquet", "pq", "arrow", "feather", "ipc"])
+formato_salida = st.selectbox(
+    "Formato de descarga", list(FORMATOS_SALIDA),
+    help="Parquet y Arrow guardan las predicciones en float32 y las columnas de texto como diccionarios."
+)
+
+# El resultado del último archivo queda en la sesión (archivo temporal en
+# disco + resumen), con clave archivo/formato/versión de la red: los reruns
+# por cualquier otro widget no vuelven a predecir el archivo completo.
+lote_previo = st.session_state.get('lote_dl')
+clave_lote = (archivo.file_id, formato_salida, version_mlp()) if archivo is not None else None
+if lote_previo is not None and lote_previo[0] != clave_lote:
+    lote_previo[1].close()
+    del st.session_state['lote_dl']
+
+if archivo is not None:
+    try:
+        if 'lote_dl' not in st.session_state:
+            # El archivo se procesa por bloques: 'Area' se codifica para toda la
+            # columna de una vez y la red se evalúa sobre cada bloque completo.
+            # Los resultados van a un archivo temporal en disco.
+            barra_progreso = st.progress(0.0, text="Procesando archivo...")
+            salida = tempfile.TemporaryFile()
+            try:
+                resumen = predecir_archivo_dl_en_bloques(
+                    archivo, archivo.name, salida, le_area=le_area,
+                    progreso=lambda fraccion, texto: barra_progreso.progress(fraccion, text=texto),
+                    formato=formato_salida,
+                )
+            except BaseException:
+                salida.close()
+                raise
+            st.session_state.lote_dl = (clave_lote, salida, resumen)
+        _, salida, resumen = st.session_state.lote_dl
+
+        st.success(f"✅ Se predijeron {resumen['filas']:,} filas en {resumen['segundos']:.2f} s.")
+        columnas_metricas = st.columns(2)
+        columnas_metricas[0].metric("Filas/segundo (total)", f"{resumen['filas_por_segundo']:,.0f}")
+        columnas_metricas[1].metric("Filas/segundo (modelo)", f"{resumen['filas_por_segundo_modelo']:,.0f}")
+
+        if resumen['filas'] > len(resumen['vista_previa']):
+            st.caption(f"Mostrando las primeras {len(resumen['vista_previa']):,} de {resumen['filas']:,} filas.")
+        st.dataframe(resumen['vista_previa'])
+        mostrar_alertas(monitor_entradas)
+
+        # st.download_button no acepta el temporal (io.BufferedRandom): se le pasan los bytes.
+        salida.seek(0)
+        extension, mime = FORMATOS_SALIDA[formato_salida]
+        st.download_button(
+            label=f"📥 Descargar resultados como {formato_salida.upper()}",
+            data=salida.read(),
+            file_name=f"predicciones_mlp_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+            mime=mime
+        )
+    except ErrorValidacion as e:
+        st.error(f"❌ Error: {e}")
+        if e.detalle:
+            st.info(e.detalle)
+    except Exception as e:
+        st.error(f"❌ Ocurrió un error inesperado al procesar el archivo: {e}")
+
+# Tiempos, filas y memoria por etapa, acumulados en el proceso (con INSTRUMENTACION=1).
+panel_diagnostico(st.sidebar)
+# Deriva de las entradas respecto de los datos de entrenamiento.
+panel_deriva(st.sidebar, monitor_entradas)
@@ -0,0 +1,70 @@
+# benchmarks/bench_codificacion.py
+#
+# Compara la codificación original de app.py (astype(str).str.strip().map,
+# isnull por columna y .values.tolist() -> np.array) contra `codificar_lote`.
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.bench_codificacion
+#   python -m benchmarks.bench_codificacion --filas 1000000 --repeticiones 3
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP, codificar_lote
+
+
+def generar_archivo(n, semilla=0):
+    """DataFrame sintético con el formato de un archivo subido (texto con espacios incluidos)."""
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'Sexo': rng.choice([' Ma', 'He ', 'Ma', 'He'], n),
+        'Area': rng.choice(list(AREA_MAP), n),
+        'Edad HTS': rng.choice([14, 21, 28, 35], n),
+        'Edad Granja': rng.integers(30, 50, n),
+        'Galpon': rng.integers(0, n, n),
+    })
+
+
+def codificar_original(df):
+    """Réplica del camino original de app.py."""
+    df_procesado = df.copy()
+    df_procesado['Sexo'] = df_procesado['Sexo'].astype(str).str.strip()
+    df_procesado['Area'] = df_procesado['Area'].astype(str).str.strip()
+    df_procesado['sexo_num'] = df_procesado['Sexo'].map(SEXO_MAP)
+    df_procesado['area_num'] = df_procesado['Area'].map(AREA_MAP)
+    df_procesado['sexo_num'].isnull().any()
+    df_procesado['area_num'].isnull().any()
+    input_batch = df_procesado[['area_num', 'sexo_num', 'Edad HTS', 'Edad Granja']].values.tolist()
+    return np.array(input_batch)
+
+
+def medir(funcion, df, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(df)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la codificación de variables categóricas')
+    parser.add_argument('--filas', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} | {'original (s)':>12} | {'vectorizado (s)':>15} | {'aceleración':>11}")
+    print('-' * 60)
+    for n in args.filas:
+        df = generar_archivo(n)
+        assert np.array_equal(codificar_original(df), codificar_lote(df)[0])
+        t_original = medir(codificar_original, df, args.repeticiones)
+        t_vectorizado = medir(lambda d: codificar_lote(d), df, args.repeticiones)
+        print(f'{n:>10} | {t_original:>12.4f} | {t_vectorizado:>15.4f} | {t_original / t_vectorizado:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_motor_fusionado.py
+#
+# Compara filas/segundo del camino actual (4 llamadas a XGBRegressor.predict)
+# contra el motor fusionado para distintos tamaños de lote.
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.bench_motor_fusionado
+#   python -m benchmarks.bench_motor_fusionado --tamanos 1 1000 1000000 --repeticiones 5
+
+import argparse
+import time
+
+import numpy as np
+
+from src.predictores.predicciones_ML import _predecir_modelos
+
+TAMANOS_POR_DEFECTO = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def generar_lote(n, semilla=0):
+    """Genera un lote sintético dentro del dominio de la app."""
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.integers(1, 9, n),
+        rng.integers(0, 2, n),
+        rng.choice([14, 21, 28, 35], n),
+        rng.integers(0, 5001, n),
+    ])
+
+
+def medir(motor, lote, repeticiones):
+    """Devuelve el mejor tiempo (en segundos) de varias repeticiones."""
+    _predecir_modelos(lote[:1], motor)  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        _predecir_modelos(lote, motor)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del motor fusionado vs. XGBRegressor.predict')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS_POR_DEFECTO)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} | {'sklearn (filas/s)':>18} | {'fusionado (filas/s)':>20} | {'aceleración':>11}")
+    print('-' * 70)
+    for n in args.tamanos:
+        lote = generar_lote(n)
+        # Los lotes grandes se miden una sola vez para no eternizar la corrida.
+        repeticiones = args.repeticiones if n <= 100_000 else 1
+        t_sklearn = medir('sklearn', lote, repeticiones)
+        t_fusionado = medir('fusionado', lote, repeticiones)
+        print(f'{n:>10} | {n / t_sklearn:>18,.0f} | {n / t_fusionado:>20,.0f} | {t_sklearn / t_fusionado:>10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/carga_servicio.py
+#
+# Prueba de carga del servicio HTTP de predicciones (servicio.py).
+# Varios hilos mandan peticiones de una fila durante un tiempo fijo y se
+# informa el rendimiento, las latencias vistas por el cliente y las métricas
+# del servidor (tamaño promedio de los microlotes, rechazos, vencidas).
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.carga_servicio --iniciar --concurrencia 32 --duracion 10
+#   python -m benchmarks.carga_servicio --url http://127.0.0.1:8000 --ruta /predecir_dl
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP
+
+EDADES_HTS = [14, 21, 28, 35]
+
+
+def registro_ml(rng):
+    return {
+        'Area': rng.choice(list(AREA_MAP)),
+        'Sexo': rng.choice(list(SEXO_MAP)),
+        'Edad HTS': int(rng.choice(EDADES_HTS)),
+        'Edad Granja': int(rng.integers(0, 5001)),
+    }
+
+
+def registro_dl(rng):
+    from src.predictores.predicciones_DL import FEATURES, obtener_escaladores, obtener_le_area
+
+    X_scaler, _ = obtener_escaladores()
+    valores = rng.normal(X_scaler.mean_, X_scaler.scale_)
+    registro = dict(zip(FEATURES, map(float, valores)))
+    registro['Area'] = str(rng.choice(obtener_le_area().classes_))
+    return registro
+
+
+def cliente(url, ruta, generar, duracion, semilla, latencias, codigos, lock):
+    rng = np.random.default_rng(semilla)
+    destino = urlparse(url)
+    conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+    fin = time.perf_counter() + duracion
+    propias, codigos_propios = [], {}
+    while time.perf_counter() < fin:
+        cuerpo = json.dumps({'registros': [generar(rng)]})
+        inicio = time.perf_counter()
+        try:
+            conexion.request('POST', ruta, cuerpo, {'Content-Type': 'application/json'})
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            estado = respuesta.status
+        except (ConnectionError, http.client.HTTPException, TimeoutError):
+            conexion.close()
+            estado = 'error_conexion'
+        propias.append(time.perf_counter() - inicio)
+        codigos_propios[estado] = codigos_propios.get(estado, 0) + 1
+    conexion.close()
+    with lock:
+        latencias.extend(propias)
+        for codigo, n in codigos_propios.items():
+            codigos[codigo] = codigos.get(codigo, 0) + n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga del servicio de predicciones.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--ruta', default='/predecir', choices=['/predecir', '/predecir_dl'])
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--duracion', type=float, default=10.0, help='Segundos de carga.')
+    parser.add_argument('--iniciar', action='store_true',
+                        help='Levanta el servicio en este proceso (en un puerto libre).')
+    parser.add_argument('--ventana-ms', type=float, default=None, help='Solo con --iniciar.')
+    args = parser.parse_args()
+
+    servidor = None
+    if args.iniciar:
+        from servicio import iniciar_servicio
+
+        opciones = {} if args.ventana_ms is None else {'ventana_ms': args.ventana_ms}
+        servidor = iniciar_servicio('127.0.0.1', 0, **opciones)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        args.url = f'http://127.0.0.1:{servidor.server_address[1]}'
+
+    generar = registro_ml if args.ruta == '/predecir' else registro_dl
+    latencias, codigos, lock = [], {}, threading.Lock()
+    hilos = [
+        threading.Thread(target=cliente, args=(args.url, args.ruta, generar, args.duracion, i, latencias, codigos, lock))
+        for i in range(args.concurrencia)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    destino = urlparse(args.url)
+    conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+    conexion.request('GET', '/metricas')
+    metricas = json.loads(conexion.getresponse().read())[args.ruta]
+
+    ms = np.array(latencias) * 1000
+    print(f"{len(latencias):,} peticiones en {segundos:.1f} s -> {len(latencias) / segundos:,.0f} peticiones/s "
+          f"({args.concurrencia} clientes)")
+    print(f"Latencia cliente: p50 {np.percentile(ms, 50):.2f} ms | p95 {np.percentile(ms, 95):.2f} ms | "
+          f"p99 {np.percentile(ms, 99):.2f} ms")
+    print(f"Códigos HTTP: {dict(sorted(codigos.items(), key=str))}")
+    print(f"Servidor: {metricas['filas_por_lote']} filas por lote en {metricas['lotes']:,} lotes, "
+          f"{metricas['rechazadas']} rechazadas, {metricas['vencidas']} vencidas")
+
+    if servidor is not None:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
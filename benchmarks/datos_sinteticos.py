@@ -0,0 +1,84 @@
+# benchmarks/datos_sinteticos.py
+#
+# Generadores de datos sintéticos para los benchmarks. Respetan los mismos
+# dominios que la app: AREA_MAP/SEXO_MAP y las edades del formulario para
+# los modelos ML, y el esquema de 9 variables (FEATURES) de la red MLP.
+
+import numpy as np
+import pandas as pd
+
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP
+
+EDADES_HTS = [14, 21, 28, 35]
+EDAD_VENTA_MAX = 5000
+# Rango de 'Edad Granja' de los archivos reales (media 40 y desviación 2.4
+# según el X_scaler_9vars): con él se repiten muchas combinaciones.
+EDAD_GRANJA_REALISTA = (30, 50)
+
+# Media y desviación de cada variable numérica de la red (tomadas del
+# X_scaler_9vars de entrenamiento, redondeadas). 'Area' se genera aparte.
+DISTRIBUCION_DL = {
+    'PorcMortSem4': (1.06, 1.19),
+    'PorcMortSem5': (1.81, 2.03),
+    'PorcMortSem6': (2.67, 2.55),
+    'PesoSem4': (1.56, 0.15),
+    'PesoSem5': (2.24, 0.42),
+    'Pob Inicial': (29262, 5432),
+    'Edad HTS': (20.7, 7.3),
+    'Edad Granja': (40.0, 2.4),
+}
+
+
+def generar_lote_ml(n, semilla=0, edad_granja=(0, EDAD_VENTA_MAX)):
+    """Lote (n, 4) ya codificado: [areaAn, sexo, edadHTs, edadventa]."""
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.choice(list(AREA_MAP.values()), n),
+        rng.choice(list(SEXO_MAP.values()), n),
+        rng.choice(EDADES_HTS, n),
+        rng.integers(edad_granja[0], edad_granja[1] + 1, n),
+    ])
+
+
+def generar_archivo_ml(n, semilla=0, edad_granja=(0, EDAD_VENTA_MAX)):
+    """DataFrame con el formato de un archivo subido en app.py (texto, con espacios)."""
+    rng = np.random.default_rng(semilla)
+    sexos = list(SEXO_MAP)
+    return pd.DataFrame({
+        'Sexo': rng.choice(sexos + [f' {s}' for s in sexos] + [f'{s} ' for s in sexos], n),
+        'Area': rng.choice(list(AREA_MAP), n),
+        'Edad HTS': rng.choice(EDADES_HTS, n),
+        'Edad Granja': rng.integers(edad_granja[0], edad_granja[1] + 1, n),
+        'Galpon': rng.integers(0, n, n),
+    })
+
+
+def generar_archivo_dl(n, semilla=0):
+    """DataFrame con las 9 FEATURES de app2 ('Area' por nombre)."""
+    from src.predictores.predicciones_DL import FEATURES
+
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        columna: np.abs(rng.normal(media, desviacion, n))
+        for columna, (media, desviacion) in DISTRIBUCION_DL.items()
+    })
+    df['Area'] = rng.choice(list(AREA_MAP), n)
+    return df[FEATURES]
+
+
+def generar_registros_prediccion(n, semilla=0):
+    """Filas con el esquema de la tabla 'predicciones' (lo que guarda app.py)."""
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'created_at': '2025-01-01 00:00',
+        'nombre': 'benchmark',
+        'cargo': 'benchmark',
+        'areaAn': rng.choice(list(AREA_MAP), n),
+        'sexo': rng.choice(list(SEXO_MAP), n),
+        'edadHTs': rng.choice(EDADES_HTS, n),
+        'edadventa': rng.integers(0, EDAD_VENTA_MAX + 1, n),
+        'prePorcMort': rng.uniform(2, 8, n).round(2),
+        'prePorcCon': rng.uniform(3, 5, n).round(3),
+        'preICA': rng.uniform(1.4, 1.9, n).round(2),
+        'prePeProFin': rng.uniform(2, 3, n).round(3),
+    })
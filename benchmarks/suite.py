@@ -0,0 +1,321 @@
+# benchmarks/suite.py
+#
+# Suite reproducible de benchmarks: predicción ML por tamaño de lote (también
+# con filas repetidas como en los archivos reales, con y sin deduplicar), el
+# pipeline de carga de archivos de app.py, la red MLP de app2, la
+# persistencia (Supabase y SharePoint contra sus sustitutos locales) y la
+# analítica (agregados incrementales contra agregar las filas crudas).
+# Escribe los resultados en JSON y, si se indica, los compara con una línea
+# base guardada: cualquier caso más lento que la base más la tolerancia (y
+# al menos --minimo-segundos más lento, para que el ruido de los casos de
+# fracciones de milisegundo no cuente) se informa como regresión y el
+# proceso termina con código 1.
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.suite --rapido
+#   python -m benchmarks.suite --salida resultados.json --comparar benchmarks/linea_base.json
+#   python -m benchmarks.suite --casos predict_all carga_archivo --guardar-linea-base
+#
+# Los tiempos dependen de la máquina: la línea base solo sirve para
+# comparar corridas en el mismo entorno.
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Persistencia contra los sustitutos locales (antes de importar CRUD).
+os.environ.setdefault('SUPABASE_LOCAL', '1')
+
+import numpy as np
+
+from benchmarks.datos_sinteticos import (
+    EDAD_GRANJA_REALISTA, generar_archivo_dl, generar_archivo_ml, generar_lote_ml, generar_registros_prediccion
+)
+
+LINEA_BASE = 'benchmarks/linea_base.json'
+TAMANOS_ML = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+TAMANOS_ARCHIVO = [10_000, 100_000]
+TAMANOS_DL = [1, 1_000, 100_000]
+TAMANOS_DEDUP = [10_000, 100_000, 1_000_000]
+# Con --rapido se omiten los tamaños mayores a este.
+FILAS_MAX_RAPIDO = 100_000
+# Metadatos que identifican el entorno; si difieren de la línea base, la
+# comparación se informa pero los tiempos no son comparables.
+METADATOS_ENTORNO = ('maquina', 'procesador', 'cpus', 'plataforma')
+
+
+def medir(funcion, repeticiones, preparar=None):
+    """
+    Mejor tiempo de varias repeticiones (en segundos), tras una de calentamiento.
+
+    Args:
+        preparar (callable, opcional): Se llama antes de cada repetición, fuera
+            del tiempo medido; su resultado se pasa a `funcion`.
+    """
+    argumento = preparar() if preparar else None
+    funcion(argumento) if preparar else funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcion(argumento) if preparar else funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def _repeticiones(n, base):
+    # Los lotes grandes se miden una sola vez para no eternizar la corrida.
+    return base if n <= 10_000 else 1
+
+
+def casos_predict_all(tamanos, repeticiones):
+    from src.predictores.predicciones_ML import predict_all
+
+    for n in tamanos:
+        lote = generar_lote_ml(n)
+        yield f'predict_all[{n}]', n, medir(lambda: predict_all(lote), _repeticiones(n, repeticiones))
+
+
+def casos_carga_archivo(tamanos, repeticiones):
+    from src.utils.lote_streaming import predecir_archivo_en_bloques
+
+    for n in tamanos:
+        contenido = generar_archivo_ml(n).to_csv(index=False).encode('utf-8')
+        # Incluye detectar la codificación, leer, validar, mapear, predecir y escribir el CSV.
+        segundos = medir(
+            lambda archivo: predecir_archivo_en_bloques(archivo, 'archivo.csv', io.BytesIO(), 'bench', 'bench'),
+            _repeticiones(n, repeticiones),
+            preparar=lambda: io.BytesIO(contenido),
+        )
+        yield f'carga_archivo[{n}]', n, segundos
+
+
+def casos_deduplicacion(tamanos, repeticiones):
+    # Lotes con las edades de granja de los archivos reales (muchas filas
+    # repetidas), con y sin evaluar solo las filas únicas.
+    from src.predictores.deduplicacion import filas_unicas
+    from src.predictores.predicciones_ML import predict_all
+
+    for n in tamanos:
+        lote = generar_lote_ml(n, edad_granja=EDAD_GRANJA_REALISTA)
+        print(f'  ({n:,} filas, {len(filas_unicas(lote)[0]):,} únicas)')
+        for deduplicar, sufijo in ((True, ''), (False, '_sin_dedup')):
+            yield (f'realista{sufijo}[{n}]', n,
+                   medir(lambda: predict_all(lote, deduplicar=deduplicar), _repeticiones(n, repeticiones)))
+
+
+def casos_predecir_dl(tamanos, repeticiones):
+    from src.predictores.predicciones_DL import codificar_lote_dl, obtener_le_area, predecir_dl
+
+    le_area = obtener_le_area()
+    for n in tamanos:
+        X, _ = codificar_lote_dl(generar_archivo_dl(n), le_area)
+        yield f'predecir_dl[{n}]', n, medir(lambda: predecir_dl(X), _repeticiones(n, repeticiones))
+
+
+def casos_persistencia(repeticiones):
+    from src.utils import CRUD
+    from src.utils.cola_escritura import ColaEscritura
+    from src.utils.supabase_local import ClienteSupabaseLocal
+
+    registros = generar_registros_prediccion(1_000)
+    fila = registros.iloc[0].to_dict()
+    fila = {k: v.item() if hasattr(v, 'item') else v for k, v in fila.items()}
+
+    yield 'crear_prediccion[1]', 1, medir(lambda: CRUD.crear_prediccion(fila), repeticiones)
+    yield 'crear_predicciones_bulk[1000]', 1_000, medir(
+        lambda cliente: CRUD.crear_predicciones_bulk(registros, cliente=cliente),
+        repeticiones, preparar=ClienteSupabaseLocal,
+    )
+
+    def encolar_y_vaciar(cola):
+        for _ in range(1_000):
+            cola.encolar(fila)
+        cola.vaciar()
+        cola.cerrar()
+
+    cliente = ClienteSupabaseLocal()
+    yield 'cola_escritura[1000]', 1_000, medir(
+        encolar_y_vaciar, repeticiones,
+        preparar=lambda: ColaEscritura(lambda filas: CRUD.crear_predicciones_bulk(filas, cliente=cliente),
+                                       espera_lote=0.01),
+    )
+
+
+def casos_analitica(n, repeticiones):
+    import pandas as pd
+
+    from src.utils import CRUD
+    from src.utils.analitica import DIMENSIONES, METRICAS, agregados
+    from src.utils.supabase_local import ClienteSupabaseLocal
+
+    cliente = ClienteSupabaseLocal()
+    registros = generar_registros_prediccion(n)
+    registros['created_at'] = np.where(np.arange(n) % 2, '2025-01-01 00:00', '2025-02-01 00:00')
+    CRUD.crear_predicciones_bulk(registros, cliente=cliente)
+    agregados.vaciar()
+    agregados.compactar(cliente)
+
+    def filas_crudas():
+        # Lo que había que hacer antes: traer toda la tabla y agregar en el cliente.
+        df = pd.DataFrame(cliente.table('predicciones').select('*').execute().data)
+        df['mes'] = df['created_at'].str[:7]
+        return df.groupby(DIMENSIONES)[METRICAS].quantile([0.1, 0.5, 0.9])
+
+    yield f'analitica_filas_crudas[{n}]', n, medir(filas_crudas, repeticiones)
+    yield f'analitica_agregados[{n}]', n, medir(lambda: agregados.consultar(cliente), repeticiones)
+
+
+def casos_sharepoint(repeticiones):
+    from src.utils import sharepointUtill
+    from src.utils.sharepoint_local import ArchivosLocales
+
+    directorio = tempfile.mkdtemp(prefix='bench_sharepoint_')
+    sharepointUtill.gestor_sharepoint = sharepointUtill.GestorSharePoint(
+        autenticar=lambda site_url, username, password: directorio,
+        crear_archivos=lambda ctx, tiempos: ArchivosLocales(ctx),
+    )
+    carpeta = '/sites/bench/Shared Documents'
+    # Un libro existente de 10.000 filas: el guardado no debería depender de su tamaño.
+    sumidero = sharepointUtill.SumideroSharePoint(ArchivosLocales(directorio), carpeta)
+    sumidero.agregar(generar_registros_prediccion(10_000))
+    sumidero.compactar()
+
+    fila = generar_registros_prediccion(1)
+    lote = generar_registros_prediccion(1_000)
+    guardar = lambda df: sharepointUtill.append_a_excel_existente(
+        'https://bench', 'bench', 'bench', carpeta, 'predicciones.xlsx', df
+    )
+    yield 'append_a_excel_existente[1]', 1, medir(lambda: guardar(fila), repeticiones)
+    yield 'append_a_excel_existente[1000]', 1_000, medir(lambda: guardar(lote), repeticiones)
+    yield 'compactar_sharepoint', None, medir(
+        lambda _: sumidero.compactar(), 1, preparar=lambda: [sumidero.agregar(fila) for _ in range(20)]
+    )
+
+
+GRUPOS = {
+    'predict_all': lambda args: casos_predict_all(args.tamanos_ml, args.repeticiones),
+    'carga_archivo': lambda args: casos_carga_archivo(args.tamanos_archivo, args.repeticiones),
+    'predecir_dl': lambda args: casos_predecir_dl(args.tamanos_dl, args.repeticiones),
+    'deduplicacion': lambda args: casos_deduplicacion(args.tamanos_dedup, args.repeticiones),
+    'persistencia': lambda args: casos_persistencia(args.repeticiones),
+    'analitica': lambda args: casos_analitica(100_000, args.repeticiones),
+    'sharepoint': lambda args: casos_sharepoint(args.repeticiones),
+}
+
+
+def _procesador():
+    # platform.processor() suele venir vacío en Linux; el modelo está en /proc/cpuinfo.
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            for linea in f:
+                if linea.startswith('model name'):
+                    return linea.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def metadatos():
+    from src.predictores import predicciones_DL, predicciones_ML
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'maquina': platform.machine(),
+        'procesador': _procesador(),
+        'cpus': os.cpu_count(),
+        'motor_ml': predicciones_ML.MOTOR,
+        'modo_tabla': predicciones_ML.MODO_TABLA,
+        'n_workers': predicciones_ML.N_WORKERS,
+        'motor_dl': predicciones_DL.MOTOR_DL,
+    }
+
+
+def comparar(resultados, linea_base, tolerancia, minimo_segundos=0.0):
+    """
+    Devuelve la lista de regresiones: casos más lentos que la base más la
+    tolerancia relativa y, además, más de `minimo_segundos` más lentos.
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = linea_base.get(nombre)
+        if base is None:
+            continue
+        relacion = actual['segundos'] / base['segundos']
+        if relacion > 1 + tolerancia and actual['segundos'] - base['segundos'] > minimo_segundos:
+            regresiones.append((nombre, base['segundos'], actual['segundos'], relacion))
+    return regresiones
+
+
+def diferencias_de_entorno(actual, base):
+    """Pares (clave, base, actual) de los METADATOS_ENTORNO que no coinciden."""
+    return [(clave, base.get(clave), actual.get(clave)) for clave in METADATOS_ENTORNO
+            if base.get(clave) != actual.get(clave)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de benchmarks de predicción, codificación y persistencia')
+    parser.add_argument('--casos', nargs='+', choices=list(GRUPOS), default=list(GRUPOS))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--rapido', action='store_true', help=f'Omite los lotes de más de {FILAS_MAX_RAPIDO:,} filas.')
+    parser.add_argument('--tamanos-ml', type=int, nargs='+', default=TAMANOS_ML)
+    parser.add_argument('--tamanos-archivo', type=int, nargs='+', default=TAMANOS_ARCHIVO)
+    parser.add_argument('--tamanos-dl', type=int, nargs='+', default=TAMANOS_DL)
+    parser.add_argument('--tamanos-dedup', type=int, nargs='+', default=TAMANOS_DEDUP)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados.')
+    parser.add_argument('--comparar', nargs='?', const=LINEA_BASE, help='Línea base JSON contra la cual comparar.')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Lentitud relativa aceptada (0.25 = 25%%).')
+    parser.add_argument('--minimo-segundos', type=float, default=0.001,
+                        help='Diferencia absoluta mínima para contar una regresión (evita falsos positivos en casos de < 1 ms).')
+    parser.add_argument('--guardar-linea-base', action='store_true', help=f'Guarda los resultados en {LINEA_BASE}.')
+    args = parser.parse_args()
+
+    if args.rapido:
+        for nombre in ('tamanos_ml', 'tamanos_archivo', 'tamanos_dl', 'tamanos_dedup'):
+            setattr(args, nombre, [n for n in getattr(args, nombre) if n <= FILAS_MAX_RAPIDO])
+
+    resultados = {}
+    print(f"{'caso':<34} | {'segundos':>10} | {'filas/s':>14}")
+    print('-' * 64)
+    for grupo in args.casos:
+        for nombre, filas, segundos in GRUPOS[grupo](args):
+            resultados[nombre] = {'segundos': segundos, 'filas': filas,
+                                  'filas_por_segundo': filas / segundos if filas else None}
+            filas_por_segundo = f'{filas / segundos:>14,.0f}' if filas else f"{'-':>14}"
+            print(f'{nombre:<34} | {segundos:>10.5f} | {filas_por_segundo}')
+
+    informe = {'metadatos': metadatos(), 'resultados': resultados}
+    for ruta in filter(None, [args.salida, LINEA_BASE if args.guardar_linea_base else None]):
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f'Resultados guardados en {ruta}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        diferencias = diferencias_de_entorno(informe['metadatos'], base.get('metadatos', {}))
+        if diferencias:
+            print('\nADVERTENCIA: la línea base es de otro entorno; los tiempos no son comparables.')
+            for clave, valor_base, valor_actual in diferencias:
+                print(f'  {clave}: {valor_base} -> {valor_actual}')
+        regresiones = comparar(resultados, base['resultados'], args.tolerancia, args.minimo_segundos)
+        if regresiones:
+            print(f'\n{len(regresiones)} regresión(es) respecto de {args.comparar}:')
+            for nombre, base, actual, relacion in regresiones:
+                print(f'  {nombre}: {base:.5f} s -> {actual:.5f} s ({relacion:.2f}x)')
+            sys.exit(1)
+        print(f'\nSin regresiones respecto de {args.comparar} '
+              f'(tolerancia {args.tolerancia:.0%}, mínimo {args.minimo_segundos * 1000:g} ms).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/tiempos_importacion.py
+#
+# Informe del costo de importación (arranque en frío) de cada módulo de la
+# app. Cada módulo se importa en un proceso nuevo con `python -X importtime`
+# y se informa el tiempo total, los paquetes que más pesan y qué
+# dependencias pesadas (supabase, office365, chardet, xgboost, TensorFlow...)
+# se cargaron aunque todavía no se usen. Con --presupuesto-ms el proceso
+# termina con código 1 si algún módulo lo supera.
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.tiempos_importacion
+#   python -m benchmarks.tiempos_importacion --modulos src.utils.CRUD --detalle 15
+#   python -m benchmarks.tiempos_importacion --presupuesto-ms 1500 --salida importacion.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Lo que importa cada punto de entrada desde src/ (app.py y app2.py no se
+# pueden importar directamente porque ejecutan la interfaz de Streamlit).
+CONJUNTOS = {
+    'app.py': [
+        'streamlit', 'src.predictores.codificacion', 'src.predictores.cache_predicciones',
+        'src.predictores.predicciones_ML', 'src.predictores.registro_modelos', 'src.utils.CRUD',
+        'src.utils.sharepointUtill', 'src.utils.lote_streaming', 'src.utils.instrumentacion',
+    ],
+    'app2.py': [
+        'streamlit', 'src.predictores.predicciones_DL', 'src.predictores.registro_modelos',
+        'src.utils.lote_dl', 'src.utils.lote_streaming', 'src.utils.instrumentacion',
+    ],
+    'servicio.py': ['servicio'],
+}
+MODULOS = [
+    'src.utils.CRUD', 'src.utils.sharepointUtill', 'src.utils.lote_streaming', 'src.utils.lote_dl',
+    'src.predictores.predicciones_ML', 'src.predictores.predicciones_DL', 'src.predictores.cache_predicciones',
+]
+# Dependencias que solo deberían cargarse cuando se usan.
+PESADAS = ['supabase', 'office365', 'chardet', 'xgboost', 'tensorflow', 'keras', 'sklearn', 'joblib', 'h5py', 'openpyxl']
+
+
+def medir_importacion(modulos):
+    """
+    Importa `modulos` en un proceso nuevo con -X importtime.
+
+    Returns:
+        tuple: (milisegundos totales, {paquete de primer nivel: milisegundos propios}).
+    """
+    codigo = '; '.join(f'import {m}' for m in modulos)
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        capture_output=True, text=True, env={**os.environ, 'PYTHONWARNINGS': 'ignore'},
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f'No se pudo importar {modulos}:\n{proceso.stderr[-2000:]}')
+
+    total_us = 0
+    por_paquete = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        # Las importaciones de primer nivel (sin sangría) suman el total.
+        if not nombre[1:].startswith(' '):
+            total_us += int(acumulado)
+        paquete = nombre.strip().split('.')[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + int(propio)
+    return total_us / 1000, {p: us / 1000 for p, us in por_paquete.items()}
+
+
+def informe(nombre, modulos, repeticiones):
+    """Mejor de varias corridas (la primera también sirve para calentar la caché de disco)."""
+    corridas = [medir_importacion(modulos) for _ in range(repeticiones)]
+    total, por_paquete = min(corridas, key=lambda c: c[0])
+    return {
+        'nombre': nombre,
+        'ms': round(total, 1),
+        'paquetes': dict(sorted(((p, round(ms, 1)) for p, ms in por_paquete.items()),
+                                key=lambda par: par[1], reverse=True)),
+        'pesadas_cargadas': [p for p in PESADAS if p in por_paquete],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo de importación por módulo (python -X importtime).')
+    parser.add_argument('--modulos', nargs='+', help='Módulos a medir (por defecto, los de la app y sus puntos de entrada).')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--detalle', type=int, default=5, help='Paquetes más pesados a mostrar por módulo.')
+    parser.add_argument('--presupuesto-ms', type=float, help='Falla si algún módulo tarda más que esto.')
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el informe.')
+    args = parser.parse_args()
+
+    objetivos = {m: [m] for m in args.modulos} if args.modulos else {**CONJUNTOS, **{m: [m] for m in MODULOS}}
+    resultados = []
+    print(f"{'módulo':<36} | {'ms':>8} | paquetes más pesados (ms propios)")
+    print('-' * 100)
+    for nombre, modulos in objetivos.items():
+        resultado = informe(nombre, modulos, args.repeticiones)
+        resultados.append(resultado)
+        pesados = ', '.join(f'{p} {ms:.0f}' for p, ms in list(resultado['paquetes'].items())[:args.detalle])
+        print(f"{nombre:<36} | {resultado['ms']:>8.1f} | {pesados}")
+        if resultado['pesadas_cargadas']:
+            print(f"{'':<36} | {'':>8} | ⚠ carga al importar: {', '.join(resultado['pesadas_cargadas'])}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f'Informe guardado en {args.salida}')
+
+    if args.presupuesto_ms is not None:
+        excedidos = [r for r in resultados if r['ms'] > args.presupuesto_ms]
+        if excedidos:
+            print(f'\n{len(excedidos)} módulo(s) superan el presupuesto de {args.presupuesto_ms:.0f} ms:')
+            for r in excedidos:
+                print(f"  {r['nombre']}: {r['ms']:.1f} ms")
+            sys.exit(1)
+        print(f'\nTodos los módulos dentro del presupuesto de {args.presupuesto_ms:.0f} ms.')
+
+
+if __name__ == '__main__':
+    main()
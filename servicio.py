@@ -0,0 +1,197 @@
+# servicio.py
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from src.predictores.codificacion import codificar_fila
+from src.predictores.microlotes import AgrupadorMicrolotes, PeticionDemasiadoGrande, Saturado
+from src.predictores.predicciones_DL import FEATURES, TARGETS, obtener_le_area, predecir_dl
+from src.predictores.predicciones_ML import precalentar_modelos, predict_all
+from src.utils.instrumentacion import metricas
+
+# ====================================================================
+# SERVICIO HTTP DE PREDICCIONES (SIN STREAMLIT)
+# ====================================================================
+# Expone `predict_all` y la red MLP de app2 para otros sistemas. Las
+# peticiones concurrentes se agrupan en microlotes (ver `microlotes`) para
+# que cada llamada al modelo trabaje sobre un vector.
+#
+#   POST /predecir     {"registros": [{"Area": "Calidad", "Sexo": "Ma", "Edad HTS": 14, "Edad Granja": 1000}]}
+#   POST /predecir_dl  {"registros": [{<las 9 FEATURES, Area por nombre>}]}
+#   GET  /salud        estado del servicio
+#   GET  /metricas     latencias, tamaño de los lotes, rechazos y vencidas
+#   GET  /metrics      tiempos por etapa en formato Prometheus (con INSTRUMENTACION=1)
+#
+# Uso: python servicio.py   (configurable con las variables SERVICIO_*)
+
+HOST = os.getenv('SERVICIO_HOST', '127.0.0.1')
+PUERTO = int(os.getenv('SERVICIO_PUERTO', '8000'))
+VENTANA_MS = float(os.getenv('SERVICIO_VENTANA_MS', '5'))
+MAX_LOTE = int(os.getenv('SERVICIO_MAX_LOTE', '512'))
+MAX_PENDIENTES = int(os.getenv('SERVICIO_MAX_PENDIENTES', '4096'))
+TIMEOUT = float(os.getenv('SERVICIO_TIMEOUT_S', '2'))
+MAX_BYTES_PETICION = 1 << 20
+
+SALIDAS_ML = ['prePorcMort', 'prePorcCon', 'preICA', 'prePeProFin']
+
+
+@metricas.cronometrar('servicio_predict_all')
+def _predecir_ml(X):
+    resultados = predict_all(X)
+    if len(resultados) != len(X):
+        # predict_all devuelve un DataFrame vacío si faltan los modelos.
+        raise RuntimeError('Los modelos ML no están disponibles')
+    return resultados[SALIDAS_ML].to_numpy()
+
+
+def _codificar_ml(registros):
+    return np.vstack([
+        codificar_fila(r['Area'], r['Sexo'], float(r['Edad HTS']), float(r['Edad Granja']))
+        for r in registros
+    ])
+
+
+def _codificar_dl(registros):
+    try:
+        codigos_area = {clase: codigo for codigo, clase in enumerate(obtener_le_area().classes_)}
+    except FileNotFoundError:
+        codigos_area = None
+    X = np.empty((len(registros), len(FEATURES)), dtype=np.float64)
+    for i, registro_dl in enumerate(registros):
+        for j, columna in enumerate(FEATURES):
+            valor = registro_dl[columna]
+            if columna == 'Area' and codigos_area is not None:
+                if valor not in codigos_area:
+                    raise ValueError(f"Área no reconocida: '{valor}'. Valores válidos: {list(codigos_area)}")
+                valor = codigos_area[valor]
+            X[i, j] = float(valor)
+    return X
+
+
+class ServicioPredicciones(ThreadingHTTPServer):
+    """Servidor HTTP con un agrupador de microlotes por modelo."""
+
+    daemon_threads = True
+    # Cola de conexiones del socket: con el valor por defecto (5) los picos
+    # de clientes concurrentes reciben "connection reset".
+    request_queue_size = 256
+
+    def __init__(self, direccion, ventana_ms=VENTANA_MS, max_lote=MAX_LOTE,
+                 max_pendientes=MAX_PENDIENTES, timeout=TIMEOUT):
+        super().__init__(direccion, _Manejador)
+        self.timeout_peticion = timeout
+        self.rutas = {
+            '/predecir': (AgrupadorMicrolotes(_predecir_ml, ventana_ms / 1000, max_lote, max_pendientes, 'microlotes_ml'),
+                          _codificar_ml, SALIDAS_ML),
+            '/predecir_dl': (AgrupadorMicrolotes(predecir_dl, ventana_ms / 1000, max_lote, max_pendientes, 'microlotes_dl'),
+                             _codificar_dl, TARGETS),
+        }
+        self.respuestas = {}
+        self._lock = threading.Lock()
+
+    def contar(self, codigo):
+        with self._lock:
+            self.respuestas[codigo] = self.respuestas.get(codigo, 0) + 1
+
+    def metricas(self):
+        with self._lock:
+            respuestas = {str(k): v for k, v in sorted(self.respuestas.items())}
+        return {
+            'respuestas': respuestas,
+            **{ruta: agrupador.estadisticas() for ruta, (agrupador, _, _) in self.rutas.items()},
+        }
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Encabezados y cuerpo se escriben por separado: sin esto Nagle y el ACK
+    # retardado agregan ~40 ms a cada respuesta.
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        # Sin una línea por petición: las métricas están en /metricas.
+        pass
+
+    def _responder(self, codigo, cuerpo, encabezados=None):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        for clave, valor in (encabezados or {}).items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+        self.server.contar(codigo)
+
+    def do_GET(self):
+        if self.path == '/salud':
+            self._responder(200, {'estado': 'ok'})
+        elif self.path == '/metricas':
+            self._responder(200, self.server.metricas())
+        elif self.path == '/metrics':
+            datos = metricas.exportar_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+            self.server.contar(200)
+        else:
+            self._responder(404, {'error': 'Ruta no encontrada'})
+
+    def do_POST(self):
+        if self.path not in self.server.rutas:
+            self._responder(404, {'error': 'Ruta no encontrada'})
+            return
+        agrupador, codificar, salidas = self.server.rutas[self.path]
+
+        longitud = int(self.headers.get('Content-Length') or 0)
+        if longitud > MAX_BYTES_PETICION:
+            self._responder(413, {'error': f'La petición supera {MAX_BYTES_PETICION} bytes'})
+            return
+        try:
+            registros = json.loads(self.rfile.read(longitud))['registros']
+            X = codificar(registros)
+        except (ValueError, KeyError, TypeError) as e:
+            self._responder(400, {'error': f'Petición inválida: {e}'})
+            return
+
+        try:
+            Y = agrupador.predecir(X, timeout=self.server.timeout_peticion)
+        except PeticionDemasiadoGrande as e:
+            # Sin Retry-After: la misma petición nunca va a caber; hay que dividirla.
+            self._responder(413, {'error': f'{e}. Divida los registros en varias peticiones.'})
+            return
+        except Saturado as e:
+            self._responder(503, {'error': f'Servicio saturado: {e}'}, {'Retry-After': '1'})
+            return
+        except TimeoutError as e:
+            self._responder(504, {'error': str(e)})
+            return
+        except Exception as e:
+            self._responder(500, {'error': str(e)})
+            return
+
+        predicciones = [dict(zip(salidas, map(float, fila))) for fila in Y]
+        self._responder(200, {'predicciones': predicciones})
+
+
+def iniciar_servicio(host=HOST, puerto=PUERTO, **opciones):
+    """Crea el servidor y precarga los modelos (no bloquea: usar serve_forever)."""
+    precalentar_modelos()
+    return ServicioPredicciones((host, puerto), **opciones)
+
+
+if __name__ == '__main__':
+    servidor = iniciar_servicio()
+    print(f'Servicio de predicciones en http://{servidor.server_address[0]}:{servidor.server_address[1]}')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
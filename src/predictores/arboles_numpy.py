@@ -0,0 +1,225 @@
+# src/predictores/arboles_numpy.py
+
+import json
+import os
+
+import numpy as np
+
+# --- 1. REPRESENTACIÓN PLANA DE LOS ÁRBOLES ---
+# Todos los nodos de todos los árboles de los 4 modelos se guardan en arrays
+# contiguos (un .npz). Este módulo NO importa xgboost: solo la exportación
+# necesita los modelos cargados, la evaluación usa únicamente NumPy.
+#
+#   feature[i]      índice de la variable que se compara en el nodo i
+#   umbral[i]       se va a la izquierda si x[feature] < umbral
+#   izquierda[i]    hijo izquierdo (en las hojas apunta al mismo nodo)
+#   derecha[i]      hijo derecho (en las hojas apunta al mismo nodo)
+#   default_izq[i]  a dónde ir si el valor es NaN
+#   valor[i]        valor de la hoja (0 en los nodos internos)
+#
+# Además: `raices` (nodo raíz de cada árbol), `inicio_modelos` (primer árbol
+# de cada modelo), `base_score` y `profundidad_max`.
+
+DIRECTORIO_ARBOLES = 'modelosPkl/ML_models'
+
+# Solo exportamos objetivos con enlace identidad (margen == predicción).
+OBJETIVOS_SOPORTADOS = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+
+# Filas por bloque al evaluar: limita la memoria de la matriz (filas x árboles).
+FILAS_POR_BLOQUE = 4096
+
+
+def ruta_arboles(version, directorio=DIRECTORIO_ARBOLES):
+    """Devuelve la ruta del .npz exportado para una versión de modelos."""
+    return os.path.join(directorio, f'arboles_{version}.npz')
+
+
+def _profundidad(izquierda, derecha, raiz):
+    """Profundidad máxima de un árbol (número de saltos hasta la hoja más lejana)."""
+    profundidad = 0
+    pendientes = [(raiz, 0)]
+    while pendientes:
+        nodo, nivel = pendientes.pop()
+        if izquierda[nodo] == nodo:
+            profundidad = max(profundidad, nivel)
+        else:
+            pendientes.append((izquierda[nodo], nivel + 1))
+            pendientes.append((derecha[nodo], nivel + 1))
+    return profundidad
+
+
+def exportar_arboles(modelos, ruta):
+    """
+    Convierte los XGBRegressor a la representación plana y la guarda en disco.
+
+    Args:
+        modelos (list): Los 4 XGBRegressor en el orden
+            [porcMort, porcConsumo, ica, pesoProm].
+        ruta (str): Archivo .npz de destino.
+    """
+    feature, umbral, izquierda, derecha, default_izq, valor = [], [], [], [], [], []
+    raices, inicio_modelos, base_score = [], [], []
+    desplazamiento = 0
+
+    for modelo in modelos:
+        booster = modelo.get_booster()
+        learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+        objetivo = learner['objective']['name']
+        if objetivo not in OBJETIVOS_SOPORTADOS or learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"No se puede exportar un modelo '{objetivo}' con booster "
+                             f"'{learner['gradient_booster']['name']}'.")
+
+        arboles = learner['gradient_booster']['model']['trees']
+        if getattr(modelo, 'best_iteration', None) is not None:
+            arboles = arboles[:modelo.best_iteration + 1]
+
+        inicio_modelos.append(len(raices))
+        base_score.append(float(learner['learner_model_param']['base_score']))
+
+        for arbol in arboles:
+            izq = np.asarray(arbol['left_children'], dtype=np.int64)
+            der = np.asarray(arbol['right_children'], dtype=np.int64)
+            es_hoja = izq == -1
+            nodos = np.arange(len(izq))
+
+            # En xgboost el valor de la hoja se guarda en split_conditions.
+            condiciones = np.asarray(arbol['split_conditions'], dtype=np.float32)
+            feature.append(np.where(es_hoja, 0, arbol['split_indices']))
+            umbral.append(np.where(es_hoja, np.float32(0), condiciones))
+            valor.append(np.where(es_hoja, condiciones, np.float32(0)))
+            izquierda.append(np.where(es_hoja, nodos, izq) + desplazamiento)
+            derecha.append(np.where(es_hoja, nodos, der) + desplazamiento)
+            default_izq.append(np.asarray(arbol['default_left'], dtype=bool))
+            raices.append(desplazamiento)
+            desplazamiento += len(izq)
+
+    izquierda = np.concatenate(izquierda).astype(np.int32)
+    derecha = np.concatenate(derecha).astype(np.int32)
+    profundidad_max = max(_profundidad(izquierda, derecha, raiz) for raiz in raices)
+
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    ruta_tmp = f'{ruta}.{os.getpid()}.tmp.npz'
+    np.savez(
+        ruta_tmp,
+        feature=np.concatenate(feature).astype(np.int32),
+        umbral=np.concatenate(umbral).astype(np.float32),
+        izquierda=izquierda,
+        derecha=derecha,
+        default_izq=np.concatenate(default_izq),
+        valor=np.concatenate(valor).astype(np.float32),
+        raices=np.asarray(raices, dtype=np.int32),
+        inicio_modelos=np.asarray(inicio_modelos, dtype=np.int32),
+        base_score=np.asarray(base_score, dtype=np.float32),
+        profundidad_max=np.int32(profundidad_max),
+    )
+    os.replace(ruta_tmp, ruta)
+
+
+class MotorNumpy:
+    """
+    Evaluador vectorizado de los árboles exportados, solo con NumPy.
+
+    Al cargar, cada árbol se reordena como un árbol binario completo de
+    profundidad `profundidad_max` (indexado como un heap: los hijos del nodo k
+    son 2k+1 y 2k+2). Las hojas poco profundas se repiten hacia abajo, lo que
+    sale gratis porque en la representación plana apuntan a sí mismas. Así
+    todas las filas bajan por todos los árboles a la vez con aritmética de
+    índices, sin seguir punteros a los hijos.
+    """
+
+    def __init__(self, ruta):
+        with np.load(ruta) as datos:
+            feature = datos['feature']
+            umbral = datos['umbral']
+            izquierda = datos['izquierda']
+            derecha = datos['derecha']
+            default_izq = datos['default_izq']
+            valor = datos['valor']
+            raices = datos['raices']
+            self.inicio_modelos = datos['inicio_modelos']
+            self.base_score = datos['base_score']
+            self.profundidad = int(datos['profundidad_max'])
+
+        n_arboles = len(raices)
+        self.fin_modelos = np.append(self.inicio_modelos[1:], n_arboles)
+
+        # Recorremos los árboles nivel por nivel para armar el heap de cada uno.
+        niveles_feature, niveles_umbral, niveles_default = [], [], []
+        posiciones = raices[:, None]
+        for _ in range(self.profundidad):
+            niveles_feature.append(feature[posiciones])
+            niveles_umbral.append(umbral[posiciones])
+            niveles_default.append(default_izq[posiciones])
+            posiciones = np.stack([izquierda[posiciones], derecha[posiciones]], axis=2).reshape(n_arboles, -1)
+
+        # Matrices (árboles x nodos) aplanadas: el nodo k del árbol t está en
+        # t * nodos_internos + k.
+        self.nodos_internos = 2 ** self.profundidad - 1
+        self.feature = (np.hstack(niveles_feature).ravel() if niveles_feature else np.zeros(0)).astype(np.intp)
+        self.umbral = np.hstack(niveles_umbral).ravel() if niveles_umbral else np.zeros(0, dtype=np.float32)
+        self.default_izq = np.hstack(niveles_default).ravel() if niveles_default else np.zeros(0, dtype=bool)
+        self.hojas = valor[posiciones].ravel()
+        self.desplazamiento_nodos = np.arange(n_arboles) * self.nodos_internos
+        self.desplazamiento_hojas = np.arange(n_arboles) * 2 ** self.profundidad
+
+    def _predecir_bloque(self, X):
+        n = len(X)
+        # X por columnas y aplanado: el valor de la variable f en la fila r
+        # está en f * n + r, así se obtiene con un solo `np.take`.
+        X_columnas = np.ascontiguousarray(X.T).ravel()
+        filas = np.arange(n)[:, None]
+        hay_nan = np.isnan(X).any()
+
+        nodos = np.zeros((n, len(self.desplazamiento_nodos)), dtype=np.intp)
+        for _ in range(self.profundidad):
+            indice = nodos + self.desplazamiento_nodos
+            posicion_x = np.take(self.feature, indice)
+            posicion_x *= n
+            posicion_x += filas
+            x = np.take(X_columnas, posicion_x)
+            # "ir a la derecha" equivale a not (x < umbral); con NaN manda default_izq.
+            ir_derecha = np.take(self.umbral, indice) <= x
+            if hay_nan:
+                ir_derecha = np.where(np.isnan(x), ~np.take(self.default_izq, indice), ir_derecha)
+            nodos *= 2
+            nodos += 1
+            nodos += ir_derecha
+        # Al final `nodos` está en el último nivel: lo pasamos a índice de hoja.
+        hojas = np.take(self.hojas, nodos - self.nodos_internos + self.desplazamiento_hojas)
+
+        salida = np.empty((len(X), len(self.base_score)), dtype=np.float32)
+        for i, (inicio, fin) in enumerate(zip(self.inicio_modelos, self.fin_modelos)):
+            # XGBoost parte del base_score y suma los árboles en orden en float32;
+            # cumsum también acumula en orden, así el resultado coincide.
+            base = np.full((len(X), 1), self.base_score[i], dtype=np.float32)
+            salida[:, i] = np.cumsum(np.hstack([base, hojas[:, inicio:fin]]), axis=1, dtype=np.float32)[:, -1]
+        return salida
+
+    def predecir(self, input_array):
+        """
+        Evalúa los 4 modelos sobre el lote.
+
+        Args:
+            input_array (array-like): Lote (N, 4) con [areaAn, sexo, edadHTs, edadventa].
+
+        Returns:
+            np.ndarray: Array (N, 4) float32 con [porcMort, porcConsumo, ica, pesoProm].
+        """
+        X = np.asarray(input_array, dtype=np.float32)
+        salida = np.empty((len(X), len(self.base_score)), dtype=np.float32)
+        for inicio in range(0, len(X), FILAS_POR_BLOQUE):
+            salida[inicio:inicio + FILAS_POR_BLOQUE] = self._predecir_bloque(X[inicio:inicio + FILAS_POR_BLOQUE])
+        return salida
+
+
+if __name__ == '__main__':
+    # Exporta los árboles de los modelos actuales (necesita xgboost):
+    #   python -m src.predictores.arboles_numpy
+    # El nombre del .npz lleva la versión de los .pkl: hay que volver a
+    # ejecutarlo (y commitear el archivo nuevo) cada vez que cambia un modelo.
+    from src.predictores.predicciones_ML import obtener_modelos, version_modelos
+
+    ruta = ruta_arboles(version_modelos())
+    exportar_arboles(obtener_modelos(), ruta)
+    print(f'Árboles exportados en {ruta}')
@@ -0,0 +1,113 @@
+# src/predictores/cache_predicciones.py
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.predictores.predicciones_ML import MODELOS_ML, monitor_entradas, predict_all, version_modelos
+from src.predictores.registro_modelos import registro
+
+# --- 1. CACHÉ LRU DE PREDICCIONES ---
+# El formulario de una fila vuelve a pedir casi siempre las mismas
+# combinaciones de área/sexo/edades, y cada rerun de Streamlit las
+# recalcula. Esta caché es única por proceso (compartida por todas las
+# sesiones), descarta la entrada menos usada cuando se llena y se invalida
+# sola cuando el registro recarga un modelo.
+
+TAMANO_CACHE = int(os.getenv('PREDICCION_CACHE_TAMANO', '1024'))
+
+
+class CachePredicciones:
+    """Caché LRU thread-safe con contadores de aciertos y fallos."""
+
+    def __init__(self, tamano_max=TAMANO_CACHE):
+        self.tamano_max = tamano_max
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado (o None) y lo marca como usado recientemente."""
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano_max:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        """Dict con tamaño, aciertos, fallos y tasa de aciertos."""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._datos),
+                'tamano_max': self.tamano_max,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0,
+                'invalidaciones': self.invalidaciones,
+            }
+
+
+# Caché única del proceso.
+cache = CachePredicciones()
+
+
+def _invalidar_si_es_modelo_ml(nombre):
+    if nombre in MODELOS_ML:
+        cache.limpiar()
+
+
+registro.al_recargar(_invalidar_si_es_modelo_ml)
+
+
+def _normalizar(data_batch):
+    """Convierte la entrada a una tupla de tuplas de float (hasheable y estable)."""
+    return tuple(tuple(float(v) for v in fila) for fila in np.asarray(data_batch, dtype=np.float64))
+
+
+def predict_all_cacheado(data_batch):
+    """
+    Igual que `predict_all`, pero consulta primero la caché.
+
+    Pensado para el formulario de una fila (lotes pequeños); la clave incluye
+    la versión de los modelos, así que un modelo nuevo nunca devuelve
+    resultados viejos.
+
+    Returns:
+        pd.DataFrame: Copia del resultado (se puede modificar sin afectar la caché).
+    """
+    try:
+        clave = (version_modelos(), _normalizar(data_batch))
+    except FileNotFoundError:
+        # Sin modelos no hay versión: predict_all se encarga de avisar.
+        return predict_all(data_batch)
+    resultado = cache.obtener(clave)
+    if resultado is not None:
+        # Un acierto también es una entrada real para el monitor de deriva.
+        monitor_entradas.observar(np.asarray(data_batch))
+    else:
+        resultado = predict_all(data_batch)
+        if resultado.empty:
+            # Si los modelos no cargaron no guardamos nada.
+            return resultado
+        cache.guardar(clave, resultado)
+    return resultado.copy()
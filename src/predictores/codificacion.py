@@ -0,0 +1,84 @@
+# src/predictores/codificacion.py
+
+import numpy as np
+import pandas as pd
+
+# --- 1. MAPEOS DE VARIABLES CATEGÓRICAS ---
+# Fuente única de los códigos que esperan los modelos ML. Los usan tanto el
+# formulario de una fila como la carga de archivos.
+SEXO_MAP = {'Ma': 1, 'He': 0}
+AREA_MAP = {
+    'Calidad': 1, 'I. Respiratoria': 2, 'S. esquelético': 3,
+    'I. Intestinal': 4, 'Coccidia': 5, 'C. tóxico': 6,
+    'C. metabólico': 7, 'S. Inmunitario': 8
+}
+
+# Orden de las columnas que reciben los modelos: [areaAn, sexo, edadHTs, edadventa].
+COLUMNAS_ENTRADA = ['Area', 'Sexo', 'Edad HTS', 'Edad Granja']
+
+
+def codificar_columna(serie, mapa):
+    """
+    Convierte una columna de texto a códigos numéricos en una sola pasada.
+
+    En vez de aplicar `.astype(str).str.strip().map(...)` fila por fila, se
+    factoriza la columna (los valores distintos son muy pocos), se limpian y
+    mapean solo los valores únicos y luego se expanden con los códigos.
+
+    Returns:
+        np.ndarray: Array float32 con el código de cada fila (NaN si el valor
+            no está en el mapa).
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    valores = np.array([mapa.get(str(valor).strip(), np.nan) for valor in unicos] + [np.nan], dtype=np.float32)
+    # Los nulos vienen con código -1, que apunta al NaN agregado al final.
+    return valores[codigos]
+
+
+def codificar_lote(df):
+    """
+    Codifica un DataFrame con las columnas de COLUMNAS_ENTRADA para los modelos.
+
+    Args:
+        df (pd.DataFrame): Debe tener 'Area', 'Sexo', 'Edad HTS' y 'Edad Granja'.
+
+    Returns:
+        tuple: (X, errores)
+            X: array (N, 4) float32 contiguo, listo para `predict_all`.
+            errores: dict {columna: array con las posiciones (0..N-1) de las
+                filas cuyo valor no se reconoció}. Solo incluye columnas con errores.
+    """
+    X = np.empty((len(df), len(COLUMNAS_ENTRADA)), dtype=np.float32)
+    X[:, 0] = codificar_columna(df['Area'], AREA_MAP)
+    X[:, 1] = codificar_columna(df['Sexo'], SEXO_MAP)
+    X[:, 2] = pd.to_numeric(df['Edad HTS'], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    X[:, 3] = pd.to_numeric(df['Edad Granja'], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+
+    errores = {}
+    nulos = np.isnan(X)
+    if nulos.any():
+        for i, columna in enumerate(COLUMNAS_ENTRADA):
+            filas = np.flatnonzero(nulos[:, i])
+            if len(filas):
+                errores[columna] = filas
+    return X, errores
+
+
+def codificar_fila(area, sexo, edad_hts, edad_venta):
+    """
+    Codifica los valores del formulario de una sola fila.
+
+    Returns:
+        np.ndarray: Array (1, 4) float32 listo para `predict_all`.
+
+    Raises:
+        ValueError: Si el área o el sexo no están en los mapeos.
+    """
+    if area not in AREA_MAP:
+        raise ValueError(f"Área no reconocida: '{area}'. Valores válidos: {list(AREA_MAP.keys())}")
+    if sexo not in SEXO_MAP:
+        raise ValueError(f"Sexo no reconocido: '{sexo}'. Valores válidos: {list(SEXO_MAP.keys())}")
+    return np.array([[AREA_MAP[area], SEXO_MAP[sexo], edad_hts, edad_venta]], dtype=np.float32)
@@ -0,0 +1,74 @@
+# src/predictores/deduplicacion.py
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --- 1. DEDUPLICACIÓN DE FILAS DE ENTRADA ---
+# Las entradas vienen de un dominio chico (las áreas de AREA_MAP, 2 sexos,
+# 4 edades HTS y edades de granja enteras), así que los archivos reales
+# repiten muchas combinaciones. `predict_all` evalúa los modelos solo sobre
+# las filas únicas y después expande el resultado con el índice inverso.
+#
+# np.unique(axis=0) ordena filas completas, lo que es lento con lotes
+# grandes; aquí se factoriza columna por columna con pandas (tablas hash) y
+# los códigos se combinan de a pares, refactorizando en cada paso para que
+# la clave nunca supere el número de filas. El efecto en `predict_all` se
+# mide con `python -m benchmarks.suite --casos deduplicacion`.
+
+
+def filas_unicas(X):
+    """
+    Factoriza un lote 2D en filas únicas más un índice inverso.
+
+    Returns:
+        tuple: (unicas, inversa) con `unicas[inversa]` igual a X. Las filas
+            únicas quedan en el orden de su primera aparición.
+    """
+    X = np.asarray(X)
+    clave = None
+    for j in range(X.shape[1]):
+        # use_na_sentinel=False: NaN es un valor más y no choca con otros códigos.
+        codigos, valores = pd.factorize(X[:, j], use_na_sentinel=False)
+        if clave is None:
+            clave = codigos.astype(np.int64)
+        else:
+            clave, _ = pd.factorize(clave * len(valores) + codigos)
+    if clave is None:
+        return X, np.zeros(len(X), dtype=np.int64)
+
+    # Como la clave se numera por orden de aparición, la primera fila de
+    # cada grupo se obtiene recorriendo al revés (la última escritura gana).
+    n_unicas = int(clave.max()) + 1 if len(clave) else 0
+    primeras = np.empty(n_unicas, dtype=np.int64)
+    primeras[clave[::-1]] = np.arange(len(clave) - 1, -1, -1)
+    return X[primeras], clave
+
+
+class EstadisticasDeduplicacion:
+    """Totales del proceso: filas recibidas por predict_all y filas únicas evaluadas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.filas = 0
+        self.filas_unicas = 0
+
+    def registrar(self, filas, filas_unicas):
+        with self._lock:
+            self.lotes += 1
+            self.filas += filas
+            self.filas_unicas += filas_unicas
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'lotes': self.lotes,
+                'filas': self.filas,
+                'filas_unicas': self.filas_unicas,
+                'proporcion_duplicadas': round(1 - self.filas_unicas / self.filas, 4) if self.filas else 0.0,
+            }
+
+
+estadisticas_dedup = EstadisticasDeduplicacion()
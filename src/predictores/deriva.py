@@ -0,0 +1,375 @@
+# src/predictores/deriva.py
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.predictores.registro_modelos import registro
+
+# --- 1. MONITOR DE DERIVA DE LAS ENTRADAS ---
+# Si los datos de las granjas se alejan de los de entrenamiento, las
+# predicciones empeoran sin ningún aviso. Cada llamada a `predict_all` y a
+# `predecir_dl` suma sus entradas a histogramas por variable y por área, con
+# bordes fijos tomados de una distribución de referencia guardada junto a
+# los modelos (modelosPkl/.../referencia_entradas.npz). La memoria no crece:
+# son arreglos (áreas x variables x cubetas), y lo viejo pierde peso con una
+# vida media de DERIVA_VIDA_MEDIA_FILAS filas, así que los histogramas
+# reflejan los datos recientes.
+#
+# La comparación (PSI por variable, fracción fuera del rango de referencia)
+# se calcula solo cuando se consulta, no en cada predicción. Las
+# referencias se arman con `python -m src.predictores.deriva referencia`.
+
+ACTIVO = os.getenv('DERIVA_MONITOR', '1') == '1'
+VIDA_MEDIA_FILAS = float(os.getenv('DERIVA_VIDA_MEDIA_FILAS', '100000'))
+# Filas (efectivas) mínimas de un grupo para evaluar su deriva.
+MIN_FILAS = float(os.getenv('DERIVA_MIN_FILAS', '200'))
+# En lotes más grandes se observa una muestra (con peso) de este tamaño.
+MAX_FILAS_OBSERVADAS = 20_000
+CUBETAS = 20
+# Umbrales usuales del PSI y de la fracción fuera de rango.
+PSI_MODERADA = 0.1
+PSI_ALTA = 0.25
+FUERA_DE_RANGO_MAX = 0.01
+NIVELES = ('estable', 'moderada', 'alta')
+NOMBRE_REFERENCIA = 'referencia_entradas.npz'
+# Segundos que se espera antes de volver a buscar una referencia que no existe.
+ESPERA_SIN_REFERENCIA = 5.0
+
+
+def _bordes(valores, cubetas):
+    """
+    Bordes de las cubetas de una variable: los valores distintos si son
+    pocos (variables categóricas) o sus cuantiles. Se agrega un borde justo
+    por encima del máximo, así la primera y la última cubeta quedan fuera
+    del rango de referencia.
+    """
+    valores = valores[~np.isnan(valores)]
+    unicos = np.unique(valores)
+    if len(unicos) > cubetas:
+        unicos = np.unique(np.quantile(valores, np.linspace(0, 1, cubetas + 1), method='lower'))
+    return np.append(unicos, np.nextafter(unicos[-1], np.inf))
+
+
+def _contar(X, bordes, areas, n_areas, pesos=None):
+    """
+    Histograma (n_areas, variables, cubetas) de X. `bordes` es (variables,
+    E) con NaN de relleno; la cubeta de cada valor sale de searchsorted (los
+    NaN caen al final, fuera de rango).
+    """
+    n_variables, n_bordes = bordes.shape
+    cubetas = n_bordes + 1
+    indices = np.empty(X.shape, dtype=np.int64)
+    for j in range(n_variables):
+        indices[:, j] = np.searchsorted(bordes[j], X[:, j], side='right')
+    indices += (areas[:, None] * n_variables + np.arange(n_variables)) * cubetas
+    conteo = np.bincount(indices.ravel(), weights=None if pesos is None else np.repeat(pesos, n_variables),
+                         minlength=n_areas * n_variables * cubetas)
+    return conteo.reshape(n_areas, n_variables, cubetas).astype(np.float64)
+
+
+class Referencia:
+    """Distribución de referencia de las entradas de un modelo (ver `construir_referencia`)."""
+
+    def __init__(self, variables, columna_area, codigos_areas, nombres_areas, bordes, conteos, filas, creada):
+        self.variables = list(variables)
+        self.columna_area = int(columna_area)
+        self.codigos_areas = np.asarray(codigos_areas, dtype=np.float64)
+        self.nombres_areas = [str(nombre) for nombre in nombres_areas]
+        self.bordes = np.asarray(bordes, dtype=np.float64)
+        self.conteos = np.asarray(conteos, dtype=np.float64)
+        self.filas = int(filas)
+        self.creada = str(creada)
+        # Última cubeta dentro del rango de cada variable.
+        self.ultima_en_rango = np.count_nonzero(~np.isnan(self.bordes), axis=1) - 1
+
+    def indice_area(self, codigos):
+        """Posición de cada código de área; las áreas desconocidas van a la posición extra."""
+        posiciones = np.searchsorted(self.codigos_areas, codigos).clip(0, len(self.codigos_areas) - 1)
+        return np.where(self.codigos_areas[posiciones] == codigos, posiciones, len(self.codigos_areas))
+
+    def guardar(self, ruta):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        # Escritura atómica: la app puede estar leyéndola (se recarga sola al cambiar).
+        temporal = f'{ruta}.tmp.npz'
+        np.savez(
+            temporal, variables=np.array(self.variables), columna_area=self.columna_area,
+            codigos_areas=self.codigos_areas, nombres_areas=np.array(self.nombres_areas),
+            bordes=self.bordes, conteos=self.conteos, filas=self.filas, creada=self.creada,
+        )
+        os.replace(temporal, ruta)
+
+
+def cargar_referencia(ruta):
+    with np.load(ruta, allow_pickle=False) as datos:
+        return Referencia(**{clave: datos[clave] for clave in datos.files})
+
+
+def construir_referencia(X, variables, columna_area, nombres_areas, cubetas=CUBETAS):
+    """
+    Arma la referencia a partir de las entradas de entrenamiento.
+
+    Args:
+        X (np.ndarray): Entradas (N, variables) ya codificadas; las filas con NaN se descartan.
+        variables (list): Nombre de cada columna.
+        columna_area (int): Columna con el código de área.
+        nombres_areas (dict): {código: nombre} para mostrar.
+        cubetas (int): Cubetas máximas por variable.
+
+    Returns:
+        Referencia
+    """
+    X = np.asarray(X, dtype=np.float64)
+    X = X[~np.isnan(X).any(axis=1)]
+    if not len(X):
+        raise ValueError('No hay filas completas para armar la referencia.')
+    bordes_por_variable = [_bordes(X[:, j], cubetas) for j in range(X.shape[1])]
+    bordes = np.full((X.shape[1], max(len(b) for b in bordes_por_variable)), np.nan)
+    for j, b in enumerate(bordes_por_variable):
+        bordes[j, :len(b)] = b
+    codigos = np.unique(X[:, columna_area])
+    areas = np.searchsorted(codigos, X[:, columna_area])
+    return Referencia(
+        variables, columna_area, codigos, [nombres_areas.get(int(c), str(int(c))) for c in codigos],
+        bordes, _contar(X, bordes, areas, len(codigos)), len(X), datetime.now().strftime('%Y-%m-%d %H:%M'),
+    )
+
+
+def _psi(observado, referencia, epsilon=1e-4):
+    p = np.maximum(observado / observado.sum(), epsilon)
+    q = np.maximum(referencia / referencia.sum(), epsilon)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+class MonitorDeriva:
+    """
+    Histogramas de las entradas de un modelo, por área, comparables con su referencia.
+
+    Args:
+        modelo (str): Nombre para mostrar ('ML', 'DL').
+        nombre_registro (str): Nombre de la referencia en el registro de modelos.
+        ruta (str): Archivo .npz de la referencia.
+        activo (bool): Con False, `observar` no hace nada.
+        vida_media_filas (float): Filas tras las cuales lo observado pesa la mitad.
+    """
+
+    def __init__(self, modelo, nombre_registro, ruta, activo=ACTIVO, vida_media_filas=VIDA_MEDIA_FILAS):
+        self.modelo = modelo
+        self.nombre_registro = nombre_registro
+        self.ruta = ruta
+        self.activo = activo
+        self.vida_media_filas = vida_media_filas
+        self._lock = threading.Lock()
+        self._referencia_actual = None
+        self._sin_referencia_hasta = 0.0
+        self._avisado_sin_referencia = False
+        self._rng = np.random.default_rng()
+        self.conteos = None
+        self.filas_observadas = 0
+        self.llamadas = 0
+        registro.registrar(nombre_registro, ruta, cargar=cargar_referencia)
+
+    def referencia(self):
+        """Referencia actual (se recarga si cambia el archivo) o None si no existe."""
+        if time.monotonic() < self._sin_referencia_hasta:
+            return None
+        try:
+            return registro.obtener(self.nombre_registro)
+        except FileNotFoundError:
+            self._sin_referencia_hasta = time.monotonic() + ESPERA_SIN_REFERENCIA
+            if not self._avisado_sin_referencia:
+                # Sin referencia el monitor no mide nada: se avisa una vez por proceso.
+                self._avisado_sin_referencia = True
+                print(f"ADVERTENCIA: Deriva {self.modelo} desactivada, no existe {self.ruta}. Se arma con "
+                      f"`python -m src.predictores.deriva referencia {self.modelo.lower()} <datos de entrenamiento>`.")
+            return None
+
+    def observar(self, X, pesos=None):
+        """
+        Suma un lote de entradas (N, variables) a los histogramas.
+
+        Args:
+            pesos (array, opcional): Cantidad de veces que representa cada
+                fila (p. ej. filas únicas de un lote deduplicado).
+        """
+        if not self.activo:
+            return
+        referencia = self.referencia()
+        if referencia is None or not len(X):
+            return
+        X = np.asarray(X)
+        filas = len(X) if pesos is None else float(np.sum(pesos))
+        if len(X) > MAX_FILAS_OBSERVADAS:
+            muestra = self._rng.integers(0, len(X), MAX_FILAS_OBSERVADAS)
+            X = X[muestra]
+            if pesos is None:
+                pesos = np.full(MAX_FILAS_OBSERVADAS, filas / MAX_FILAS_OBSERVADAS)
+            else:
+                pesos = np.asarray(pesos, dtype=np.float64)[muestra]
+                pesos *= filas / pesos.sum()
+        areas = referencia.indice_area(X[:, referencia.columna_area])
+        conteo = _contar(X, referencia.bordes, areas, len(referencia.codigos_areas) + 1, pesos)
+
+        with self._lock:
+            if self._referencia_actual is not referencia:
+                # Referencia nueva (o recargada): los bordes cambiaron, se empieza de cero.
+                self._referencia_actual = referencia
+                self.conteos = np.zeros_like(conteo)
+            self.conteos *= 0.5 ** (filas / self.vida_media_filas)
+            self.conteos += conteo
+            self.filas_observadas += int(filas)
+            self.llamadas += 1
+
+    def limpiar(self):
+        with self._lock:
+            self.conteos = None
+            self._referencia_actual = None
+            self.filas_observadas = 0
+            self.llamadas = 0
+
+    def evaluar(self, min_filas=MIN_FILAS):
+        """
+        Compara lo observado con la referencia, para todas las áreas juntas
+        y para cada área con al menos `min_filas` filas efectivas.
+
+        Returns:
+            pd.DataFrame: Columnas 'modelo', 'area', 'variable', 'filas'
+                (efectivas, con el decaimiento), 'psi', 'fuera_de_rango' y
+                'nivel' (uno de NIVELES). Vacío si no hay referencia o datos.
+        """
+        referencia = self.referencia()
+        with self._lock:
+            if referencia is None or self.conteos is None or self._referencia_actual is not referencia:
+                return pd.DataFrame()
+            observado = self.conteos.copy()
+
+        grupos = [('Todas', observado.sum(axis=0), referencia.conteos.sum(axis=0))]
+        grupos += [(nombre, observado[i], referencia.conteos[i]) for i, nombre in enumerate(referencia.nombres_areas)]
+        filas = []
+        for area, obs, ref in grupos:
+            total = obs[0].sum()
+            if total < min_filas:
+                continue
+            for j, variable in enumerate(referencia.variables):
+                if area != 'Todas' and j == referencia.columna_area:
+                    continue
+                if not ref[j].sum():
+                    continue
+                psi = _psi(obs[j], ref[j])
+                fuera = (obs[j, 0] + obs[j, referencia.ultima_en_rango[j] + 1:].sum()) / total
+                nivel = 2 if psi >= PSI_ALTA else 1 if psi >= PSI_MODERADA or fuera > FUERA_DE_RANGO_MAX else 0
+                filas.append({
+                    'modelo': self.modelo, 'area': area, 'variable': variable, 'filas': round(float(total)),
+                    'psi': round(psi, 4), 'fuera_de_rango': round(float(fuera), 4), 'nivel': NIVELES[nivel],
+                })
+        return pd.DataFrame(filas)
+
+    def alertas(self, nivel_minimo='moderada'):
+        """Filas de `evaluar` con nivel `nivel_minimo` o peor, de mayor a menor PSI."""
+        evaluacion = self.evaluar()
+        if evaluacion.empty:
+            return evaluacion
+        minimo = NIVELES.index(nivel_minimo)
+        alertas = evaluacion[evaluacion['nivel'].map(NIVELES.index) >= minimo]
+        return alertas.sort_values('psi', ascending=False, ignore_index=True)
+
+    def estadisticas(self):
+        referencia = self.referencia()
+        return {
+            'activo': self.activo,
+            'referencia': None if referencia is None else f'{referencia.filas:,} filas ({referencia.creada})',
+            'llamadas': self.llamadas,
+            'filas_observadas': self.filas_observadas,
+        }
+
+
+def mostrar_alertas(monitor, maximo=3):
+    """Avisos de Streamlit para las variables con deriva (las `maximo` de mayor PSI)."""
+    import streamlit as st
+
+    alertas = monitor.alertas()
+    for fila in alertas.head(maximo).itertuples():
+        aviso = st.error if fila.nivel == 'alta' else st.warning
+        aviso(f"⚠️ Deriva {fila.nivel} en las entradas ({monitor.modelo}): '{fila.variable}' en {fila.area} "
+              f"(PSI {fila.psi:.2f}, {fila.fuera_de_rango:.1%} fuera del rango de entrenamiento). "
+              "Las predicciones pueden ser menos confiables.")
+    if len(alertas) > maximo:
+        st.caption(f"… y {len(alertas) - maximo} alertas de deriva más (ver '📉 Deriva de entradas').")
+
+
+def panel_deriva(contenedor, *monitores):
+    """Expander con el estado de la deriva de cada monitor."""
+    expander = contenedor.expander('📉 Deriva de entradas')
+    for monitor in monitores:
+        estado = monitor.estadisticas()
+        if estado['referencia'] is None:
+            expander.caption(
+                f"{monitor.modelo}: sin referencia ({monitor.ruta}). Se arma con "
+                f"`python -m src.predictores.deriva referencia {monitor.modelo.lower()} <datos de entrenamiento>`."
+            )
+            continue
+        evaluacion = monitor.evaluar()
+        expander.markdown(f"**{monitor.modelo}** · referencia de {estado['referencia']}")
+        if evaluacion.empty:
+            expander.caption(f"Todavía no hay {MIN_FILAS:,.0f} filas observadas para comparar.")
+        else:
+            expander.dataframe(evaluacion.drop(columns='modelo'), hide_index=True)
+
+
+def _leer_tabla(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return pd.read_parquet(ruta)
+    if extension in ('.xlsx', '.xlsm'):
+        return pd.read_excel(ruta)
+    return pd.read_csv(ruta)
+
+
+if __name__ == '__main__':
+    # Referencias a partir de los datos de entrenamiento (mismas columnas que
+    # un archivo subido en app.py o en app2.py), y revisión de un archivo:
+    #   python -m src.predictores.deriva referencia ml entrenamiento.csv
+    #   python -m src.predictores.deriva referencia dl entrenamiento_9vars.xlsx
+    #   python -m src.predictores.deriva evaluar ml lote_nuevo.csv
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Referencias y deriva de las entradas de los modelos.')
+    parser.add_argument('comando', choices=['referencia', 'evaluar'])
+    parser.add_argument('modelo', choices=['ml', 'dl'])
+    parser.add_argument('archivo', help='Archivo .csv, .xlsx o .parquet.')
+    parser.add_argument('--cubetas', type=int, default=CUBETAS)
+    args = parser.parse_args()
+
+    df = _leer_tabla(args.archivo)
+    if args.modelo == 'ml':
+        from src.predictores.codificacion import AREA_MAP, COLUMNAS_ENTRADA, SEXO_MAP, codificar_columna
+        from src.predictores.predicciones_ML import monitor_entradas as monitor
+
+        X = np.column_stack([
+            codificar_columna(df['Area'], AREA_MAP), codificar_columna(df['Sexo'], SEXO_MAP),
+            pd.to_numeric(df['Edad HTS'], errors='coerce'), pd.to_numeric(df['Edad Granja'], errors='coerce'),
+        ])
+        variables, columna_area = COLUMNAS_ENTRADA, 0
+        nombres_areas = {codigo: nombre for nombre, codigo in AREA_MAP.items()}
+    else:
+        from src.predictores.predicciones_DL import FEATURES, codificar_lote_dl, obtener_le_area
+        from src.predictores.predicciones_DL import monitor_entradas as monitor
+
+        le_area = obtener_le_area()
+        X, _ = codificar_lote_dl(df, le_area)
+        variables, columna_area = FEATURES, FEATURES.index('Area')
+        nombres_areas = dict(enumerate(le_area.classes_))
+
+    if args.comando == 'referencia':
+        referencia = construir_referencia(X, variables, columna_area, nombres_areas, args.cubetas)
+        referencia.guardar(monitor.ruta)
+        print(f'Referencia de {referencia.filas:,} filas guardada en {monitor.ruta}.')
+    else:
+        monitor.activo = True
+        monitor.observar(X[~np.isnan(X).any(axis=1)])
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(monitor.evaluar(min_filas=1))
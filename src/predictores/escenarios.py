@@ -0,0 +1,99 @@
+# src/predictores/escenarios.py
+
+import numpy as np
+import pandas as pd
+
+from src.predictores.codificacion import codificar_fila
+from src.predictores.predicciones_ML import predict_all
+
+# --- 1. ESCENARIOS "QUÉ PASA SI" ---
+# En vez de probar una edad de granja por vez con el formulario (un rerun
+# por valor), se arma la grilla completa edad HTS x edad de granja para un
+# área y un sexo fijos y se evalúa en una sola llamada a `predict_all`.
+# El resultado es una tabla "larga" (una fila por escenario) lista para
+# graficar curvas, más los extremos del ICA por edad HTS.
+
+EDADES_HTS = (14, 21, 28, 35)
+COLUMNAS_PREDICCION = ['prePorcMort', 'prePorcCon', 'preICA', 'prePeProFin']
+# Límite de escenarios por llamada, para acotar la memoria de la app
+# (la grilla completa del formulario, 4 x 5001, queda muy por debajo).
+MAX_ESCENARIOS = 1_000_000
+
+
+def predict_grid(area, sexo, edades_venta, edades_hts=EDADES_HTS, **opciones):
+    """
+    Predice todas las combinaciones de `edades_hts` x `edades_venta` para
+    un área y un sexo fijos, en una sola llamada a `predict_all`.
+
+    Args:
+        area (str): Área de la granja (clave de AREA_MAP).
+        sexo (str): Sexo de los pollos (clave de SEXO_MAP).
+        edades_venta (iterable): Edades de venta (granja) a evaluar, p. ej. range(30, 51).
+        edades_hts (iterable): Edades al sacrificio (HTS) a evaluar.
+        **opciones: Se pasan a `predict_all` (modo_tabla, motor, n_workers...).
+            La grilla no se suma al monitor de deriva: no son datos de granjas.
+
+    Returns:
+        pd.DataFrame: Una fila por escenario con 'Area', 'Sexo', 'Edad HTS',
+            'Edad Granja' y las 4 predicciones, ordenada por edad HTS y edad
+            de granja (vacío si los modelos no están disponibles).
+
+    Raises:
+        ValueError: Si el área o el sexo no existen, algún rango está vacío
+            o la grilla supera MAX_ESCENARIOS.
+    """
+    base = codificar_fila(area, sexo, 0, 0)[0]
+    edades_hts = np.asarray(list(edades_hts), dtype=np.float32)
+    edades_venta = np.asarray(list(edades_venta), dtype=np.float32)
+    if not len(edades_hts) or not len(edades_venta):
+        raise ValueError("Los rangos de 'Edad HTS' y 'Edad Granja' no pueden estar vacíos.")
+    n = len(edades_hts) * len(edades_venta)
+    if n > MAX_ESCENARIOS:
+        raise ValueError(f"La grilla tiene {n:,} escenarios; el máximo es {MAX_ESCENARIOS:,}.")
+
+    # Producto cartesiano: edad HTS varía más lento que la edad de granja.
+    X = np.empty((n, 4), dtype=np.float32)
+    X[:, 0] = base[0]
+    X[:, 1] = base[1]
+    X[:, 2] = np.repeat(edades_hts, len(edades_venta))
+    X[:, 3] = np.tile(edades_venta, len(edades_hts))
+
+    predicciones = predict_all(X, **{'monitorear': False, **opciones})
+    if predicciones.empty:
+        return pd.DataFrame()
+
+    curvas = pd.DataFrame({
+        'Area': area,
+        'Sexo': sexo,
+        'Edad HTS': X[:, 2].astype(int),
+        'Edad Granja': X[:, 3],
+    })
+    if np.all(edades_venta == np.round(edades_venta)):
+        curvas['Edad Granja'] = curvas['Edad Granja'].astype(int)
+    for columna in COLUMNAS_PREDICCION:
+        curvas[columna] = predicciones[columna].to_numpy()
+    return curvas
+
+
+def extremos_ica(curvas):
+    """
+    Escenarios con el menor y el mayor ICA para cada edad HTS.
+
+    Args:
+        curvas (pd.DataFrame): Resultado de `predict_grid`.
+
+    Returns:
+        pd.DataFrame: Columnas 'Edad HTS', 'criterio' ('min' o 'max'),
+            'Edad Granja' y las 4 predicciones de ese escenario. Si hay
+            empate se toma la menor edad de granja.
+    """
+    if curvas.empty:
+        return pd.DataFrame()
+    grupos = curvas.groupby('Edad HTS')['preICA']
+    extremos = []
+    for criterio, indices in (('min', grupos.idxmin()), ('max', grupos.idxmax())):
+        filas = curvas.loc[indices.to_numpy(), ['Edad HTS', 'Edad Granja'] + COLUMNAS_PREDICCION]
+        extremos.append(filas.assign(criterio=criterio))
+    resultado = pd.concat(extremos, ignore_index=True)
+    columnas = ['Edad HTS', 'criterio', 'Edad Granja'] + COLUMNAS_PREDICCION
+    return resultado[columnas].sort_values('Edad HTS', kind='stable', ignore_index=True)
@@ -0,0 +1,206 @@
+# src/predictores/microlotes.py
+
+import bisect
+import queue
+import threading
+import time
+
+import numpy as np
+
+# --- 1. AGRUPADOR DE MICROLOTES ---
+# Cuando llegan muchas peticiones de una fila al mismo tiempo, evaluar el
+# modelo una vez por petición desperdicia casi todo el tiempo en overhead.
+# El agrupador junta las peticiones que llegan dentro de una ventana corta
+# (o hasta completar `max_lote` filas), llama al modelo una sola vez con
+# todas ellas y reparte las filas de resultado a cada petición.
+
+
+class Saturado(Exception):
+    """Hay demasiadas filas esperando: el cliente debe reintentar más tarde."""
+
+
+class PeticionDemasiadoGrande(Exception):
+    """La petición sola supera `max_pendientes`: reintentarla nunca va a funcionar."""
+
+
+class HistogramaLatencia:
+    """Histograma thread-safe de latencias con cubetas fijas (en milisegundos)."""
+
+    CUBETAS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self._conteos = [0] * (len(self.CUBETAS_MS) + 1)
+        self._total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos):
+        ms = segundos * 1000
+        with self._lock:
+            self._conteos[bisect.bisect_left(self.CUBETAS_MS, ms)] += 1
+            self._total_ms += ms
+
+    def percentil(self, p):
+        """Límite superior de la cubeta donde cae el percentil `p` (0-100)."""
+        with self._lock:
+            total = sum(self._conteos)
+            if total == 0:
+                return None
+            objetivo = total * p / 100
+            acumulado = 0
+            for limite, conteo in zip(self.CUBETAS_MS + (float('inf'),), self._conteos):
+                acumulado += conteo
+                if acumulado >= objetivo:
+                    return limite
+
+    def resumen(self):
+        with self._lock:
+            conteos = list(self._conteos)
+            total_ms = self._total_ms
+        total = sum(conteos)
+        etiquetas = [f'<={c}ms' for c in self.CUBETAS_MS] + [f'>{self.CUBETAS_MS[-1]}ms']
+        return {
+            'peticiones': total,
+            'promedio_ms': round(total_ms / total, 3) if total else None,
+            'p50_ms': self.percentil(50),
+            'p95_ms': self.percentil(95),
+            'p99_ms': self.percentil(99),
+            'cubetas': dict(zip(etiquetas, conteos)),
+        }
+
+
+class _Peticion:
+    __slots__ = ('filas', 'resultado', 'error', 'listo', 'cancelada', 'llegada')
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.resultado = None
+        self.error = None
+        self.listo = threading.Event()
+        self.cancelada = False
+        self.llegada = time.perf_counter()
+
+
+class AgrupadorMicrolotes:
+    """
+    Junta peticiones concurrentes en microlotes y las evalúa juntas.
+
+    Args:
+        funcion (callable): Recibe un array (N, d) y devuelve un array (N, k).
+        ventana (float): Segundos que se espera a más peticiones después de la primera.
+        max_lote (int): Máximo de filas por llamada a `funcion`.
+        max_pendientes (int): Filas en espera a partir de las cuales se rechazan
+            peticiones nuevas con `Saturado` (contrapresión).
+        nombre (str): Nombre del hilo trabajador.
+    """
+
+    def __init__(self, funcion, ventana=0.005, max_lote=512, max_pendientes=4096, nombre='microlotes'):
+        self.funcion = funcion
+        self.ventana = ventana
+        self.max_lote = max_lote
+        self.max_pendientes = max_pendientes
+
+        self._cola = queue.Queue()
+        self._pendientes = 0
+        self._lock = threading.Lock()
+        self.latencia = HistogramaLatencia()
+        self.lotes = 0
+        self.filas_evaluadas = 0
+        self.rechazadas = 0
+        self.vencidas = 0
+
+        self._hilo = threading.Thread(target=self._trabajar, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def predecir(self, filas, timeout=2.0):
+        """
+        Encola las filas y espera su resultado.
+
+        Args:
+            filas (array-like): Array (n, d) con las filas de la petición.
+            timeout (float): Segundos máximos de espera.
+
+        Returns:
+            np.ndarray: Array (n, k) con el resultado de esas filas.
+
+        Raises:
+            PeticionDemasiadoGrande: Si la petición tiene más de `max_pendientes` filas.
+            Saturado: Si hay demasiadas filas en espera.
+            TimeoutError: Si el resultado no llega a tiempo.
+        """
+        filas = np.atleast_2d(np.asarray(filas))
+        if len(filas) > self.max_pendientes:
+            raise PeticionDemasiadoGrande(
+                f'La petición tiene {len(filas)} filas y el máximo por petición es {self.max_pendientes}'
+            )
+        with self._lock:
+            if self._pendientes + len(filas) > self.max_pendientes:
+                self.rechazadas += 1
+                raise Saturado(f'{self._pendientes} filas en espera')
+            self._pendientes += len(filas)
+
+        peticion = _Peticion(filas)
+        self._cola.put(peticion)
+        if not peticion.listo.wait(timeout):
+            # Si todavía no se evaluó, el trabajador la salta.
+            peticion.cancelada = True
+            with self._lock:
+                self.vencidas += 1
+            raise TimeoutError(f'Sin respuesta después de {timeout} s')
+        self.latencia.registrar(time.perf_counter() - peticion.llegada)
+        if peticion.error is not None:
+            raise peticion.error
+        return peticion.resultado
+
+    def _siguiente_lote(self):
+        lote = [self._cola.get()]
+        filas = len(lote[0].filas)
+        limite = time.perf_counter() + self.ventana
+        while filas < self.max_lote:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                peticion = self._cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            lote.append(peticion)
+            filas += len(peticion.filas)
+        return lote
+
+    def _trabajar(self):
+        while True:
+            lote = self._siguiente_lote()
+            vigentes = [p for p in lote if not p.cancelada]
+            try:
+                if vigentes:
+                    X = np.concatenate([p.filas for p in vigentes])
+                    Y = np.asarray(self.funcion(X))
+                    inicio = 0
+                    for peticion in vigentes:
+                        fin = inicio + len(peticion.filas)
+                        peticion.resultado = Y[inicio:fin]
+                        inicio = fin
+                    self.lotes += 1
+                    self.filas_evaluadas += len(X)
+            except Exception as e:
+                # Un error del modelo se devuelve a todas las peticiones del lote.
+                for peticion in vigentes:
+                    peticion.error = e
+            finally:
+                with self._lock:
+                    self._pendientes -= sum(len(p.filas) for p in lote)
+                for peticion in lote:
+                    peticion.listo.set()
+
+    def estadisticas(self):
+        with self._lock:
+            pendientes = self._pendientes
+        return {
+            'pendientes': pendientes,
+            'lotes': self.lotes,
+            'filas_evaluadas': self.filas_evaluadas,
+            'filas_por_lote': round(self.filas_evaluadas / self.lotes, 2) if self.lotes else None,
+            'rechazadas': self.rechazadas,
+            'vencidas': self.vencidas,
+            'latencia': self.latencia.resumen(),
+        }
@@ -0,0 +1,204 @@
+# src/predictores/mlp_numpy.py
+
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+
+# --- 1. RED MLP EXPORTADA A ARRAYS ---
+# El modelo .keras de app2 es una red densa pequeña (9 -> 128 -> 64 -> 32 -> 4).
+# Para predecir no hace falta TensorFlow: basta con multiplicar matrices.
+# El exportador lee los pesos directamente del .keras (un zip con
+# config.json y model.weights.h5) y los guarda en un .npz con los
+# escaladores ya incorporados:
+#
+#   X_escalado = (X - media_x) / escala_x   -> se absorbe en la 1ª capa:
+#       W0' = W0 / escala_x[:, None]      b0' = b0 - (media_x / escala_x) @ W0
+#   Y = Y_escalado * escala_y + media_y     -> se absorbe en la última capa:
+#       Wn' = Wn * escala_y                bn' = bn * escala_y + media_y
+#
+# Así el motor recibe las variables originales y devuelve los 4 objetivos
+# en su escala original. Las capas Dropout no hacen nada al predecir.
+
+DIRECTORIO_MLP = 'modelosPkl/DL_models'
+
+ACTIVACIONES = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'sigmoid': lambda x: np.reciprocal(1 + np.exp(-x)),
+}
+CAPAS_IGNORADAS = ('InputLayer', 'Dropout')
+
+# Filas por bloque al evaluar: limita la memoria de las activaciones intermedias.
+FILAS_POR_BLOQUE = 65536
+
+
+def ruta_mlp(version, directorio=DIRECTORIO_MLP):
+    """Devuelve la ruta del .npz exportado para una versión del modelo."""
+    return os.path.join(directorio, f'mlp_9vars_{version}.npz')
+
+
+def _leer_capas_keras(ruta_keras):
+    """
+    Lee las capas densas de un modelo Sequential guardado en formato .keras.
+
+    Returns:
+        list: Tuplas (pesos, sesgo, activacion) en float64, en orden.
+    """
+    import h5py  # Solo lo necesita la exportación.
+
+    with zipfile.ZipFile(ruta_keras) as archivo:
+        config = json.loads(archivo.read('config.json'))
+        pesos_h5 = io.BytesIO(archivo.read('model.weights.h5'))
+
+    if config['class_name'] != 'Sequential':
+        raise ValueError(f"Solo se exportan modelos Sequential, no '{config['class_name']}'.")
+
+    capas = []
+    with h5py.File(pesos_h5, 'r') as pesos:
+        for capa in config['config']['layers']:
+            tipo, ajustes = capa['class_name'], capa['config']
+            if tipo in CAPAS_IGNORADAS:
+                continue
+            if tipo != 'Dense' or ajustes['activation'] not in ACTIVACIONES:
+                raise ValueError(f"No se puede exportar la capa '{ajustes['name']}' ({tipo}, "
+                                 f"activación '{ajustes.get('activation')}').")
+            variables = pesos[f"layers/{ajustes['name']}/vars"]
+            W = np.asarray(variables['0'], dtype=np.float64)
+            b = np.asarray(variables['1'], dtype=np.float64) if ajustes['use_bias'] else np.zeros(W.shape[1])
+            capas.append((W, b, ajustes['activation']))
+    return capas
+
+
+def exportar_mlp(ruta_keras, X_scaler, y_scaler, ruta):
+    """
+    Exporta la red con los escaladores incorporados a un .npz.
+
+    Args:
+        ruta_keras (str): Modelo .keras (Sequential de capas Dense).
+        X_scaler, y_scaler: StandardScaler ajustados de la entrada y la salida.
+        ruta (str): Archivo .npz de destino.
+    """
+    capas = _leer_capas_keras(ruta_keras)
+
+    W, b, activacion = capas[0]
+    media_x, escala_x = np.asarray(X_scaler.mean_), np.asarray(X_scaler.scale_)
+    capas[0] = (W / escala_x[:, None], b - (media_x / escala_x) @ W, activacion)
+
+    W, b, activacion = capas[-1]
+    if activacion != 'linear':
+        raise ValueError("La última capa debe ser lineal para incorporar el escalador de salida.")
+    media_y, escala_y = np.asarray(y_scaler.mean_), np.asarray(y_scaler.scale_)
+    capas[-1] = (W * escala_y, b * escala_y + media_y, activacion)
+
+    arrays = {
+        'activaciones': np.array([activacion for _, _, activacion in capas]),
+        'entradas': np.asarray(getattr(X_scaler, 'feature_names_in_', []), dtype=str),
+        'salidas': np.asarray(getattr(y_scaler, 'feature_names_in_', []), dtype=str),
+    }
+    for i, (W, b, _) in enumerate(capas):
+        arrays[f'pesos_{i}'] = W.astype(np.float32)
+        arrays[f'sesgo_{i}'] = b.astype(np.float32)
+
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    ruta_tmp = f'{ruta}.{os.getpid()}.tmp.npz'
+    np.savez(ruta_tmp, **arrays)
+    os.replace(ruta_tmp, ruta)
+
+
+class MotorMLP:
+    """Evalúa la red exportada solo con NumPy (sin TensorFlow ni scikit-learn)."""
+
+    def __init__(self, ruta):
+        with np.load(ruta) as datos:
+            self.activaciones = [str(a) for a in datos['activaciones']]
+            self.capas = [
+                (datos[f'pesos_{i}'], datos[f'sesgo_{i}'], ACTIVACIONES[activacion])
+                for i, activacion in enumerate(self.activaciones)
+            ]
+            self.entradas = list(datos['entradas'])
+            self.salidas = list(datos['salidas'])
+
+    def _predecir_bloque(self, X):
+        h = X
+        for W, b, activacion in self.capas:
+            h = h @ W
+            h += b
+            h = activacion(h)
+        return h
+
+    def predecir(self, input_array):
+        """
+        Args:
+            input_array (array-like): Lote (N, 9) con las variables en el orden de FEATURES
+                (Area ya codificada con `le_area`), sin escalar.
+
+        Returns:
+            np.ndarray: Array (N, 4) float32 con los objetivos en su escala original.
+        """
+        X = np.asarray(input_array, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= FILAS_POR_BLOQUE:
+            return self._predecir_bloque(X)
+        salida = np.empty((len(X), len(self.capas[-1][1])), dtype=np.float32)
+        for inicio in range(0, len(X), FILAS_POR_BLOQUE):
+            salida[inicio:inicio + FILAS_POR_BLOQUE] = self._predecir_bloque(X[inicio:inicio + FILAS_POR_BLOQUE])
+        return salida
+
+
+def verificar_paridad(motor, modelo_keras, X_scaler, y_scaler, X):
+    """
+    Compara el motor NumPy con el camino original (escalar -> Keras -> desescalar).
+
+    Returns:
+        dict: Error absoluto y relativo máximos por objetivo.
+    """
+    esperado = y_scaler.inverse_transform(modelo_keras.predict(X_scaler.transform(X), verbose=0))
+    obtenido = motor.predecir(np.asarray(X, dtype=np.float32))
+    diferencia = np.abs(obtenido.astype(np.float64) - np.asarray(esperado, dtype=np.float64))
+    return {
+        'error_abs_max': diferencia.max(axis=0).round(8).tolist(),
+        'error_rel_max': (diferencia / np.maximum(np.abs(esperado), 1e-6)).max(axis=0).round(8).tolist(),
+    }
+
+
+if __name__ == '__main__':
+    # Exporta la red actual (necesita h5py):
+    #   python -m src.predictores.mlp_numpy
+    # Compara la red ya exportada con Keras sobre datos sintéticos (necesita
+    # TensorFlow). No reescribe el .npz: si la versión actual no tiene uno,
+    # exporta a un directorio temporal y verifica ese:
+    #   python -m src.predictores.mlp_numpy --verificar
+    import argparse
+    import tempfile
+
+    import pandas as pd
+
+    from src.predictores.predicciones_DL import (
+        FEATURES, RUTA_KERAS, exportar_motor_mlp, obtener_escaladores, obtener_modelo_keras, version_mlp
+    )
+
+    parser = argparse.ArgumentParser(description='Exporta la red MLP de app2 a NumPy.')
+    parser.add_argument('--verificar', action='store_true', help='Compara la red exportada contra Keras.')
+    parser.add_argument('--filas', type=int, default=10000, help='Filas para la verificación.')
+    args = parser.parse_args()
+
+    if not args.verificar:
+        print(f'Red exportada en {exportar_motor_mlp()}')
+    else:
+        X_scaler, y_scaler = obtener_escaladores()
+        ruta = ruta_mlp(version_mlp())
+        if not os.path.exists(ruta):
+            ruta = os.path.join(tempfile.mkdtemp(prefix='mlp_'), os.path.basename(ruta))
+            exportar_mlp(RUTA_KERAS, X_scaler, y_scaler, ruta)
+        print(f'Verificando {ruta}')
+        # Datos sintéticos alrededor de la distribución de entrenamiento.
+        rng = np.random.default_rng(0)
+        X = rng.normal(X_scaler.mean_, X_scaler.scale_, size=(args.filas, len(FEATURES)))
+        X = pd.DataFrame(X, columns=FEATURES)
+        resultado = verificar_paridad(MotorMLP(ruta), obtener_modelo_keras(), X_scaler, y_scaler, X)
+        print(json.dumps(resultado, indent=2))
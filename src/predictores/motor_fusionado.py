@@ -0,0 +1,79 @@
+# src/predictores/motor_fusionado.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# --- 1. POOL DE HILOS COMPARTIDO ---
+# XGBoost libera el GIL mientras recorre los árboles, así que los 4 modelos
+# pueden evaluarse en paralelo con hilos. El pool se crea una sola vez y lo
+# comparten todos los motores (y todas las sesiones de Streamlit).
+_N_HILOS = min(4, os.cpu_count() or 1)
+_pool = None
+_lock_pool = threading.Lock()
+
+# Por debajo de este tamaño de lote el costo de coordinar los hilos supera
+# lo que se gana, así que los 4 modelos se evalúan uno tras otro.
+FILAS_MINIMAS_PARALELO = 2048
+
+
+def _obtener_pool():
+    global _pool
+    # Doble verificación, como en `registro_modelos`: dos sesiones que llegan
+    # a la vez no crean dos pools (el segundo quedaría con hilos huérfanos).
+    if _pool is None:
+        with _lock_pool:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_N_HILOS, thread_name_prefix='motor_fusionado')
+    return _pool
+
+
+class MotorFusionado:
+    """
+    Motor de inferencia que evalúa los 4 modelos XGBoost en una sola llamada.
+
+    En lugar de pasar por `XGBRegressor.predict` cuatro veces (cada una
+    convierte la entrada otra vez), se trabaja directamente con los
+    `Booster` internos: la matriz de entrada se arma una sola vez en float32
+    contiguo y se entrega a `inplace_predict`, que no crea un DMatrix.
+    """
+
+    def __init__(self, modelos):
+        """
+        Args:
+            modelos (list): Los 4 XGBRegressor en el orden
+                [porcMort, porcConsumo, ica, pesoProm].
+        """
+        self.boosters = [modelo.get_booster() for modelo in modelos]
+        # Respetamos el early stopping si el modelo lo tiene, igual que predict().
+        self.rangos = [
+            (0, modelo.best_iteration + 1) if getattr(modelo, 'best_iteration', None) is not None else (0, 0)
+            for modelo in modelos
+        ]
+
+    def _predecir_uno(self, i, X):
+        return self.boosters[i].inplace_predict(X, iteration_range=self.rangos[i])
+
+    def predecir(self, input_array):
+        """
+        Evalúa los 4 modelos sobre el lote.
+
+        Args:
+            input_array (array-like): Lote (N, 4) con [areaAn, sexo, edadHTs, edadventa].
+
+        Returns:
+            np.ndarray: Array (N, 4) float32 con [porcMort, porcConsumo, ica, pesoProm].
+        """
+        X = np.ascontiguousarray(input_array, dtype=np.float32)
+        salida = np.empty((len(X), len(self.boosters)), dtype=np.float32)
+
+        if len(X) < FILAS_MINIMAS_PARALELO or _N_HILOS == 1:
+            for i in range(len(self.boosters)):
+                salida[:, i] = self._predecir_uno(i, X)
+        else:
+            futuros = [_obtener_pool().submit(self._predecir_uno, i, X) for i in range(len(self.boosters))]
+            for i, futuro in enumerate(futuros):
+                salida[:, i] = futuro.result()
+        return salida
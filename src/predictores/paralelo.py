@@ -0,0 +1,174 @@
+# src/predictores/paralelo.py
+
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# --- 1. INFERENCIA EN VARIOS PROCESOS ---
+# Para lotes grandes el lote se parte en fragmentos que se evalúan en un pool
+# de procesos. La entrada y la salida viven en memoria compartida: los
+# trabajadores leen y escriben directamente sus filas, así que no se
+# serializa (pickle) ningún array y el orden de las filas se conserva solo.
+
+# Por debajo de este tamaño de lote el arranque de los fragmentos no compensa.
+FILAS_MINIMAS_PARALELO = 200_000
+# Tamaño mínimo de cada fragmento enviado a un trabajador.
+FILAS_MINIMAS_FRAGMENTO = 20_000
+# Pools de procesos que se mantienen a la vez (uno por configuración).
+MAX_POOLS = int(os.getenv('PREDICCION_MAX_POOLS', '2'))
+
+# (n_workers, motor) -> [pool, lotes en curso], del menos al más usado recientemente.
+_pools = OrderedDict()
+_lock_pool = threading.Lock()
+
+
+def resolver_n_workers(n_workers, n_filas):
+    """
+    Decide cuántos procesos usar para un lote.
+
+    Args:
+        n_workers (int o 'auto'): 1 = siempre en serie; 'auto' = tantos como CPUs.
+        n_filas (int): Tamaño del lote.
+
+    Returns:
+        int: 1 si conviene hacerlo en serie, o el número de procesos.
+    """
+    if n_workers == 'auto':
+        n_workers = os.cpu_count() or 1
+    n_workers = int(n_workers)
+    if n_workers <= 1 or n_filas < FILAS_MINIMAS_PARALELO:
+        return 1
+    return max(1, min(n_workers, n_filas // FILAS_MINIMAS_FRAGMENTO))
+
+
+def _inicializar_trabajador(motor):
+    """Carga los modelos una sola vez por trabajador, con XGBoost en un solo hilo."""
+    os.environ['OMP_NUM_THREADS'] = '1'
+    from src.predictores import predicciones_ML
+
+    if (motor or predicciones_ML.MOTOR) != 'numpy':
+        for modelo in predicciones_ML.obtener_modelos():
+            # set_params() no sirve con los .pkl antiguos (les faltan atributos
+            # nuevos), así que fijamos los hilos directamente.
+            modelo.n_jobs = 1
+            modelo.get_booster().set_param({'nthread': 1})
+    predicciones_ML._predecir_modelos(np.array([[1, 1, 14, 0]], dtype=np.float32), motor, n_workers=1)
+
+
+def _predecir_fragmento(nombre_entrada, nombre_salida, forma_entrada, forma_salida, inicio, fin, motor):
+    """Evalúa las filas [inicio, fin) del lote compartido y escribe el resultado en su lugar."""
+    from src.predictores import predicciones_ML
+
+    # Con 'spawn' los trabajadores comparten el resource_tracker del proceso
+    # principal, que es quien libera (unlink) los bloques al terminar.
+    entrada = shared_memory.SharedMemory(name=nombre_entrada)
+    salida = shared_memory.SharedMemory(name=nombre_salida)
+    try:
+        X = np.ndarray(forma_entrada, dtype=np.float32, buffer=entrada.buf)
+        Y = np.ndarray(forma_salida, dtype=np.float32, buffer=salida.buf)
+        # n_workers=1: dentro de un trabajador siempre se evalúa en serie.
+        Y[inicio:fin] = predicciones_ML._predecir_modelos(X[inicio:fin], motor, n_workers=1)
+        del X, Y
+    finally:
+        entrada.close()
+        salida.close()
+    return fin - inicio
+
+
+def _cerrar_pools_ociosos():
+    """Cierra los pools sin lotes en curso que sobran de MAX_POOLS (llamar con `_lock_pool`)."""
+    for clave in [c for c, (_, en_curso) in _pools.items() if en_curso == 0]:
+        if len(_pools) <= MAX_POOLS:
+            break
+        _pools.pop(clave)[0].shutdown(wait=False)
+
+
+@contextmanager
+def _usar_pool(n_workers, motor):
+    """
+    Presta el pool persistente de la configuración (n_workers, motor),
+    creándolo si no existe. Una sesión con otra configuración obtiene su
+    propio pool: nunca se cierra uno que otra sesión está usando.
+    """
+    clave = (n_workers, motor)
+    with _lock_pool:
+        if clave not in _pools:
+            # 'spawn' evita heredar por fork los hilos y locks de Streamlit.
+            executor = ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_trabajador,
+                initargs=(motor,),
+            )
+            _pools[clave] = [executor, 0]
+        _pools.move_to_end(clave)
+        _pools[clave][1] += 1
+        executor = _pools[clave][0]
+        _cerrar_pools_ociosos()
+    try:
+        yield executor
+    finally:
+        with _lock_pool:
+            _pools[clave][1] -= 1
+            _cerrar_pools_ociosos()
+
+
+def cerrar_pool():
+    """Detiene los procesos trabajadores de todos los pools (se llama también al salir)."""
+    with _lock_pool:
+        for executor, _ in _pools.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+        _pools.clear()
+
+
+atexit.register(cerrar_pool)
+
+
+def predecir_en_paralelo(input_array, n_workers, motor=None, n_salidas=4):
+    """
+    Evalúa los modelos sobre el lote repartiéndolo entre `n_workers` procesos.
+
+    Args:
+        input_array (array-like): Lote (N, 4) con [areaAn, sexo, edadHTs, edadventa].
+        n_workers (int): Número de procesos (ya resuelto con `resolver_n_workers`).
+        motor (str, opcional): Motor de inferencia de `predicciones_ML`.
+
+    Returns:
+        np.ndarray: Array (N, n_salidas) float32 en el mismo orden que la entrada.
+    """
+    X = np.asarray(input_array, dtype=np.float32)
+    n = len(X)
+    forma_entrada = (n, X.shape[1])
+    forma_salida = (n, n_salidas)
+
+    entrada = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+    salida = shared_memory.SharedMemory(create=True, size=max(n * n_salidas * 4, 1))
+    try:
+        np.ndarray(forma_entrada, dtype=np.float32, buffer=entrada.buf)[:] = X
+
+        # Varios fragmentos por trabajador para repartir mejor la carga.
+        n_fragmentos = max(n_workers, min(n_workers * 4, n // FILAS_MINIMAS_FRAGMENTO))
+        limites = np.linspace(0, n, n_fragmentos + 1, dtype=np.int64)
+        with _usar_pool(n_workers, motor) as pool:
+            futuros = [
+                pool.submit(_predecir_fragmento, entrada.name, salida.name, forma_entrada, forma_salida,
+                            int(inicio), int(fin), motor)
+                for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio
+            ]
+            for futuro in futuros:
+                futuro.result()
+
+        resultado = np.ndarray(forma_salida, dtype=np.float32, buffer=salida.buf).copy()
+    finally:
+        entrada.close()
+        entrada.unlink()
+        salida.close()
+        salida.unlink()
+    return resultado
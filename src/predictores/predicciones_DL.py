@@ -0,0 +1,159 @@
+# src/predictores/predicciones_DL.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.predictores import mlp_numpy
+from src.predictores.codificacion import codificar_columna
+from src.predictores.deriva import NOMBRE_REFERENCIA, MonitorDeriva
+from src.predictores.registro_modelos import registro
+
+# --- 1. ARTEFACTOS DEL MODELO MLP (app2) ---
+# Igual que los modelos ML, se registran en el registro compartido y se
+# cargan la primera vez que se piden.
+
+FEATURES = [
+    'PorcMortSem4','PorcMortSem5', 'PorcMortSem6','PesoSem4', 'PesoSem5', 'Pob Inicial',
+    'Edad HTS', 'Edad Granja', 'Area'
+]
+
+TARGETS = ['Peso Prom. Final', 'Porc Consumo', 'ICA', 'Por_Mort._Final']
+
+
+def _cargar_keras(ruta):
+    # TensorFlow solo se importa si de verdad se usa el modelo Keras.
+    from tensorflow.keras.models import load_model
+    return load_model(ruta)
+
+
+RUTA_KERAS = 'modelosPkl/DL_models/modelo_9vars_multisalida.keras'
+registro.registrar('mlp_9vars', RUTA_KERAS, cargar=_cargar_keras)
+registro.registrar('X_scaler_9vars', 'modelosPkl/DL_models/X_scaler_9vars.pkl')
+registro.registrar('y_scaler_4targets', 'modelosPkl/DL_models/y_scaler_4targets.pkl')
+registro.registrar('le_area', 'modelosPkl/DL_models/label_encoder_tipo_area.pkl')
+
+# Deriva de las 9 entradas respecto de las de entrenamiento (ver `deriva`).
+monitor_entradas = MonitorDeriva('DL', 'referencia_dl', f'modelosPkl/DL_models/{NOMBRE_REFERENCIA}')
+
+# Motor de inferencia:
+#   'keras' -> escalar, model.predict y desescalar (comportamiento original)
+#   'numpy' -> red exportada con los escaladores incorporados (ver `mlp_numpy`);
+#              no importa TensorFlow ni deserializa los escaladores.
+# Se elige con la variable de entorno PREDICCION_MOTOR_DL.
+MOTORES_DL = ('keras', 'numpy')
+MOTOR_DL = os.getenv('PREDICCION_MOTOR_DL', 'keras')
+
+# Filas por llamada a model.predict: el valor por defecto de Keras (32) parte
+# los lotes grandes en miles de pasos pequeños.
+BATCH_KERAS = 8192
+
+_motor_mlp = (None, None)
+
+
+def version_mlp():
+    """Hash del .keras y de los dos escaladores; cambia si se reemplaza alguno."""
+    return registro.version(['mlp_9vars', 'X_scaler_9vars', 'y_scaler_4targets'])
+
+
+def obtener_modelo_keras():
+    return registro.obtener('mlp_9vars')
+
+
+def obtener_escaladores():
+    """Devuelve (X_scaler, y_scaler)."""
+    return registro.obtener('X_scaler_9vars'), registro.obtener('y_scaler_4targets')
+
+
+def exportar_motor_mlp():
+    """Exporta la red de la versión actual y devuelve la ruta del .npz."""
+    ruta = mlp_numpy.ruta_mlp(version_mlp())
+    mlp_numpy.exportar_mlp(RUTA_KERAS, *obtener_escaladores(), ruta)
+    return ruta
+
+
+def obtener_motor_mlp():
+    """
+    Abre la red exportada para la versión actual del modelo.
+    Si el .npz no existe, lo exporta a partir del .keras y los escaladores.
+    """
+    global _motor_mlp
+    version = version_mlp()
+    if _motor_mlp[0] != version:
+        ruta = mlp_numpy.ruta_mlp(version)
+        if not os.path.exists(ruta):
+            exportar_motor_mlp()
+        _motor_mlp = (version, mlp_numpy.MotorMLP(ruta))
+    return _motor_mlp[1]
+
+
+def obtener_le_area():
+    """LabelEncoder de 'Area' (FileNotFoundError si no existe)."""
+    return registro.obtener('le_area')
+
+
+def codificar_lote_dl(df, le_area=None):
+    """
+    Convierte un DataFrame con las columnas FEATURES al array de entrada.
+
+    'Area' se codifica de una vez para toda la columna con las clases de
+    `le_area` (mismos códigos que `le_area.transform`); si no hay encoder se
+    espera que ya venga numérica.
+
+    Returns:
+        tuple: (X, errores)
+            X: array (N, 9) float64 en el orden de FEATURES.
+            errores: dict {columna: posiciones de las filas con valores no
+                reconocidos o no numéricos}. Solo incluye columnas con errores.
+    """
+    X = np.empty((len(df), len(FEATURES)), dtype=np.float64)
+    for i, columna in enumerate(FEATURES):
+        if columna == 'Area' and le_area is not None:
+            mapa = {clase: codigo for codigo, clase in enumerate(le_area.classes_)}
+            X[:, i] = codificar_columna(df[columna], mapa)
+        else:
+            X[:, i] = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    errores = {}
+    nulos = np.isnan(X)
+    if nulos.any():
+        for i, columna in enumerate(FEATURES):
+            filas = np.flatnonzero(nulos[:, i])
+            if len(filas):
+                errores[columna] = filas
+    return X, errores
+
+
+def predecir_dl(input_array, motor=None, monitorear=True):
+    """
+    Predice los 4 TARGETS para un lote.
+
+    Args:
+        input_array (array-like): Lote (N, 9) en el orden de FEATURES, con
+            'Area' ya codificada con `le_area`.
+        motor (str, opcional): 'keras' o 'numpy' (por defecto MOTOR_DL).
+        monitorear (bool): Si es False, el lote no se suma al monitor de
+            deriva (p. ej. el precalentamiento con ceros).
+
+    Returns:
+        np.ndarray: Array (N, 4) con los objetivos en su escala original.
+
+    Raises:
+        FileNotFoundError: Si falta alguno de los artefactos.
+    """
+    motor = motor or MOTOR_DL
+    if motor not in MOTORES_DL:
+        raise ValueError(f"Motor desconocido: '{motor}'. Valores válidos: {MOTORES_DL}")
+    if monitorear:
+        monitor_entradas.observar(np.asarray(input_array, dtype=np.float64))
+    if motor == 'numpy':
+        return obtener_motor_mlp().predecir(input_array)
+
+    X_scaler, y_scaler = obtener_escaladores()
+    df_input = pd.DataFrame(np.asarray(input_array), columns=FEATURES)
+    X_input_scaled = X_scaler.transform(df_input)
+    y_pred_scaled = obtener_modelo_keras().predict(
+        X_input_scaled, batch_size=min(len(X_input_scaled), BATCH_KERAS) or 1, verbose=0
+    )
+    return y_scaler.inverse_transform(y_pred_scaled)
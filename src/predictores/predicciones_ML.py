@@ -1,27 +1,159 @@
 # utils/predicciones.py
 
-import joblib
+import os
+import threading
+
 import pandas as pd
 import numpy as np
 
-# --- 1. CARGA ÚNICA Y SEGURA DE MODELOS ---
-# Los modelos se cargan una sola vez cuando la aplicación se inicia,
-# lo que mejora enormemente el rendimiento.
-# Usamos un bloque try-except para dar un error claro si los archivos no se encuentran.
+from src.predictores import arboles_numpy, tabla_predicciones
+from src.predictores.deduplicacion import estadisticas_dedup, filas_unicas
+from src.predictores.deriva import NOMBRE_REFERENCIA, MonitorDeriva
+from src.predictores.motor_fusionado import MotorFusionado
+from src.predictores.paralelo import predecir_en_paralelo, resolver_n_workers
+from src.predictores.registro_modelos import registro
+
+# --- 1. REGISTRO DE MODELOS (CARGA PEREZOSA) ---
+# Los modelos ya no se cargan al importar el módulo: se registran en el
+# `registro` compartido y se cargan la primera vez que se usan (o al llamar
+# a `precalentar_modelos`). Si un .pkl cambia en disco, se recarga solo.
+
+MODELOS_ML = {
+    'porcMort': 'modelosPkl/ML_models/model_porcMort2.pkl',
+    'porcConsumo': 'modelosPkl/ML_models/model_porcConsumo2.pkl',
+    'ica': 'modelosPkl/ML_models/model_ica2.pkl',
+    'pesoProm': 'modelosPkl/ML_models/model_pesoProm2.pkl',
+}
+RUTAS_MODELOS = list(MODELOS_ML.values())
+
+for _nombre, _ruta in MODELOS_ML.items():
+    registro.registrar(_nombre, _ruta)
+
+# Motor de inferencia:
+#   'sklearn'   -> 4 llamadas a XGBRegressor.predict (comportamiento original)
+#   'fusionado' -> los 4 boosters en una sola pasada (ver `motor_fusionado`)
+#   'numpy'     -> árboles exportados evaluados solo con NumPy (ver `arboles_numpy`)
+# Se elige con la variable de entorno PREDICCION_MOTOR. Con 'numpy' los .pkl
+# no se llegan a deserializar, así xgboost nunca se importa.
+MOTORES = ('sklearn', 'fusionado', 'numpy')
+MOTOR = os.getenv('PREDICCION_MOTOR', 'sklearn')
+
+# Tabla precalculada del "modo tabla" (se abre la primera vez que se usa).
+# Se puede activar por defecto con la variable de entorno PREDICCION_MODO_TABLA=1.
+MODO_TABLA = os.getenv('PREDICCION_MODO_TABLA') == '1'
+
+# Procesos para lotes grandes (ver `paralelo`): '1' = siempre en serie,
+# 'auto' = tantos como CPUs. Los lotes chicos se evalúan en serie igual.
+N_WORKERS = os.getenv('PREDICCION_N_WORKERS', '1')
+
+# Evaluar los modelos solo sobre las filas únicas del lote (ver `deduplicacion`).
+# Se desactiva con PREDICCION_DEDUPLICAR=0.
+DEDUPLICAR = os.getenv('PREDICCION_DEDUPLICAR', '1') == '1'
+
+# Deriva de las entradas respecto de las de entrenamiento (ver `deriva`).
+# Se desactiva con DERIVA_MONITOR=0.
+monitor_entradas = MonitorDeriva('ML', 'referencia_ml', f'modelosPkl/ML_models/{NOMBRE_REFERENCIA}')
+
+# Artefactos derivados de los modelos, cada uno guardado junto a la clave
+# (versión o modelos) con la que se construyó para descartarlo al recargar.
+_tabla = (None, None)
+_motor_fusionado = (None, None)
+_motor_numpy = (None, None)
+
+
+def version_modelos():
+    """Hash del contenido de los 4 .pkl; cambia cuando se reemplaza un modelo."""
+    return registro.version(list(MODELOS_ML))
+
+
+def obtener_modelos():
+    """
+    Devuelve los 4 XGBRegressor [porcMort, porcConsumo, ica, pesoProm] desde el registro.
+
+    Raises:
+        FileNotFoundError: Si falta alguno de los .pkl.
+    """
+    return [registro.obtener(nombre) for nombre in MODELOS_ML]
+
 
-try:
-    model_porcMort = joblib.load('modelosPkl/ML_models/model_porcMort2.pkl')
-    model_porcConsumo = joblib.load('modelosPkl/ML_models/model_porcConsumo2.pkl')
-    model_ica = joblib.load('modelosPkl/ML_models/model_ica2.pkl')
-    model_pesoProm = joblib.load('modelosPkl/ML_models/model_pesoProm2.pkl')
-except FileNotFoundError as e:
-    print(f"ERROR: No se pudo encontrar un archivo de modelo. {e}")
-    print("Asegúrate de que los archivos .pkl estén en la carpeta 'modelosPkl/'.")
-    # Si no se cargan los modelos, asignamos None para manejar el error después.
-    model_porcMort = model_porcConsumo = model_ica = model_pesoProm = None
+def obtener_motor_fusionado():
+    """Devuelve el motor fusionado de los modelos actuales (se rearma si se recargan)."""
+    global _motor_fusionado
+    modelos = obtener_modelos()
+    clave = tuple(id(modelo) for modelo in modelos)
+    if _motor_fusionado[0] != clave:
+        _motor_fusionado = (clave, MotorFusionado(modelos))
+    return _motor_fusionado[1]
 
 
-def predict_all(data_batch):
+def obtener_motor_numpy():
+    """
+    Abre los árboles exportados para la versión actual de los modelos.
+    Si el .npz no existe, lo exporta a partir de los .pkl.
+    """
+    global _motor_numpy
+    version = version_modelos()
+    if _motor_numpy[0] != version:
+        ruta = arboles_numpy.ruta_arboles(version)
+        if not os.path.exists(ruta):
+            arboles_numpy.exportar_arboles(obtener_modelos(), ruta)
+        _motor_numpy = (version, arboles_numpy.MotorNumpy(ruta))
+    return _motor_numpy[1]
+
+
+def _predecir_modelos(input_array, motor=None, n_workers=None):
+    """
+    Evalúa los 4 modelos sobre un lote y devuelve un array (N, 4) sin redondear,
+    con columnas [porcMort, porcConsumo, ica, pesoProm].
+    """
+    motor = motor or MOTOR
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de inferencia desconocido: '{motor}'. Opciones: {MOTORES}")
+    procesos = resolver_n_workers(n_workers or N_WORKERS, len(input_array))
+    if procesos > 1:
+        return predecir_en_paralelo(input_array, procesos, motor)
+    if motor == 'fusionado':
+        return obtener_motor_fusionado().predecir(input_array)
+    if motor == 'numpy':
+        return obtener_motor_numpy().predecir(input_array)
+    return np.column_stack([modelo.predict(input_array) for modelo in obtener_modelos()])
+
+
+def obtener_tabla():
+    """
+    Devuelve la tabla de predicciones precalculada para la versión actual
+    de los modelos. Si no existe en disco, se construye una única vez.
+    """
+    global _tabla
+    version = version_modelos()
+    if _tabla[0] != version:
+        ruta = tabla_predicciones.ruta_tabla(version)
+        _tabla = (version, tabla_predicciones.cargar_tabla(ruta, predecir=_predecir_modelos))
+    return _tabla[1]
+
+
+def precalentar_modelos(en_segundo_plano=False):
+    """
+    Carga por adelantado lo que necesita el motor configurado para que la
+    primera predicción no pague el costo de carga.
+    """
+    def _precalentar():
+        try:
+            _predecir_modelos(np.array([[1, 1, 14, 0]]))
+            if MODO_TABLA:
+                obtener_tabla()
+        except Exception as e:
+            print(f"ERROR: No se pudieron precalentar los modelos. {e}")
+
+    if en_segundo_plano:
+        hilo = threading.Thread(target=_precalentar, name='precalentar_predict_all', daemon=True)
+        hilo.start()
+        return hilo
+    _precalentar()
+    return None
+
+
+def predict_all(data_batch, modo_tabla=None, motor=None, n_workers=None, deduplicar=None, monitorear=True):
     """
     Realiza predicciones en lote para los 4 modelos de forma vectorizada y eficiente.
     Esta función NO interactúa con Streamlit, solo procesa datos.
@@ -32,37 +164,83 @@ def predict_all(data_batch):
             características para la predicción.
             Ejemplo para 1 fila: [[area, sexo, edadHTS, edadVenta]]
             Ejemplo para N filas: [[...], [...], ..., [...]]
+        modo_tabla (bool, opcional):
+            Si es True, las filas dentro del dominio de la app se responden
+            con la tabla precalculada (ver `tabla_predicciones`) y solo las
+            filas fuera de ella pasan por XGBoost. Por defecto usa MODO_TABLA.
+        motor (str, opcional):
+            Motor de inferencia, uno de MOTORES. Por defecto usa MOTOR
+            (variable de entorno PREDICCION_MOTOR).
+        n_workers (int o 'auto', opcional):
+            Procesos para evaluar lotes grandes en paralelo (ver `paralelo`).
+            Los lotes pequeños siempre se evalúan en serie. Por defecto usa
+            N_WORKERS (variable de entorno PREDICCION_N_WORKERS).
+        deduplicar (bool, opcional):
+            Si es True, los modelos se evalúan una sola vez por cada fila
+            distinta del lote y el resultado se expande a todas sus
+            repeticiones. Por defecto usa DEDUPLICAR.
+        monitorear (bool, opcional):
+            Si es False, el lote no se suma al monitor de deriva (p. ej.
+            grillas de escenarios, que no son datos de granjas).
 
     Returns:
         pd.DataFrame: 
             Un DataFrame de Pandas con 4 columnas, una para cada predicción.
             El número de filas del DataFrame será igual al número de filas
-            en el 'data_batch' de entrada.
+            en el 'data_batch' de entrada. `attrs['filas_unicas']` indica
+            cuántas filas evaluaron realmente los modelos.
     """
     # --- 2. VERIFICACIÓN DE MODELOS CARGADOS ---
-    if model_porcMort is None:
+    try:
+        # Carga perezosa: la primera llamada (o tras un cambio en disco) carga aquí.
+        if (motor or MOTOR) == 'numpy':
+            obtener_motor_numpy()
+        else:
+            obtener_modelos()
+    except FileNotFoundError as e:
+        print(f"ERROR: No se pudo encontrar un archivo de modelo. {e}")
+        print("Asegúrate de que los archivos .pkl estén en la carpeta 'modelosPkl/'.")
         # Si los modelos no se cargaron, no podemos predecir.
         # Devolvemos un DataFrame vacío para que la app no se caiga.
         return pd.DataFrame()
 
     # --- 3. PREDICCIONES VECTORIZADAS (LA CORRECCIÓN CLAVE) ---
     # Convertimos la entrada a un array de NumPy para asegurar compatibilidad.
-    input_array = np.array(data_batch)
+    # np.asarray no copia si ya recibimos un array (p. ej. el de `codificacion`).
+    input_array = np.asarray(data_batch)
+
+    # Las filas repetidas se predicen una sola vez y luego se expanden.
+    if deduplicar is None:
+        deduplicar = DEDUPLICAR
+    inversa = None
+    if deduplicar and len(input_array) > 1:
+        input_array, inversa = filas_unicas(input_array)
+    estadisticas_dedup.registrar(len(inversa) if inversa is not None else len(input_array), len(input_array))
+    if monitorear:
+        # Con el lote deduplicado se observa cada fila distinta con su cantidad de repeticiones.
+        monitor_entradas.observar(input_array, None if inversa is None else np.bincount(inversa, minlength=len(input_array)))
 
     # Realizamos las predicciones para TODO el lote de datos de una sola vez.
-    # Eliminamos el `[0]` para obtener un array completo de predicciones,
-    # no solo la primera.
-    pred_mort = model_porcMort.predict(input_array)
-    pred_consumo = model_porcConsumo.predict(input_array)
-    pred_ica = model_ica.predict(input_array)
-    pred_peso = model_pesoProm.predict(input_array)
+    if modo_tabla is None:
+        modo_tabla = MODO_TABLA
+    if modo_tabla:
+        predicciones = np.empty((len(input_array), 4), dtype=np.float32)
+        en_tabla, valores = tabla_predicciones.consultar_tabla(obtener_tabla(), input_array)
+        predicciones[en_tabla] = valores
+        if not en_tabla.all():
+            predicciones[~en_tabla] = _predecir_modelos(input_array[~en_tabla], motor, n_workers)
+    else:
+        predicciones = _predecir_modelos(input_array, motor, n_workers)
+    n_unicas = len(predicciones)
+    if inversa is not None:
+        predicciones = predicciones[inversa]
 
     # **NUEVO: Redondear las predicciones a 2 decimales**
     # Usamos np.round() para redondear los arrays de predicciones.
-    pred_mort_redondeado = np.round(pred_mort, 2)
-    pred_consumo_redondeado = np.round(pred_consumo, 3)
-    pred_ica_redondeado = np.round(pred_ica, 2)
-    pred_peso_redondeado = np.round(pred_peso, 3)
+    pred_mort_redondeado = np.round(predicciones[:, 0], 2)
+    pred_consumo_redondeado = np.round(predicciones[:, 1], 3)
+    pred_ica_redondeado = np.round(predicciones[:, 2], 2)
+    pred_peso_redondeado = np.round(predicciones[:, 3], 3)
 
     # --- 4. CREACIÓN DEL DATAFRAME DE RESULTADOS ---
     # Creamos un diccionario donde cada clave es el nombre de la columna
@@ -73,6 +251,7 @@ def predict_all(data_batch):
         'preICA': pred_ica_redondeado,
         'prePeProFin': pred_peso_redondeado
     })
+    resultados_df.attrs['filas_unicas'] = n_unicas
 
 
 
@@ -0,0 +1,226 @@
+# src/predictores/registro_modelos.py
+
+import hashlib
+import os
+import threading
+import time
+
+# --- 1. REGISTRO DE MODELOS COMPARTIDO ---
+# Streamlit ejecuta cada sesión en su propio hilo pero dentro del mismo
+# proceso, así que un objeto a nivel de módulo es compartido por todas las
+# sesiones. El registro carga cada artefacto la primera vez que se pide,
+# detecta si el archivo cambió en disco (mtime/tamaño y luego checksum) y lo
+# recarga sin reiniciar la app.
+
+
+def _cargar_joblib(ruta):
+    # joblib se importa con el primer artefacto, no con el módulo.
+    import joblib
+    return joblib.load(ruta)
+
+
+def hash_archivos(rutas):
+    """
+    Calcula un hash corto a partir del contenido de una lista de archivos.
+    Sirve para versionar artefactos derivados: si cambia un archivo, cambia el hash.
+    """
+    sha = hashlib.sha256()
+    for ruta in rutas:
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloque)
+    return sha.hexdigest()[:16]
+
+
+def memoria_rss():
+    """Memoria residente del proceso en bytes (None si no se puede medir)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Entrada:
+    """Estado de un artefacto registrado."""
+
+    def __init__(self, ruta, cargar):
+        self.ruta = ruta
+        self.cargar = cargar
+        self.objeto = None
+        self.firma = None          # (mtime_ns, tamaño) del archivo cargado
+        self.checksum = None
+        self.ultima_verificacion = 0.0
+        self.segundos_carga = None
+        self.memoria_bytes = None
+        self.cargado_en = None
+        self.recargas = 0
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Registro perezoso y thread-safe de modelos y artefactos.
+
+    Ejemplo:
+        registro.registrar('ica', 'modelosPkl/ML_models/model_ica2.pkl')
+        modelo = registro.obtener('ica')   # se carga aquí la primera vez
+    """
+
+    def __init__(self, intervalo_verificacion=2.0):
+        """
+        Args:
+            intervalo_verificacion (float): Segundos mínimos entre dos
+                revisiones del archivo en disco para un mismo artefacto.
+        """
+        self.intervalo_verificacion = intervalo_verificacion
+        self._entradas = {}
+        self._lock = threading.RLock()
+        self._versiones = {}
+        self._callbacks = []
+
+    def registrar(self, nombre, ruta, cargar=_cargar_joblib):
+        """Registra un artefacto sin cargarlo. `cargar` recibe la ruta y devuelve el objeto."""
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+            if entrada is None or entrada.ruta != ruta:
+                self._entradas[nombre] = _Entrada(ruta, cargar)
+
+    def registrado(self, nombre):
+        return nombre in self._entradas
+
+    def al_recargar(self, callback):
+        """Registra una función `callback(nombre)` que se llama tras cada recarga."""
+        self._callbacks.append(callback)
+
+    def _cargar(self, nombre, entrada, firma):
+        """Carga el archivo y, solo si tuvo éxito, reemplaza el objeto anterior."""
+        checksum = hash_archivos([entrada.ruta])
+        if entrada.objeto is not None and checksum == entrada.checksum:
+            # Cambió el mtime pero no el contenido: no hace falta recargar.
+            entrada.firma = firma
+            return False
+
+        memoria_antes = memoria_rss()
+        inicio = time.perf_counter()
+        try:
+            objeto = entrada.cargar(entrada.ruta)
+        except Exception as e:
+            entrada.error = str(e)
+            if entrada.objeto is None:
+                raise
+            # Si falla una recarga seguimos sirviendo la versión anterior.
+            print(f"ERROR: No se pudo recargar '{nombre}', se mantiene la versión anterior. {e}")
+            return False
+        memoria_despues = memoria_rss()
+
+        es_recarga = entrada.objeto is not None
+        entrada.objeto = objeto
+        entrada.firma = firma
+        entrada.checksum = checksum
+        entrada.segundos_carga = time.perf_counter() - inicio
+        entrada.memoria_bytes = (
+            memoria_despues - memoria_antes if memoria_antes is not None and memoria_despues is not None else None
+        )
+        entrada.cargado_en = time.time()
+        entrada.error = None
+        if es_recarga:
+            entrada.recargas += 1
+        return es_recarga
+
+    def obtener(self, nombre):
+        """
+        Devuelve el objeto cargado. Lo carga la primera vez y lo recarga si el
+        archivo cambió en disco.
+
+        Raises:
+            KeyError: Si el nombre no fue registrado.
+            FileNotFoundError: Si el archivo no existe y nunca se pudo cargar.
+        """
+        entrada = self._entradas[nombre]
+        ahora = time.monotonic()
+        if entrada.objeto is not None and ahora - entrada.ultima_verificacion < self.intervalo_verificacion:
+            return entrada.objeto
+
+        recargado = False
+        with self._lock:
+            if entrada.objeto is None or ahora - entrada.ultima_verificacion >= self.intervalo_verificacion:
+                try:
+                    estado = os.stat(entrada.ruta)
+                    firma = (estado.st_mtime_ns, estado.st_size)
+                except FileNotFoundError:
+                    if entrada.objeto is None:
+                        entrada.error = f"No existe el archivo '{entrada.ruta}'"
+                        raise
+                    firma = entrada.firma  # el archivo desapareció: seguimos con lo cargado
+                if entrada.objeto is None or firma != entrada.firma:
+                    recargado = self._cargar(nombre, entrada, firma)
+                entrada.ultima_verificacion = ahora
+            objeto = entrada.objeto
+
+        if recargado:
+            for callback in self._callbacks:
+                callback(nombre)
+        return objeto
+
+    def version(self, nombres):
+        """
+        Hash del contenido de los archivos de `nombres`. Se recalcula solo
+        cuando cambia el mtime o el tamaño de alguno de ellos.
+        """
+        rutas = [self._entradas[nombre].ruta for nombre in nombres]
+        firma = []
+        for ruta in rutas:
+            estado = os.stat(ruta)
+            firma.append((estado.st_mtime_ns, estado.st_size))
+        clave = tuple(nombres)
+        with self._lock:
+            cache = self._versiones.get(clave)
+            if cache is None or cache[0] != firma:
+                cache = (firma, hash_archivos(rutas))
+                self._versiones[clave] = cache
+        return cache[1]
+
+    def precalentar(self, nombres=None, en_segundo_plano=False):
+        """
+        Carga por adelantado los artefactos indicados (todos por defecto) para
+        que la primera predicción no pague el costo de carga.
+
+        Returns:
+            threading.Thread o None: El hilo si se pidió en segundo plano.
+        """
+        nombres = list(self._entradas) if nombres is None else list(nombres)
+
+        def _precalentar():
+            for nombre in nombres:
+                try:
+                    self.obtener(nombre)
+                except Exception as e:
+                    print(f"ERROR: No se pudo precalentar '{nombre}'. {e}")
+
+        if en_segundo_plano:
+            hilo = threading.Thread(target=_precalentar, name='precalentar_modelos', daemon=True)
+            hilo.start()
+            return hilo
+        _precalentar()
+        return None
+
+    def estadisticas(self):
+        """Devuelve una lista de dicts con el estado de carga de cada artefacto."""
+        filas = []
+        for nombre, entrada in list(self._entradas.items()):
+            filas.append({
+                'modelo': nombre,
+                'ruta': entrada.ruta,
+                'cargado': entrada.objeto is not None,
+                'segundos_carga': None if entrada.segundos_carga is None else round(entrada.segundos_carga, 3),
+                'memoria_mb': None if entrada.memoria_bytes is None else round(entrada.memoria_bytes / 1e6, 1),
+                'checksum': None if entrada.checksum is None else entrada.checksum[:12],
+                'recargas': entrada.recargas,
+                'error': entrada.error,
+            })
+        return filas
+
+
+# Registro único del proceso, compartido por todas las sesiones.
+registro = ModelRegistry()
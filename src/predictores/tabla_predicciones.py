@@ -0,0 +1,123 @@
+# src/predictores/tabla_predicciones.py
+
+import os
+
+import numpy as np
+
+# --- 1. DOMINIO DE ENTRADA DE LOS MODELOS ML ---
+# Los 4 modelos solo reciben [areaAn, sexo, edadHTs, edadventa] y el dominio
+# que ofrece la app es muy pequeño (ver AREA_MAP y SEXO_MAP en `codificacion`):
+# 8 áreas, 2 sexos, 4 edades HTS y edades de granja enteras de 0 a 5000.
+# Son ~320k combinaciones, así que podemos evaluarlas todas una sola vez.
+AREAS = np.arange(1, 9)
+SEXOS = np.array([0, 1])
+EDADES_HTS = np.array([14, 21, 28, 35])
+EDAD_VENTA_MAX = 5000
+
+FORMA_TABLA = (len(AREAS), len(SEXOS), len(EDADES_HTS), EDAD_VENTA_MAX + 1)
+DIRECTORIO_TABLAS = 'modelosPkl/ML_models'
+
+# Tabla inversa para pasar de edad HTS (14, 21, ...) a su posición en el eje.
+_POSICION_HTS = np.full(EDADES_HTS.max() + 1, -1, dtype=np.int64)
+_POSICION_HTS[EDADES_HTS] = np.arange(len(EDADES_HTS))
+
+
+def ruta_tabla(version, directorio=DIRECTORIO_TABLAS):
+    """Devuelve la ruta del archivo .npy de la tabla para una versión de modelos."""
+    return os.path.join(directorio, f'tabla_predicciones_{version}.npy')
+
+
+def generar_grilla():
+    """
+    Genera todas las combinaciones del dominio en el mismo orden que FORMA_TABLA.
+
+    Returns:
+        np.ndarray: Array (N, 4) con columnas [areaAn, sexo, edadHTs, edadventa].
+    """
+    ejes = np.meshgrid(AREAS, SEXOS, EDADES_HTS, np.arange(EDAD_VENTA_MAX + 1), indexing='ij')
+    return np.stack([eje.ravel() for eje in ejes], axis=1)
+
+
+def construir_tabla(predecir, ruta):
+    """
+    Evalúa los modelos sobre toda la grilla y guarda el resultado en disco.
+
+    Args:
+        predecir (callable): Función que recibe un array (N, 4) y devuelve
+            un array (N, 4) con [porcMort, porcConsumo, ica, pesoProm].
+        ruta (str): Archivo .npy de destino.
+
+    Returns:
+        np.ndarray: La tabla de forma FORMA_TABLA + (4,) en float32.
+    """
+    predicciones = np.asarray(predecir(generar_grilla()), dtype=np.float32)
+    tabla = predicciones.reshape(FORMA_TABLA + (predicciones.shape[1],))
+
+    # Escribimos en un archivo temporal y lo renombramos para que otro
+    # proceso nunca lea una tabla a medio escribir.
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    ruta_tmp = f'{ruta}.{os.getpid()}.tmp'
+    with open(ruta_tmp, 'wb') as f:
+        np.save(f, tabla)
+    os.replace(ruta_tmp, ruta)
+    return tabla
+
+
+def cargar_tabla(ruta, predecir=None):
+    """
+    Abre la tabla en modo memory-map. Si no existe y se pasa `predecir`,
+    la construye primero.
+
+    Returns:
+        np.ndarray o None: La tabla mapeada en memoria, o None si no existe.
+    """
+    if not os.path.exists(ruta):
+        if predecir is None:
+            return None
+        construir_tabla(predecir, ruta)
+    return np.load(ruta, mmap_mode='r')
+
+
+def consultar_tabla(tabla, input_array):
+    """
+    Busca en la tabla las filas del lote que caen dentro del dominio.
+
+    Args:
+        tabla (np.ndarray): Tabla devuelta por `cargar_tabla`.
+        input_array (np.ndarray): Lote (N, 4) con [areaAn, sexo, edadHTs, edadventa].
+
+    Returns:
+        tuple: (en_tabla, valores)
+            en_tabla: máscara booleana (N,) de filas encontradas.
+            valores: array (M, 4) con las predicciones de esas filas.
+    """
+    x = np.asarray(input_array, dtype=np.float64)
+    area, sexo, hts, edad = x[:, 0], x[:, 1], x[:, 2], x[:, 3]
+
+    # Una fila está en la tabla solo si todos sus valores son enteros y
+    # pertenecen al dominio; el resto se resuelve con los modelos.
+    en_tabla = (
+        (x == np.round(x)).all(axis=1)
+        & (area >= AREAS[0]) & (area <= AREAS[-1])
+        & (sexo >= SEXOS[0]) & (sexo <= SEXOS[-1])
+        & (hts >= 0) & (hts < len(_POSICION_HTS))
+        & (edad >= 0) & (edad <= EDAD_VENTA_MAX)
+    )
+    idx_hts = np.full(len(x), -1, dtype=np.int64)
+    idx_hts[en_tabla] = _POSICION_HTS[hts[en_tabla].astype(np.int64)]
+    en_tabla &= idx_hts >= 0
+
+    i_area = area[en_tabla].astype(np.int64) - AREAS[0]
+    i_sexo = sexo[en_tabla].astype(np.int64) - SEXOS[0]
+    i_edad = edad[en_tabla].astype(np.int64)
+    valores = np.asarray(tabla[i_area, i_sexo, idx_hts[en_tabla], i_edad])
+    return en_tabla, valores
+
+
+if __name__ == '__main__':
+    # Permite precalcular la tabla en el despliegue:
+    #   python -m src.predictores.tabla_predicciones
+    from src.predictores.predicciones_ML import obtener_tabla
+
+    tabla = obtener_tabla()
+    print(f'Tabla lista: forma {tabla.shape}, {tabla.nbytes / 1e6:.1f} MB')
@@ -1,13 +1,40 @@
-import supabase
 from src.utils.conexionBD import init_supabase
 import os
 import streamlit as st
 import json
-from supabase import create_client, Client
 import pandas as pd
+import threading
+import time
+from datetime import timedelta
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP
+from src.utils.analitica import agregados
+from src.utils.cola_escritura import ColaEscritura
+from src.utils.instrumentacion import metricas
 
-Client = init_supabase()
+# El cliente de Supabase se crea en el primer uso y no al importar el
+# módulo: abrir la app no paga la importación de supabase ni la conexión.
+_cliente = None
 
+def obtener_cliente():
+    """Cliente de Supabase compartido por el proceso (se crea la primera vez)."""
+    global _cliente
+    if _cliente is None:
+        _cliente = init_supabase()
+    return _cliente
+
+# Filas por llamada a insert en las inserciones masivas.
+TAMANO_BLOQUE_INSERT = 500
+
+# Historial: filas por página, columnas que se piden al servidor y segundos
+# que se reutiliza una página ya consultada.
+TAMANO_PAGINA = int(os.getenv('HISTORIAL_TAMANO_PAGINA', '50'))
+TTL_PAGINAS = float(os.getenv('HISTORIAL_TTL_SEGUNDOS', '30'))
+COLUMNAS_HISTORIAL = [
+    'id', 'created_at', 'nombre', 'cargo', 'areaAn', 'sexo', 'edadHTs', 'edadventa',
+    'prePorcMort', 'prePorcCon', 'preICA', 'prePeProFin'
+]
+
+@metricas.cronometrar('supabase_crear_prediccion')
 def crear_prediccion(predicction_data):
     st.subheader('Ingresando registro...')
     try:
@@ -18,13 +45,16 @@ def crear_prediccion(predicction_data):
 
         # Insertar datos en Supabase
         # Agrega este código para verificar el esquema de tu tabla
-        response = Client.table('predicciones').insert(predicction_data).execute()
+        response = obtener_cliente().table('predicciones').insert(predicction_data).execute()
+        cache_paginas.limpiar()
 
         # Mostrar la respuesta completa para depuración (opcional)
         #st.write("Respuesta de Supabase:", response)
 
         # Verificar si la operación fue exitosa
         if response.data:
+            # Los agregados de analítica se actualizan en segundo plano.
+            agregados.registrar([predicction_data], obtener_cliente())
             st.success('Registro creado con éxito')
         elif response.error:
             st.error(f"Error al crear el registro: {response.error}")
@@ -34,64 +64,228 @@ def crear_prediccion(predicction_data):
     except Exception as e:
         st.error(e)
 
+def _a_registros(datos):
+    """Convierte un DataFrame (o lista de dicts) a registros serializables a JSON."""
+    if isinstance(datos, pd.DataFrame):
+        # to_json convierte NaN a null y los tipos de NumPy a tipos nativos.
+        return json.loads(datos.to_json(orient='records', force_ascii=False))
+    return list(datos)
+
+def crear_predicciones_bulk(df, tamano_bloque=TAMANO_BLOQUE_INSERT, cliente=None):
+    """
+    Inserta muchas predicciones en la tabla 'predicciones' por bloques.
+    No usa Streamlit, así que se puede llamar desde hilos en segundo plano.
+
+    :param df: DataFrame (o lista de dicts) con las columnas de la tabla.
+    :param tamano_bloque: Filas por llamada a insert.
+    :param cliente: Cliente de Supabase (por defecto el de la app).
+    :return: Cantidad de filas insertadas.
+    """
+    cliente = cliente or obtener_cliente()
+    registros = _a_registros(df)
+    insertadas = 0
+    with metricas.medir('supabase_insert', filas=len(registros)):
+        for inicio in range(0, len(registros), tamano_bloque):
+            bloque = registros[inicio:inicio + tamano_bloque]
+            cliente.table('predicciones').insert(bloque).execute()
+            agregados.registrar(bloque, cliente)
+            insertadas += len(bloque)
+    cache_paginas.limpiar()
+    return insertadas
+
+# Cola compartida por el proceso: agrupa los guardados de una fila y los
+# inserta en lotes en segundo plano, con reintentos.
+cola_predicciones = ColaEscritura(lambda filas: crear_predicciones_bulk(filas))
+
+def encolar_prediccion(predicction_data):
+    """Encola una predicción para guardarla en Supabase sin bloquear la app."""
+    # El cliente se crea aquí (hilo de la app, con st.session_state) y no en el hilo de la cola.
+    obtener_cliente()
+    cola_predicciones.encolar(predicction_data)
+
+# --- HISTORIAL PAGINADO ---
+# En vez de traer toda la tabla con select("*") en cada clic, se piden
+# páginas de TAMANO_PAGINA filas ordenadas por (created_at, id) descendente,
+# con los filtros y las columnas resueltos en el servidor. La página
+# siguiente se pide desde la última fila vista (paginación por clave), así
+# que el costo no crece con el tamaño de la tabla como con OFFSET.
+
+class CachePaginas:
+    """Caché de páginas del historial con vencimiento (TTL), compartida por el proceso."""
+
+    def __init__(self, ttl=TTL_PAGINAS):
+        self.ttl = ttl
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or time.monotonic() - entrada[0] > self.ttl:
+                self._datos.pop(clave, None)
+                return None
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            # Se aprovecha cada escritura para descartar las páginas vencidas.
+            ahora = time.monotonic()
+            for k in [k for k, (t, _) in self._datos.items() if ahora - t > self.ttl]:
+                del self._datos[k]
+            self._datos[clave] = (ahora, valor)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+cache_paginas = CachePaginas()
+
+def consultar_pagina(filtros=None, cursor=None, tamano=TAMANO_PAGINA, columnas=None, cliente=None):
+    """
+    Consulta una página del historial de predicciones.
+
+    :param filtros: Dict opcional con 'areaAn', 'sexo', 'nombre' (igualdad),
+        'desde' y 'hasta' (fechas, ambas incluidas).
+    :param cursor: Tupla (created_at, id) de la última fila de la página
+        anterior, o None para la primera página.
+    :param tamano: Filas por página.
+    :param columnas: Columnas a traer (por defecto COLUMNAS_HISTORIAL).
+    :param cliente: Cliente de Supabase (por defecto el de la app).
+    :return: Tupla (filas, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    filtros = {k: v for k, v in (filtros or {}).items() if v not in (None, '')}
+    columnas = list(columnas or COLUMNAS_HISTORIAL)
+    # La paginación necesita created_at e id aunque no se muestren.
+    for columna in ('created_at', 'id'):
+        if columna not in columnas:
+            columnas.append(columna)
+
+    clave = (tuple(sorted((k, str(v)) for k, v in filtros.items())), cursor, tamano, tuple(columnas))
+    pagina = cache_paginas.obtener(clave)
+    if pagina is not None:
+        return pagina
+
+    consulta = (cliente or obtener_cliente()).table('predicciones').select(','.join(columnas))
+    for columna in ('areaAn', 'sexo', 'nombre'):
+        if columna in filtros:
+            consulta = consulta.eq(columna, filtros[columna])
+    if 'desde' in filtros:
+        consulta = consulta.gte('created_at', str(filtros['desde']))
+    if 'hasta' in filtros:
+        consulta = consulta.lt('created_at', str(filtros['hasta'] + timedelta(days=1)))
+    if cursor is not None:
+        # (created_at, id) < cursor: created_at <= c y (created_at < c o id < i).
+        fecha, id_cursor = cursor
+        consulta = consulta.lte('created_at', fecha).or_(f'created_at.lt."{fecha}",id.lt.{id_cursor}')
+
+    # Se pide una fila de más para saber si hay página siguiente.
+    response = consulta.order('created_at', desc=True).order('id', desc=True).limit(tamano + 1).execute()
+    filas = response.data or []
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = (filas[-1]['created_at'], filas[-1]['id'])
+
+    cache_paginas.guardar(clave, (filas, siguiente))
+    return filas, siguiente
+
+def _filtros_historial():
+    """Dibuja los filtros del historial y devuelve el dict para `consultar_pagina`."""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        area = st.selectbox('Área', ['Todas'] + list(AREA_MAP.keys()), key='historial_area')
+        sexo = st.selectbox('Sexo', ['Todos'] + list(SEXO_MAP.keys()), key='historial_sexo')
+    with col2:
+        nombre = st.text_input('Usuario', key='historial_nombre').strip()
+    with col3:
+        rango = st.date_input('Rango de fechas', value=(), key='historial_fechas')
+    desde = hasta = None
+    if len(rango) == 2:
+        desde, hasta = rango
+    elif len(rango) == 1:
+        desde = rango[0]
+    return {
+        'areaAn': None if area == 'Todas' else area,
+        'sexo': None if sexo == 'Todos' else sexo,
+        'nombre': nombre,
+        'desde': desde,
+        'hasta': hasta,
+    }
+
 def ver_predicciones_guardadas():
     """
-    Muestra las predicciones almacenadas en Supabase en formato de tabla
+    Muestra las predicciones almacenadas en Supabase en formato de tabla,
+    por páginas y con filtros.
     """
-    
+    st.subheader("📊 Predicciones Guardadas")
+    filtros = _filtros_historial()
+
+    # Al cambiar los filtros se vuelve a la primera página. La pila guarda el
+    # cursor de inicio de cada página visitada para poder retroceder.
+    firma = repr(sorted(filtros.items()))
+    if st.session_state.get('historial_firma') != firma:
+        st.session_state.historial_firma = firma
+        st.session_state.historial_cursores = [None]
+    cursores = st.session_state.historial_cursores
+
     # 1. Consulta a la base de datos
     try:
-        response = Client.table('predicciones').select("*").order("created_at", desc=True).execute()
-        
-        if not response.data:
-            st.warning("No hay predicciones almacenadas aún")
-            return
-        
-        # 3. Convertir a DataFrame y formatear
-        df = pd.DataFrame(response.data)
-        
-        # Formatear columnas numéricas a 4 decimales
-        columnas_numericas = ['prePorcMort', 'prePorcCon', 'preICA', 'prePeProFin']
-        for col in columnas_numericas:
-            if col in df.columns:
-                df[col] = df[col].round(2)
-        
-        # 4. Mostrar en Streamlit
-        st.subheader("📊 Predicciones Guardadas")
-        st.dataframe(
-            df,
-            use_container_width=True,
-            column_config={
-                "created_at": st.column_config.DatetimeColumn("Fecha creación"),
-                "prePorcMort": "Mortalidad (%)",
-                "prePorcCon": "Consumo (%)",
-                "preICA": "ICA",
-                "prePeProFin": "Peso Final (kg)"
-            }
-        )
-        
-        # 5. Opción para descargar
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            "⬇️ Descargar datos",
-            data=csv,
-            file_name="predicciones_avicolas.csv",
-            mime="text/csv"
-        )
-        
+        filas, siguiente = consultar_pagina(filtros, cursores[-1])
     except Exception as e:
         st.error(f"Error al cargar predicciones: {str(e)}")
+        return
+
+    if not filas:
+        st.warning("No hay predicciones almacenadas que coincidan con los filtros")
+        return
 
-def listar_registros():
+    # 2. Convertir a DataFrame y formatear
+    df = pd.DataFrame(filas, columns=COLUMNAS_HISTORIAL)
+    columnas_numericas = ['prePorcMort', 'prePorcCon', 'preICA', 'prePeProFin']
+    for col in columnas_numericas:
+        df[col] = pd.to_numeric(df[col]).round(2)
+
+    # 3. Mostrar en Streamlit
+    st.caption(f"Página {len(cursores)}")
+    st.dataframe(
+        df,
+        use_container_width=True,
+        column_config={
+            "created_at": st.column_config.DatetimeColumn("Fecha creación"),
+            "prePorcMort": "Mortalidad (%)",
+            "prePorcCon": "Consumo (%)",
+            "preICA": "ICA",
+            "prePeProFin": "Peso Final (kg)"
+        }
+    )
+
+    col_anterior, col_siguiente = st.columns(2)
+    if col_anterior.button("⬅️ Anterior", disabled=len(cursores) == 1):
+        cursores.pop()
+        st.rerun()
+    if col_siguiente.button("Siguiente ➡️", disabled=siguiente is None):
+        cursores.append(siguiente)
+        st.rerun()
+
+    # 4. Opción para descargar la página actual
+    csv = df.to_csv(index=False).encode('utf-8')
+    st.download_button(
+        "⬇️ Descargar página",
+        data=csv,
+        file_name="predicciones_avicolas.csv",
+        mime="text/csv"
+    )
+
+def listar_registros(filtros=None, tamano=TAMANO_PAGINA):
     st.subheader('Registros:')
     try:
-        # Obtener los datos de la tabla 'datos_predicciones'
-        response = Client.table('predicciones').select('*').execute()
+        # Solo la primera página (más recientes), con los filtros dados.
+        filas, _ = consultar_pagina(filtros, tamano=tamano)
         
         # Verificar si la respuesta contiene datos
-        if response.data:
+        if filas:
             # Mostrar los datos en una tabla en Streamlit
-            st.table(response.data)
+            st.table(filas)
         else:
             st.write("No hay registros para mostrar.")
     
@@ -107,7 +301,7 @@ def eliminar_prediccion_rpc(prediccion_id):
     """
     try:
         # Llamar a la función RPC para eliminar el registro
-        response = Client.rpc('eliminar_prediccion', {'prediccion_id': prediccion_id})
+        response = obtener_cliente().rpc('eliminar_prediccion', {'prediccion_id': prediccion_id})
 
         # Verificar si el código de estado es 200 o 204, que indican éxito
         if response.status_code in [200, 204]:
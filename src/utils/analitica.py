@@ -0,0 +1,609 @@
+# src/utils/analitica.py
+
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cola_escritura import ColaEscritura
+from src.utils.instrumentacion import metricas
+
+# --- 1. AGREGADOS INCREMENTALES DE LAS PREDICCIONES ---
+# Para ver la media o los percentiles de ICA, mortalidad y peso por área,
+# sexo y mes había que traer toda la tabla 'predicciones' y agregar en el
+# cliente. Ahora cada inserción (crear_prediccion y crear_predicciones_bulk)
+# suma sus filas a una tabla de agregados: por grupo (área, sexo, mes) se
+# guardan la cantidad, las sumas, las sumas de cuadrados y un boceto de
+# cuantiles por indicador. Todo es fusionable, así que una consulta solo
+# lee y suma filas de agregados: su costo depende de la cantidad de grupos,
+# no de la cantidad de predicciones.
+#
+# Las filas crudas se agregan en segundo plano (misma cola con reintentos
+# que el guardado de predicciones) y cada lote se fusiona con la fila de su
+# grupo, así la tabla tiene una fila por grupo y no una por guardado. La
+# fusión borra primero las filas del grupo y fusiona las que el borrado
+# devolvió: si dos procesos fusionan el mismo grupo a la vez, cada fila
+# vieja la cuenta solo quien la borró. `compactar` deja en una sola fila los
+# grupos que hayan quedado con varias y `backfill` recalcula todo desde
+# 'predicciones'. Tabla en Supabase:
+#
+#   create table predicciones_agregados (
+#     id bigint generated by default as identity primary key,
+#     created_at timestamptz default now(),
+#     "areaAn" text, sexo text, mes text, n bigint, estado jsonb
+#   );
+#   create index on predicciones_agregados ("areaAn", sexo, mes);
+
+TABLA_AGREGADOS = 'predicciones_agregados'
+TABLA_PREDICCIONES = 'predicciones'
+METRICAS = ['preICA', 'prePorcMort', 'prePeProFin']
+DIMENSIONES = ['areaAn', 'sexo', 'mes']
+CUANTILES = (0.1, 0.5, 0.9)
+# Error relativo máximo de los cuantiles (0.01 = 1%).
+PRECISION_BOCETO = float(os.getenv('ANALITICA_PRECISION', '0.01'))
+# Cubetas máximas por signo y por boceto: acota la memoria aunque los
+# valores cubran muchos órdenes de magnitud.
+MAX_CUBETAS = 2048
+# Filas por página al leer tablas y por llamada al insertar o borrar.
+TAMANO_PAGINA = 1000
+TAMANO_BLOQUE = 500
+# Valores con |x| menor que esto cuentan como cero.
+MINIMO = 1e-9
+
+
+class BocetoCuantiles:
+    """
+    Boceto de cuantiles fusionable con error relativo acotado (cubetas de
+    ancho logarítmico, como DDSketch): cualquier cuantil se estima con un
+    error relativo de a lo sumo `precision`, y dos bocetos con la misma
+    precisión se fusionan sumando sus cubetas.
+
+    Args:
+        precision (float): Error relativo máximo.
+        max_cubetas (int): Cubetas máximas por signo; al superarlas se
+            fusionan las de menor magnitud (pierden precisión los valores
+            más cercanos a cero).
+    """
+
+    def __init__(self, precision=PRECISION_BOCETO, max_cubetas=MAX_CUBETAS):
+        self.precision = precision
+        self.max_cubetas = max_cubetas
+        self.gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self.gamma)
+        self.positivas = {}
+        self.negativas = {}
+        self.ceros = 0
+
+    @property
+    def n(self):
+        return self.ceros + sum(self.positivas.values()) + sum(self.negativas.values())
+
+    def _sumar(self, cubetas, magnitudes):
+        if not len(magnitudes):
+            return
+        indices, cantidades = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                        return_counts=True)
+        for indice, cantidad in zip(indices.tolist(), cantidades.tolist()):
+            cubetas[indice] = cubetas.get(indice, 0) + cantidad
+        self._colapsar(cubetas)
+
+    def _colapsar(self, cubetas):
+        if len(cubetas) <= self.max_cubetas:
+            return
+        indices = sorted(cubetas)
+        sobrantes = len(indices) - self.max_cubetas
+        destino = indices[sobrantes]
+        cubetas[destino] += sum(cubetas.pop(i) for i in indices[:sobrantes])
+
+    def agregar(self, valores):
+        """Agrega un arreglo de valores (los NaN se ignoran)."""
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        self._sumar(self.positivas, valores[valores > MINIMO])
+        self._sumar(self.negativas, -valores[valores < -MINIMO])
+        self.ceros += int(np.count_nonzero(np.abs(valores) <= MINIMO))
+
+    def fusionar(self, otro):
+        if otro.precision != self.precision:
+            raise ValueError(f"No se pueden fusionar bocetos de precisión {self.precision} y {otro.precision}.")
+        for propias, ajenas in ((self.positivas, otro.positivas), (self.negativas, otro.negativas)):
+            for indice, cantidad in ajenas.items():
+                propias[indice] = propias.get(indice, 0) + cantidad
+            self._colapsar(propias)
+        self.ceros += otro.ceros
+
+    def _valor(self, indice):
+        return 2 * self.gamma ** indice / (self.gamma + 1)
+
+    def cuantil(self, q):
+        """Estimación del cuantil `q` (entre 0 y 1); NaN si el boceto está vacío."""
+        n = self.n
+        if not n:
+            return float('nan')
+        rango = q * (n - 1)
+        acumulado = 0
+        # De menor a mayor: negativas (de mayor a menor magnitud), ceros, positivas.
+        orden = ([(-self._valor(i), self.negativas[i]) for i in sorted(self.negativas, reverse=True)]
+                 + [(0.0, self.ceros)]
+                 + [(self._valor(i), self.positivas[i]) for i in sorted(self.positivas)])
+        for valor, cantidad in orden:
+            acumulado += cantidad
+            if acumulado > rango:
+                return valor
+        return orden[-1][0]
+
+    def a_dict(self):
+        # Claves de texto: el estado se guarda como JSON.
+        return {
+            'precision': self.precision,
+            'positivas': {str(i): c for i, c in self.positivas.items()},
+            'negativas': {str(i): c for i, c in self.negativas.items()},
+            'ceros': self.ceros,
+        }
+
+    @classmethod
+    def de_dict(cls, datos):
+        boceto = cls(datos['precision'])
+        boceto.positivas = {int(i): c for i, c in datos['positivas'].items()}
+        boceto.negativas = {int(i): c for i, c in datos['negativas'].items()}
+        boceto.ceros = datos['ceros']
+        return boceto
+
+
+class Agregado:
+    """Cantidad, sumas, sumas de cuadrados y boceto de cuantiles de cada indicador de un grupo."""
+
+    def __init__(self, precision=PRECISION_BOCETO):
+        self.n = 0
+        self.suma = dict.fromkeys(METRICAS, 0.0)
+        self.suma_cuadrados = dict.fromkeys(METRICAS, 0.0)
+        self.bocetos = {metrica: BocetoCuantiles(precision) for metrica in METRICAS}
+
+    def agregar(self, valores, n):
+        """Agrega `n` filas; `valores` tiene un arreglo por indicador (NaN = sin dato)."""
+        self.n += n
+        for metrica in METRICAS:
+            datos = valores[metrica][~np.isnan(valores[metrica])]
+            self.suma[metrica] += float(datos.sum())
+            self.suma_cuadrados[metrica] += float(np.dot(datos, datos))
+            self.bocetos[metrica].agregar(datos)
+
+    def fusionar(self, otro):
+        self.n += otro.n
+        for metrica in METRICAS:
+            self.suma[metrica] += otro.suma[metrica]
+            self.suma_cuadrados[metrica] += otro.suma_cuadrados[metrica]
+            self.bocetos[metrica].fusionar(otro.bocetos[metrica])
+        return self
+
+    def resumen(self, cuantiles=CUANTILES):
+        """Dict con 'n' y, por indicador, media, desviación estándar y cuantiles."""
+        fila = {'n': self.n}
+        for metrica in METRICAS:
+            boceto = self.bocetos[metrica]
+            n = boceto.n
+            media = self.suma[metrica] / n if n else float('nan')
+            varianza = (self.suma_cuadrados[metrica] - n * media ** 2) / (n - 1) if n > 1 else float('nan')
+            fila[f'{metrica}_media'] = media
+            fila[f'{metrica}_desviacion'] = math.sqrt(max(varianza, 0.0)) if n > 1 else float('nan')
+            for q in cuantiles:
+                fila[f'{metrica}_p{round(q * 100):02d}'] = boceto.cuantil(q)
+        return fila
+
+    def a_dict(self):
+        return {
+            'suma': dict(self.suma),
+            'suma_cuadrados': dict(self.suma_cuadrados),
+            'bocetos': {metrica: boceto.a_dict() for metrica, boceto in self.bocetos.items()},
+        }
+
+    @classmethod
+    def de_fila(cls, fila):
+        """Reconstruye un agregado desde una fila de TABLA_AGREGADOS."""
+        estado = fila['estado']
+        agregado = cls()
+        agregado.n = fila['n']
+        for metrica in METRICAS:
+            agregado.suma[metrica] = estado['suma'][metrica]
+            agregado.suma_cuadrados[metrica] = estado['suma_cuadrados'][metrica]
+            agregado.bocetos[metrica] = BocetoCuantiles.de_dict(estado['bocetos'][metrica])
+        return agregado
+
+
+def _mes_actual():
+    # Misma hora local que usa la app al guardar (UTC-5).
+    return (datetime.now(timezone.utc) - timedelta(hours=5)).strftime('%Y-%m')
+
+
+def agregar_registros(registros, precision=PRECISION_BOCETO):
+    """
+    Agrupa filas con el esquema de 'predicciones' por (área, sexo, mes).
+
+    Args:
+        registros: DataFrame o lista de dicts. El mes sale de 'created_at'
+            (sin fecha se usa el mes actual).
+
+    Returns:
+        dict: {(areaAn, sexo, mes): Agregado}.
+    """
+    df = registros if isinstance(registros, pd.DataFrame) else pd.DataFrame(list(registros))
+    if df.empty:
+        return {}
+    mes = pd.Series(_mes_actual(), index=df.index)
+    if 'created_at' in df:
+        mes = df['created_at'].astype(str).str[:7].where(df['created_at'].notna(), mes)
+    claves = pd.DataFrame({
+        'areaAn': df['areaAn'] if 'areaAn' in df else None,
+        'sexo': df['sexo'] if 'sexo' in df else None,
+        'mes': mes,
+    })
+    valores = {
+        metrica: pd.to_numeric(df[metrica], errors='coerce').to_numpy(np.float64) if metrica in df
+        else np.full(len(df), np.nan)
+        for metrica in METRICAS
+    }
+
+    agregados = {}
+    for clave, indices in claves.groupby(DIMENSIONES, dropna=False, sort=False).indices.items():
+        agregado = Agregado(precision)
+        agregado.agregar({metrica: v[indices] for metrica, v in valores.items()}, len(indices))
+        agregados[tuple(None if pd.isna(k) else k for k in clave)] = agregado
+    return agregados
+
+
+def _fila(clave, agregado):
+    return {**dict(zip(DIMENSIONES, clave)), 'n': agregado.n, 'estado': agregado.a_dict()}
+
+
+def _paginas(cliente, tabla, columnas, filtrar=None, hasta_id=None):
+    """Lee una tabla completa por páginas de TAMANO_PAGINA filas (por id ascendente)."""
+    ultimo = None
+    while True:
+        consulta = cliente.table(tabla).select(columnas)
+        if filtrar is not None:
+            consulta = filtrar(consulta)
+        if ultimo is not None:
+            consulta = consulta.gt('id', ultimo)
+        if hasta_id is not None:
+            consulta = consulta.lte('id', hasta_id)
+        filas = consulta.order('id').limit(TAMANO_PAGINA).execute().data or []
+        if filas:
+            yield filas
+        if len(filas) < TAMANO_PAGINA:
+            return
+        ultimo = filas[-1]['id']
+
+
+def _insertar(cliente, tabla, filas):
+    for inicio in range(0, len(filas), TAMANO_BLOQUE):
+        cliente.table(tabla).insert(filas[inicio:inicio + TAMANO_BLOQUE]).execute()
+
+
+def _borrar(cliente, tabla, ids):
+    """Borra las filas `ids` y devuelve las que efectivamente se borraron."""
+    borradas = []
+    for inicio in range(0, len(ids), TAMANO_BLOQUE):
+        borradas += cliente.table(tabla).delete().in_('id', ids[inicio:inicio + TAMANO_BLOQUE]).execute().data or []
+    return borradas
+
+
+def _filtrar_grupo(consulta, clave):
+    for columna, valor in zip(DIMENSIONES, clave):
+        consulta = consulta.is_(columna, 'null') if valor is None else consulta.eq(columna, valor)
+    return consulta
+
+
+def resumir(grupos, agrupar_por=DIMENSIONES, cuantiles=CUANTILES):
+    """
+    Fusiona agregados por un subconjunto de DIMENSIONES y los resume.
+
+    Args:
+        grupos (dict): {(areaAn, sexo, mes): Agregado}.
+        agrupar_por (list): Dimensiones que se conservan (p. ej. ['areaAn']
+            suma todos los sexos y meses de cada área).
+
+    Returns:
+        pd.DataFrame: Una fila por grupo con las dimensiones, 'n' y, por
+            indicador, '<indicador>_media', '_desviacion' y '_pXX'.
+    """
+    posiciones = [DIMENSIONES.index(d) for d in agrupar_por]
+    fusionados = {}
+    for clave, agregado in grupos.items():
+        subclave = tuple(clave[i] for i in posiciones)
+        if subclave not in fusionados:
+            fusionados[subclave] = Agregado(agregado.bocetos[METRICAS[0]].precision)
+        fusionados[subclave].fusionar(agregado)
+    filas = [{**dict(zip(agrupar_por, subclave)), **agregado.resumen(cuantiles)}
+             for subclave, agregado in fusionados.items()]
+    resultado = pd.DataFrame(filas)
+    if resultado.empty or not agrupar_por:
+        return resultado
+    return resultado.sort_values(list(agrupar_por), na_position='last', ignore_index=True)
+
+
+class AgregadosPredicciones:
+    """
+    Mantiene TABLA_AGREGADOS al día con las predicciones que se insertan.
+
+    Args:
+        tabla (str): Tabla de agregados.
+        precision (float): Precisión de los bocetos de cuantiles.
+    """
+
+    def __init__(self, tabla=TABLA_AGREGADOS, precision=PRECISION_BOCETO):
+        self.tabla = tabla
+        self.precision = precision
+        self._cola = ColaEscritura(self._escribir_deltas)
+        # Serializa las escrituras de la cola con `compactar` y `backfill`.
+        self._lock_escritura = threading.Lock()
+        # Contenido de filas borradas cuya fila fusionada no se pudo insertar
+        # (se reinserta en el próximo intento) y grupos ya escritos del lote en curso.
+        self._sin_guardar = {}
+        self._lote_en_curso = (None, set())
+
+    # --- escritura ---
+    def registrar(self, registros, cliente):
+        """
+        Suma filas recién insertadas en 'predicciones' a los agregados.
+        Vuelve de inmediato: la agregación y la escritura se hacen en
+        segundo plano, agrupando los lotes que lleguen juntos.
+
+        Args:
+            registros: Lista de dicts (o DataFrame) con el esquema de 'predicciones'.
+            cliente: Cliente de Supabase donde se insertaron.
+        """
+        if len(registros):
+            self._cola.encolar((cliente, registros))
+
+    def _fusionar_grupo(self, cliente, clave, delta=None):
+        """
+        Deja el grupo `clave` en una sola fila con su contenido más `delta`.
+
+        Returns:
+            int: Filas del grupo que había antes.
+        """
+        ids = [f['id'] for f in _filtrar_grupo(cliente.table(self.tabla).select('id'), clave).execute().data or []]
+        if not ids and delta is None and clave not in self._sin_guardar:
+            return 0
+        previo = self._sin_guardar.pop(clave, None) or Agregado(self.precision)
+        for fila in _borrar(cliente, self.tabla, ids):
+            previo.fusionar(Agregado.de_fila(fila))
+        fusion = Agregado(self.precision).fusionar(previo)
+        if delta is not None:
+            fusion.fusionar(delta)
+        try:
+            if fusion.n:
+                _insertar(cliente, self.tabla, [_fila(clave, fusion)])
+        except Exception:
+            # Lo borrado solo queda en memoria; `delta` no, porque el reintento lo vuelve a calcular.
+            self._sin_guardar[clave] = previo
+            raise
+        return len(ids)
+
+    def _escribir_deltas(self, lote):
+        # Se agrega desde las filas crudas en cada intento; los grupos que ya
+        # se escribieron en un intento anterior del mismo lote se saltan.
+        if self._lote_en_curso[0] is not lote:
+            self._lote_en_curso = (lote, set())
+        escritos = self._lote_en_curso[1]
+        por_cliente = {}
+        for cliente, registros in lote:
+            por_cliente.setdefault(id(cliente), (cliente, []))[1].append(
+                registros if isinstance(registros, pd.DataFrame) else pd.DataFrame(list(registros))
+            )
+        with self._lock_escritura:
+            for cliente, partes in por_cliente.values():
+                df = pd.concat(partes, ignore_index=True)
+                with metricas.medir('analitica_agregar', filas=len(df)):
+                    for clave, agregado in agregar_registros(df, self.precision).items():
+                        if (id(cliente), clave) not in escritos:
+                            self._fusionar_grupo(cliente, clave, agregado)
+                            escritos.add((id(cliente), clave))
+        self._lote_en_curso = (None, set())
+
+    def vaciar(self, timeout=None):
+        """Espera a que se escriban los agregados pendientes."""
+        return self._cola.vaciar(timeout)
+
+    # --- lectura ---
+    def leer(self, cliente, filtros=None):
+        """
+        Lee y fusiona las filas de agregados (nunca las predicciones).
+
+        Args:
+            filtros (dict, opcional): 'areaAn', 'sexo' (igualdad) y 'desde',
+                'hasta' (meses 'AAAA-MM', ambos incluidos).
+
+        Returns:
+            tuple: ({(areaAn, sexo, mes): Agregado}, filas de la tabla leídas).
+        """
+        filtros = {k: v for k, v in (filtros or {}).items() if v not in (None, '')}
+
+        def filtrar(consulta):
+            for columna in ('areaAn', 'sexo'):
+                if columna in filtros:
+                    consulta = consulta.eq(columna, filtros[columna])
+            if 'desde' in filtros:
+                consulta = consulta.gte('mes', filtros['desde'])
+            if 'hasta' in filtros:
+                consulta = consulta.lte('mes', filtros['hasta'])
+            return consulta
+
+        grupos = {}
+        leidas = 0
+        with metricas.medir('analitica_leer') as medicion:
+            for pagina in _paginas(cliente, self.tabla, 'id,areaAn,sexo,mes,n,estado', filtrar):
+                leidas += len(pagina)
+                for fila in pagina:
+                    clave = tuple(fila[d] for d in DIMENSIONES)
+                    agregado = Agregado.de_fila(fila)
+                    if clave in grupos:
+                        grupos[clave].fusionar(agregado)
+                    else:
+                        grupos[clave] = agregado
+            medicion.agregar_filas(leidas)
+        return grupos, leidas
+
+    def consultar(self, cliente, filtros=None, agrupar_por=DIMENSIONES, cuantiles=CUANTILES):
+        """Resumen por grupo (ver `resumir`) de los agregados que cumplen `filtros`."""
+        return resumir(self.leer(cliente, filtros)[0], agrupar_por, cuantiles)
+
+    # --- mantenimiento ---
+    def compactar(self, cliente):
+        """
+        Deja en una sola fila los grupos que tengan varias (p. ej. las filas
+        delta de versiones anteriores, o un `backfill` que corrió mientras
+        otro proceso escribía). Un corte entre el borrado y la inserción de
+        un grupo pierde ese grupo hasta el siguiente `backfill`.
+
+        Returns:
+            tuple: (filas antes, filas después).
+        """
+        self.vaciar()
+        with self._lock_escritura:
+            filas_por_grupo = {}
+            for pagina in _paginas(cliente, self.tabla, 'id,areaAn,sexo,mes'):
+                for fila in pagina:
+                    clave = tuple(fila[d] for d in DIMENSIONES)
+                    filas_por_grupo[clave] = filas_por_grupo.get(clave, 0) + 1
+            antes = sum(filas_por_grupo.values())
+            for clave, filas in filas_por_grupo.items():
+                if filas > 1:
+                    self._fusionar_grupo(cliente, clave)
+            despues = sum(len(p) for p in _paginas(cliente, self.tabla, 'id'))
+        return antes, despues
+
+    def backfill(self, cliente, progreso=None):
+        """
+        Recalcula la tabla de agregados desde todas las predicciones
+        guardadas (por páginas; la memoria depende solo de los grupos).
+        Se toman primero el último id de agregados y después el de
+        predicciones, y al final solo se borran los agregados hasta el
+        primero: todo lo que esos agregados contaban vuelve a contarse, y
+        las escrituras de este proceso esperan a que termine. Otros
+        procesos que escriban mientras tanto pueden dejar grupos contados
+        dos veces; conviene correrlo sin la app guardando.
+
+        Args:
+            progreso (callable, opcional): Recibe las filas leídas después de cada página.
+
+        Returns:
+            int: Predicciones leídas.
+        """
+        self.vaciar()
+        with self._lock_escritura:
+            self._sin_guardar.clear()
+            ultimo_agregado = cliente.table(self.tabla).select('id').order('id', desc=True).limit(1).execute().data
+            ultima = cliente.table(TABLA_PREDICCIONES).select('id').order('id', desc=True).limit(1).execute().data
+
+            grupos = {}
+            leidas = 0
+            columnas = ','.join(['id', 'created_at', 'areaAn', 'sexo'] + METRICAS)
+            paginas = _paginas(cliente, TABLA_PREDICCIONES, columnas, hasta_id=ultima[0]['id']) if ultima else []
+            for pagina in paginas:
+                for clave, agregado in agregar_registros(pagina, self.precision).items():
+                    if clave in grupos:
+                        grupos[clave].fusionar(agregado)
+                    else:
+                        grupos[clave] = agregado
+                leidas += len(pagina)
+                if progreso is not None:
+                    progreso(leidas)
+
+            _insertar(cliente, self.tabla, [_fila(clave, agregado) for clave, agregado in grupos.items()])
+            if ultimo_agregado:
+                anteriores = [fila['id'] for pagina in _paginas(cliente, self.tabla, 'id',
+                                                                hasta_id=ultimo_agregado[0]['id'])
+                              for fila in pagina]
+                _borrar(cliente, self.tabla, anteriores)
+        return leidas
+
+    def estadisticas(self):
+        return self._cola.estadisticas()
+
+
+# Instancia única del proceso.
+agregados = AgregadosPredicciones()
+
+
+def panel_analitica(cliente):
+    """Tablero de indicadores por área, sexo y mes calculado solo con los agregados."""
+    import streamlit as st
+
+    st.subheader("📊 Analítica de predicciones")
+    try:
+        grupos, leidas = agregados.leer(cliente)
+    except Exception as e:
+        st.error(f"Error al cargar los agregados: {e}")
+        return
+    if not grupos:
+        st.info("Todavía no hay agregados. Se crean al guardar predicciones; para las ya guardadas, "
+                "ejecuta `python -m src.utils.analitica backfill`.")
+        return
+
+    areas = sorted({clave[0] for clave in grupos if clave[0] is not None})
+    sexos = sorted({clave[1] for clave in grupos if clave[1] is not None})
+    meses = sorted({clave[2] for clave in grupos if clave[2] is not None})
+    col1, col2, col3 = st.columns(3)
+    area = col1.selectbox('Área', ['Todas'] + areas, key='analitica_area')
+    sexo = col1.selectbox('Sexo', ['Todos'] + sexos, key='analitica_sexo')
+    metrica = col2.selectbox('Indicador', METRICAS, key='analitica_metrica')
+    agrupar_por = col2.multiselect('Agrupar por', DIMENSIONES, default=DIMENSIONES, key='analitica_agrupar')
+    desde, hasta = meses[0], meses[-1]
+    if len(meses) > 1:
+        desde, hasta = col3.select_slider('Meses', options=meses, value=(meses[0], meses[-1]), key='analitica_meses')
+
+    seleccion = {
+        clave: agregado for clave, agregado in grupos.items()
+        if (area == 'Todas' or clave[0] == area) and (sexo == 'Todos' or clave[1] == sexo)
+        and (clave[2] is None or desde <= clave[2] <= hasta)
+    }
+    resumen = resumir(seleccion, [d for d in DIMENSIONES if d in agrupar_por])
+    if resumen.empty:
+        st.warning("No hay datos para los filtros elegidos.")
+        return
+    columnas = [d for d in DIMENSIONES if d in agrupar_por] + ['n'] + [c for c in resumen.columns if c.startswith(f'{metrica}_')]
+    st.dataframe(resumen[columnas].round(3), use_container_width=True, hide_index=True)
+
+    if 'mes' in agrupar_por:
+        series = [d for d in ('areaAn', 'sexo') if d in agrupar_por]
+        curvas = resumen.assign(serie=resumen[series].astype(str).agg(' '.join, axis=1) if series else metrica)
+        st.line_chart(curvas.pivot_table(index='mes', columns='serie', values=f'{metrica}_p50'))
+        st.caption("Mediana por mes (error relativo de los percentiles: "
+                   f"{agregados.precision:.0%}).")
+
+    st.caption(f"{len(grupos):,} grupos a partir de {leidas:,} filas de agregados.")
+    if leidas > len(grupos) and st.button("🧹 Compactar agregados", key='analitica_compactar'):
+        antes, despues = agregados.compactar(cliente)
+        st.success(f"Agregados compactados: {antes:,} → {despues:,} filas.")
+
+
+if __name__ == '__main__':
+    # Mantenimiento sin Streamlit (con SUPABASE_URL y SUPABASE_KEY):
+    #   python -m src.utils.analitica backfill
+    #   python -m src.utils.analitica compactar
+    #   python -m src.utils.analitica consultar --agrupar-por areaAn mes
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Agregados incrementales de la tabla de predicciones.')
+    parser.add_argument('comando', choices=['backfill', 'compactar', 'consultar'])
+    parser.add_argument('--agrupar-por', nargs='*', choices=DIMENSIONES, default=DIMENSIONES)
+    args = parser.parse_args()
+
+    if not os.getenv('SUPABASE_URL') or not os.getenv('SUPABASE_KEY'):
+        raise SystemExit('Configura las variables de entorno SUPABASE_URL y SUPABASE_KEY.')
+    from supabase import create_client
+    cliente = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+    if args.comando == 'backfill':
+        leidas = agregados.backfill(cliente, progreso=lambda n: print(f'\r{n:,} predicciones leídas', end=''))
+        print(f'\n{leidas:,} predicciones agregadas.')
+    elif args.comando == 'compactar':
+        antes, despues = agregados.compactar(cliente)
+        print(f'{antes:,} filas de agregados -> {despues:,}.')
+    else:
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            print(agregados.consultar(cliente, agrupar_por=args.agrupar_por))
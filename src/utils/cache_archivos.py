@@ -0,0 +1,264 @@
+# src/utils/cache_archivos.py
+
+import hashlib
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.predictores.predicciones_ML import MODELOS_ML, version_modelos
+from src.predictores.registro_modelos import registro
+from src.utils.formatos_columnares import FORMATOS_SALIDA
+from src.utils.instrumentacion import metricas
+from src.utils.lote_streaming import predecir_archivo_en_bloques
+
+# --- 1. CACHÉ DE RESULTADOS POR ARCHIVO ---
+# Cada interacción con un widget vuelve a ejecutar app.py desde arriba, y
+# con el archivo todavía subido se repetía todo el pipeline (codificación,
+# lectura, mapeo y predict_all) solo para volver a dibujar la página o
+# descargar el CSV. Ahora el resultado se guarda con una clave formada por
+# el hash del contenido, el formato, la versión de los modelos, los datos
+# del usuario (que van en el CSV), así que los reruns y las descargas
+# siguientes no recalculan nada. Cada formato de salida (csv, parquet,
+# arrow) es una entrada distinta, guardada con su propia extensión.
+#
+# El pipeline es en streaming y nunca arma el DataFrame completo del
+# archivo: lo que se guarda es el archivo de salida y el resumen (con las
+# vistas previas). En memoria se guardan hasta CACHE_ARCHIVOS_MB megabytes
+# (descartando lo menos usado); con CACHE_ARCHIVOS_DIR también se guardan
+# en disco, hasta CACHE_ARCHIVOS_DISCO_MB, y sobreviven a un reinicio.
+
+TAMANO_MEMORIA_MB = float(os.getenv('CACHE_ARCHIVOS_MB', '256'))
+DIRECTORIO = os.getenv('CACHE_ARCHIVOS_DIR') or None
+TAMANO_DISCO_MB = float(os.getenv('CACHE_ARCHIVOS_DISCO_MB', '2048'))
+
+
+def hash_contenido(archivo):
+    """SHA-256 del contenido de un archivo binario; lo deja posicionado al inicio."""
+    sha = hashlib.sha256()
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(1 << 20), b''):
+        sha.update(bloque)
+    archivo.seek(0)
+    return sha.hexdigest()
+
+
+def clave_archivo(archivo, nombre_archivo, *extras):
+    """Clave de caché: contenido + formato + versión de los modelos + `extras`."""
+    partes = [hash_contenido(archivo), os.path.splitext(nombre_archivo)[1].lower(), version_modelos()]
+    partes += [str(extra) for extra in extras]
+    return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+
+def _tamano_resumen(resumen):
+    return sum(int(v.memory_usage(deep=True).sum()) for v in resumen.values() if isinstance(v, pd.DataFrame))
+
+
+def _copiar_resumen(resumen):
+    return {k: v.copy() if isinstance(v, pd.DataFrame) else v for k, v in resumen.items()}
+
+
+class CacheArchivos:
+    """
+    Caché LRU thread-safe de resultados por archivo, acotada en bytes, con
+    un segundo nivel opcional en disco.
+
+    Args:
+        tamano_max_mb (float): Megabytes máximos en memoria (salida + vistas previas).
+        directorio (str, opcional): Carpeta del nivel en disco (None = solo memoria).
+        tamano_disco_mb (float): Megabytes máximos en disco.
+    """
+
+    def __init__(self, tamano_max_mb=TAMANO_MEMORIA_MB, directorio=DIRECTORIO, tamano_disco_mb=TAMANO_DISCO_MB):
+        self.tamano_max = int(tamano_max_mb * 2**20)
+        self.directorio = directorio
+        self.tamano_disco_max = int(tamano_disco_mb * 2**20)
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    @staticmethod
+    def _entrada(clave, formato):
+        """Nombre de la entrada: la clave con la extensión del formato de salida."""
+        return f'{clave}{FORMATOS_SALIDA[formato][0]}'
+
+    def _rutas(self, entrada):
+        return os.path.join(self.directorio, entrada), os.path.join(self.directorio, f'{entrada}.pkl')
+
+    def _guardar_en_memoria(self, clave, datos, resumen):
+        tamano = len(datos) + _tamano_resumen(resumen)
+        if tamano > self.tamano_max:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._datos[clave] = (datos, resumen, tamano)
+            self._bytes += tamano
+            while self._bytes > self.tamano_max:
+                _, (_, _, liberado) = self._datos.popitem(last=False)
+                self._bytes -= liberado
+
+    def _leer_de_disco(self, entrada):
+        ruta_datos, ruta_resumen = self._rutas(entrada)
+        try:
+            with open(ruta_resumen, 'rb') as f:
+                resumen = pickle.load(f)
+            with open(ruta_datos, 'rb') as f:
+                datos = f.read()
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(ruta_resumen)  # Marca de uso para el descarte en disco.
+        return datos, resumen
+
+    def _guardar_en_disco(self, entrada, origen, resumen):
+        ruta_datos, ruta_resumen = self._rutas(entrada)
+        # Escritura atómica: otro proceso nunca ve una entrada a medias.
+        for ruta, escribir in ((ruta_datos, lambda f: shutil.copyfileobj(origen, f)),
+                               (ruta_resumen, lambda f: pickle.dump(resumen, f))):
+            temporal = f'{ruta}.{threading.get_ident()}.tmp'
+            with open(temporal, 'wb') as f:
+                escribir(f)
+            os.replace(temporal, ruta)
+        self._descartar_en_disco()
+
+    def _descartar_en_disco(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar bajo el límite."""
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith('.pkl'):
+                rutas = self._rutas(nombre[:-4])
+                try:
+                    tamano = sum(os.path.getsize(r) for r in rutas)
+                    entradas.append((os.path.getmtime(rutas[1]), tamano, rutas))
+                except OSError:
+                    continue
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, rutas in sorted(entradas):
+            if total <= self.tamano_disco_max:
+                break
+            for ruta in rutas:
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+            total -= tamano
+
+    def obtener(self, clave, formato='csv'):
+        """
+        Devuelve (archivo binario en `formato` posicionado al inicio, resumen) o None.
+        El resumen es una copia: se puede modificar sin afectar la caché.
+        """
+        clave = self._entrada(clave, formato)
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos_memoria += 1
+        if entrada is not None:
+            metricas.contar('cache_archivos_aciertos')
+            return io.BytesIO(entrada[0]), _copiar_resumen(entrada[1])
+
+        leido = self._leer_de_disco(clave) if self.directorio else None
+        with self._lock:
+            if leido is None:
+                self.fallos += 1
+            else:
+                self.aciertos_disco += 1
+        if leido is None:
+            metricas.contar('cache_archivos_fallos')
+            return None
+        metricas.contar('cache_archivos_aciertos')
+        self._guardar_en_memoria(clave, *leido)
+        return io.BytesIO(leido[0]), _copiar_resumen(leido[1])
+
+    def guardar(self, clave, salida, resumen, formato='csv'):
+        """Guarda la salida en `formato` (archivo binario, se lee desde el inicio) y el resumen."""
+        clave = self._entrada(clave, formato)
+        salida.seek(0, os.SEEK_END)
+        tamano_salida = salida.tell()
+        if tamano_salida + _tamano_resumen(resumen) <= self.tamano_max:
+            salida.seek(0)
+            self._guardar_en_memoria(clave, salida.read(), _copiar_resumen(resumen))
+        if self.directorio:
+            salida.seek(0)
+            self._guardar_en_disco(clave, salida, resumen)
+        salida.seek(0)
+
+    def limpiar(self):
+        """Vacía el nivel en memoria (el disco queda: sus claves incluyen la versión)."""
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos_memoria + self.aciertos_disco + self.fallos
+            return {
+                'entradas': len(self._datos),
+                'mb_en_memoria': round(self._bytes / 2**20, 1),
+                'mb_max': round(self.tamano_max / 2**20, 1),
+                'aciertos_memoria': self.aciertos_memoria,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'tasa_aciertos': round((self.aciertos_memoria + self.aciertos_disco) / total, 3) if total else 0.0,
+                'directorio': self.directorio,
+            }
+
+
+# Caché única del proceso.
+cache_archivos = CacheArchivos()
+
+
+def _invalidar_si_es_modelo_ml(nombre):
+    if nombre in MODELOS_ML:
+        cache_archivos.limpiar()
+
+
+registro.al_recargar(_invalidar_si_es_modelo_ml)
+
+
+def predecir_archivo_cacheado(archivo, nombre_archivo, nombre_user=None, cargo_user=None,
+                              progreso=None, al_procesar_bloque=None, formato='csv'):
+    """
+    Igual que `predecir_archivo_en_bloques`, pero consulta primero la caché.
+
+    Con `al_procesar_bloque` (p. ej. guardar en Supabase) el archivo se
+    procesa siempre, porque el callback necesita los bloques; el resultado
+    igual queda guardado para los reruns siguientes.
+
+    Returns:
+        tuple: (salida_csv, resumen, desde_cache), donde `salida_csv` es un
+            archivo binario con los resultados en `formato` (csv, parquet o
+            arrow), posicionado al inicio.
+    """
+    try:
+        clave = clave_archivo(archivo, nombre_archivo, nombre_user, cargo_user)
+    except FileNotFoundError:
+        # Sin modelos no hay versión: el pipeline se encarga de avisar.
+        clave = None
+
+    if clave is not None and al_procesar_bloque is None:
+        encontrado = cache_archivos.obtener(clave, formato)
+        if encontrado is not None:
+            return (*encontrado, True)
+
+    salida_csv = tempfile.TemporaryFile()
+    resumen = predecir_archivo_en_bloques(
+        archivo, nombre_archivo, salida_csv, nombre_user, cargo_user,
+        progreso=progreso, al_procesar_bloque=al_procesar_bloque, formato=formato,
+    )
+    if clave is not None:
+        cache_archivos.guardar(clave, salida_csv, resumen, formato)
+    salida_csv.seek(0)
+    return salida_csv, resumen, False
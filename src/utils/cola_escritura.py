@@ -0,0 +1,152 @@
+# src/utils/cola_escritura.py
+
+import atexit
+import collections
+import queue
+import threading
+import time
+
+# --- 1. COLA DE ESCRITURA EN SEGUNDO PLANO ---
+# Guardar una predicción no debería bloquear el script de Streamlit mientras
+# viaja a Supabase. Las filas se encolan y un hilo las agrupa en lotes, las
+# inserta con una sola llamada, reintenta con espera exponencial si falla y
+# vacía lo pendiente al cerrar el proceso. Las filas que agotan los
+# reintentos quedan en `fallidas` (las `max_fallidas` más recientes) hasta
+# que se vuelven a encolar con `reintentar_fallidas`.
+
+
+class ColaEscritura:
+    """
+    Cola thread-safe que agrupa filas y las escribe en segundo plano.
+
+    Args:
+        insertar (callable): Recibe una lista de dicts y los escribe (una llamada por lote).
+        tamano_lote (int): Máximo de filas por llamada a `insertar`.
+        espera_lote (float): Segundos que se espera a juntar más filas antes de escribir.
+        reintentos (int): Intentos adicionales por lote si `insertar` falla.
+        espera_base (float): Espera antes del primer reintento; se duplica en cada uno.
+        max_fallidas (int): Filas fallidas que se conservan; las más viejas se descartan.
+    """
+
+    def __init__(self, insertar, tamano_lote=100, espera_lote=1.0, reintentos=4, espera_base=0.5,
+                 max_fallidas=1000):
+        self.insertar = insertar
+        self.tamano_lote = tamano_lote
+        self.espera_lote = espera_lote
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+        self.escritas = 0
+        self.lotes = 0
+        self.reintentos_hechos = 0
+        self.fallidas = collections.deque(maxlen=max_fallidas)
+        self.descartadas = 0
+        self.ultimo_error = None
+
+        atexit.register(self.cerrar)
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._trabajar, name='cola_escritura', daemon=True)
+                self._hilo.start()
+
+    def encolar(self, fila):
+        """Agrega una fila (dict) a la cola; vuelve de inmediato."""
+        self._iniciar()
+        self._cola.put(fila)
+
+    def _siguiente_lote(self):
+        """Espera la primera fila y junta hasta `tamano_lote` durante `espera_lote` segundos."""
+        try:
+            lote = [self._cola.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.espera_lote
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0 or self._detener.is_set():
+                restante = 0
+            try:
+                lote.append(self._cola.get(timeout=restante) if restante else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote):
+        for intento in range(self.reintentos + 1):
+            try:
+                self.insertar(lote)
+                self.escritas += len(lote)
+                self.lotes += 1
+                return
+            except Exception as e:
+                self.ultimo_error = str(e)
+                if intento == self.reintentos:
+                    print(f"ERROR: No se pudieron guardar {len(lote)} filas tras {intento + 1} intentos. {e}")
+                    with self._lock:
+                        self.descartadas += max(0, len(self.fallidas) + len(lote) - self.fallidas.maxlen)
+                        self.fallidas.extend(lote)
+                    return
+                self.reintentos_hechos += 1
+                time.sleep(self.espera_base * 2 ** intento)
+
+    def _trabajar(self):
+        while not (self._detener.is_set() and self._cola.empty()):
+            lote = self._siguiente_lote()
+            if lote:
+                try:
+                    self._escribir(lote)
+                finally:
+                    for _ in lote:
+                        self._cola.task_done()
+
+    def reintentar_fallidas(self):
+        """
+        Vuelve a encolar las filas que agotaron sus reintentos.
+
+        Returns:
+            int: Filas encoladas de nuevo.
+        """
+        with self._lock:
+            filas = list(self.fallidas)
+            self.fallidas.clear()
+        for fila in filas:
+            self.encolar(fila)
+        return len(filas)
+
+    def vaciar(self, timeout=None):
+        """
+        Espera a que se escriban todas las filas encoladas.
+
+        Returns:
+            bool: True si la cola quedó vacía dentro del tiempo límite.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def cerrar(self, timeout=30):
+        """Escribe lo pendiente y detiene el hilo (se llama también al salir del proceso)."""
+        self._detener.set()
+        if self._hilo is not None and self._hilo.is_alive():
+            self._hilo.join(timeout)
+
+    def estadisticas(self):
+        return {
+            'pendientes': self._cola.qsize(),
+            'escritas': self.escritas,
+            'lotes': self.lotes,
+            'reintentos': self.reintentos_hechos,
+            'fallidas': len(self.fallidas),
+            'descartadas': self.descartadas,
+            'ultimo_error': self.ultimo_error,
+        }
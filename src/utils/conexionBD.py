@@ -1,18 +1,27 @@
 #Librerias para la conexión a Supabase
 import os
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
 import streamlit as st
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Obtener las variables de entorno  
 url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
 #funcion para crear el cliente de supabase
-def init_supabase() -> Client:
+def init_supabase() -> "Client":
     """
     Inicializa el cliente de Supabase y lo almacena en st.session_state.
     Así, la conexión persiste a través de los reruns de Streamlit.
     """
     if "supabase_client" not in st.session_state:
+
+        # Con SUPABASE_LOCAL=1 se usa un sustituto en memoria (sin credenciales).
+        if os.getenv("SUPABASE_LOCAL") == "1":
+            from src.utils.supabase_local import ClienteSupabaseLocal
+            st.session_state.supabase_client = ClienteSupabaseLocal()
+            return st.session_state.supabase_client
         
         SUPABASE_URL = os.getenv("SUPABASE_URL")
         SUPABASE_KEY = os.getenv("SUPABASE_KEY")
@@ -21,6 +30,8 @@ def init_supabase() -> Client:
             st.stop()
 
         try:
+            # Se importa aquí: supabase es pesado y solo hace falta al conectarse.
+            from supabase import create_client
             st.session_state.supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
             st.success("Conexión a Supabase establecida.")
         except Exception as e:
@@ -0,0 +1,170 @@
+# src/utils/formatos_columnares.py
+
+import numpy as np
+import pandas as pd
+
+# --- 1. ENTRADA Y SALIDA EN PARQUET / ARROW IPC ---
+# CSV y Excel son lentos de leer y escribir a gran escala y pierden los
+# tipos. Los archivos Parquet y Arrow IPC (Feather v2) se leen por bloques
+# igual que un CSV, y los resultados se pueden escribir en esos formatos con
+# un esquema fijo: predicciones en float32 y columnas categóricas (área,
+# sexo, galpón, usuario) como diccionarios, para que las herramientas de
+# abajo carguen las corridas nocturnas sin volver a parsear texto.
+#
+# pyarrow se importa recién cuando se usa uno de estos formatos.
+
+EXTENSIONES_PARQUET = ('.parquet', '.pq')
+EXTENSIONES_ARROW = ('.arrow', '.feather', '.ipc')
+# Formatos de descarga: extensión y tipo MIME.
+FORMATOS_SALIDA = {
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+# Columnas que se guardan como diccionario (si están en el resultado).
+COLUMNAS_CATEGORICAS = ['Area', 'Sexo', 'Galpon', 'Nombre Usuario', 'Cargo Usuario']
+
+
+def es_columnar(nombre_archivo):
+    return nombre_archivo.lower().endswith(EXTENSIONES_PARQUET + EXTENSIONES_ARROW)
+
+
+def leer_parquet_en_bloques(archivo, filas_por_bloque):
+    """Lee un Parquet por lotes de `filas_por_bloque` filas (sin cargarlo completo)."""
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(archivo)
+    total_filas = parquet.metadata.num_rows
+    leidas = 0
+    for lote in parquet.iter_batches(batch_size=filas_por_bloque):
+        leidas += lote.num_rows
+        yield lote.to_pandas(), min(leidas / total_filas, 1.0) if total_filas else 1.0
+    if not total_filas:
+        yield parquet.schema_arrow.empty_table().to_pandas(), 1.0
+
+
+def leer_arrow_en_bloques(archivo, filas_por_bloque):
+    """Lee un archivo Arrow IPC (formato archivo o stream) en bloques de hasta `filas_por_bloque` filas."""
+    import pyarrow as pa
+
+    try:
+        lector = pa.ipc.open_file(archivo)
+        total_lotes = lector.num_record_batches
+        lotes = (lector.get_batch(i) for i in range(total_lotes))
+    except pa.ArrowInvalid:
+        # No es el formato archivo: se intenta como stream (sin total conocido).
+        archivo.seek(0)
+        lector = pa.ipc.open_stream(archivo)
+        total_lotes, lotes = None, lector
+
+    leidas = 0
+    for numero, lote in enumerate(lotes, start=1):
+        # Los record batches pueden ser más grandes que el bloque: se cortan.
+        for inicio in range(0, lote.num_rows, filas_por_bloque):
+            parte = lote.slice(inicio, filas_por_bloque)
+            leidas += parte.num_rows
+            yield parte.to_pandas(), numero / total_lotes if total_lotes else 0.0
+    if not leidas:
+        yield lector.schema.empty_table().to_pandas(), 1.0
+
+
+class EscritorColumnar:
+    """
+    Escribe bloques de resultados en Parquet (un row group por bloque) o en
+    Arrow IPC (un record batch por bloque) con un esquema fijo, tomado del
+    primer bloque:
+
+    - `columnas_float32`: float32.
+    - COLUMNAS_CATEGORICAS y las columnas de texto: dictionary<int32, string>.
+    - El resto conserva el tipo del primer bloque (los bloques siguientes se
+      convierten a ese tipo).
+
+    El formato archivo de Arrow IPC admite un solo diccionario por columna,
+    así que en ese caso el diccionario se va ampliando bloque a bloque y se
+    escribe como delta (solo los valores nuevos).
+
+    Args:
+        destino: Archivo binario de salida.
+        formato (str): 'parquet' o 'arrow'.
+        columnas_float32 (list): Columnas de predicción.
+    """
+
+    def __init__(self, destino, formato, columnas_float32=()):
+        if formato not in ('parquet', 'arrow'):
+            raise ValueError(f"Formato columnar desconocido: '{formato}'. Opciones: parquet, arrow")
+        self.destino = destino
+        self.formato = formato
+        self.columnas_float32 = list(columnas_float32)
+        self.esquema = None
+        self._escritor = None
+        self._diccionarios = {}
+
+    def _a_tabla(self, df):
+        import pyarrow as pa
+
+        df = df.copy()
+        for columna in df.columns:
+            if columna in COLUMNAS_CATEGORICAS or df[columna].dtype == object or isinstance(df[columna].dtype, pd.CategoricalDtype):
+                # Texto uniforme (un galpón puede venir como número en un bloque y como texto en otro).
+                df[columna] = df[columna].astype(str).where(df[columna].notna(), None)
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self.esquema is None:
+            campos = []
+            for campo in tabla.schema:
+                if campo.name in self.columnas_float32:
+                    campo = campo.with_type(pa.float32())
+                elif pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type) or pa.types.is_null(campo.type):
+                    campo = campo.with_type(pa.dictionary(pa.int32(), pa.string()))
+                campos.append(campo)
+            self.esquema = pa.schema(campos)
+        tabla = tabla.select(self.esquema.names).cast(self.esquema)
+        if self.formato == 'arrow':
+            tabla = self._diccionarios_acumulados(tabla)
+        return tabla
+
+    def _diccionarios_acumulados(self, tabla):
+        """Recodifica las columnas diccionario contra el diccionario acumulado de cada una."""
+        import pyarrow as pa
+
+        columnas = []
+        for campo, columna in zip(self.esquema, tabla.columns):
+            if pa.types.is_dictionary(campo.type):
+                categorica = columna.to_pandas()
+                conocidos = self._diccionarios.get(campo.name, pd.Index([], dtype=object))
+                nuevos = categorica.cat.categories.difference(conocidos, sort=False)
+                conocidos = self._diccionarios[campo.name] = conocidos.append(nuevos)
+                codigos = categorica.cat.codes.to_numpy()
+                posiciones = conocidos.get_indexer(categorica.cat.categories)
+                codigos = np.where(codigos >= 0, posiciones[codigos] if len(posiciones) else -1, -1)
+                columna = pa.DictionaryArray.from_arrays(
+                    pa.array(codigos, pa.int32(), mask=codigos < 0), pa.array(conocidos, pa.string())
+                )
+            columnas.append(columna)
+        return pa.Table.from_arrays(columnas, schema=self.esquema)
+
+    def escribir(self, df):
+        tabla = self._a_tabla(df)
+        if self._escritor is None:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self.formato == 'parquet':
+                self._escritor = pq.ParquetWriter(self.destino, self.esquema, compression='zstd')
+            else:
+                opciones = pa.ipc.IpcWriteOptions(compression='zstd', emit_dictionary_deltas=True)
+                self._escritor = pa.ipc.new_file(self.destino, self.esquema, options=opciones)
+        if self.formato == 'parquet':
+            self._escritor.write_table(tabla)
+        else:
+            for lote in tabla.to_batches():
+                self._escritor.write_batch(lote)
+
+    def cerrar(self):
+        """
+        Cierra el archivo. Si no se escribió ningún bloque, deja igual un
+        archivo válido y vacío con las columnas de predicción (float32).
+        """
+        if self._escritor is None:
+            self.escribir(pd.DataFrame({columna: pd.Series(dtype='float32') for columna in self.columnas_float32}))
+        self._escritor.close()
@@ -0,0 +1,217 @@
+# src/utils/instrumentacion.py
+
+import functools
+import os
+import threading
+import time
+
+from src.predictores.registro_modelos import memoria_rss
+
+# --- 1. INSTRUMENTACIÓN POR ETAPAS ---
+# Tiempos, filas y memoria de cada etapa del pipeline (detectar la
+# codificación, leer, codificar, predecir, quitar duplicados, escribir el
+# CSV, guardar en Supabase/SharePoint...), para saber qué etapa es la lenta.
+#
+#   with metricas.medir('predict_all', filas=len(X)):
+#       ...
+#   @metricas.cronometrar('crear_predicciones_bulk')
+#   def crear_predicciones_bulk(...): ...
+#
+# Se activa con INSTRUMENTACION=1 o con `metricas.habilitar()`. Desactivada,
+# `medir` devuelve siempre el mismo objeto que no hace nada y los
+# decoradores solo revisan un booleano, así que el costo es casi nulo.
+# Las métricas son del proceso: acumulan todas las sesiones de Streamlit.
+
+
+class _MedicionNula:
+    """Medición que no hace nada (instrumentación desactivada)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def agregar_filas(self, n):
+        pass
+
+
+_MEDICION_NULA = _MedicionNula()
+
+
+class _Medicion:
+    __slots__ = ('metricas', 'etapa', 'filas', 'inicio')
+
+    def __init__(self, metricas, etapa, filas):
+        self.metricas = metricas
+        self.etapa = etapa
+        self.filas = filas or 0
+
+    def agregar_filas(self, n):
+        """Suma filas procesadas cuando no se conocen al entrar a la etapa."""
+        self.filas += n
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metricas._registrar(self.etapa, time.perf_counter() - self.inicio, self.filas)
+        return False
+
+
+class Metricas:
+    """Acumulador thread-safe de tiempos, filas, contadores y memoria por etapa."""
+
+    def __init__(self, habilitada=False):
+        self.habilitada = habilitada
+        self._lock = threading.Lock()
+        self.limpiar()
+
+    def habilitar(self, habilitada=True):
+        self.habilitada = habilitada
+
+    def limpiar(self):
+        with self._lock:
+            # etapa -> [llamadas, segundos_total, segundos_max, filas, memoria_rss]
+            self._etapas = {}
+            self._contadores = {}
+
+    def medir(self, etapa, filas=None):
+        """Context manager que mide la duración (y opcionalmente las filas) de una etapa."""
+        if not self.habilitada:
+            return _MEDICION_NULA
+        return _Medicion(self, etapa, filas)
+
+    def cronometrar(self, etapa):
+        """Decorador: mide cada llamada a la función como la etapa `etapa`."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.habilitada:
+                    return funcion(*args, **kwargs)
+                with _Medicion(self, etapa, 0):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def medir_iterable(self, iterable, etapa, filas=len):
+        """
+        Mide el tiempo que tarda en producirse cada elemento de un iterable
+        (por ejemplo, cada bloque leído de un archivo).
+
+        Args:
+            filas (callable): Cuenta las filas de cada elemento.
+        """
+        if not self.habilitada:
+            return iterable
+        return self._iterar_midiendo(iter(iterable), etapa, filas)
+
+    def _iterar_midiendo(self, iterador, etapa, filas):
+        while True:
+            inicio = time.perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            self._registrar(etapa, time.perf_counter() - inicio, filas(elemento))
+            yield elemento
+
+    def contar(self, nombre, n=1):
+        if not self.habilitada:
+            return
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + n
+
+    def _registrar(self, etapa, segundos, filas):
+        memoria = memoria_rss()
+        with self._lock:
+            datos = self._etapas.setdefault(etapa, [0, 0.0, 0.0, 0, None])
+            datos[0] += 1
+            datos[1] += segundos
+            datos[2] = max(datos[2], segundos)
+            datos[3] += filas
+            datos[4] = memoria
+
+    def resumen(self):
+        """Lista de dicts por etapa, ordenada por tiempo total (la más lenta primero)."""
+        with self._lock:
+            etapas = {k: list(v) for k, v in self._etapas.items()}
+        filas = []
+        for etapa, (llamadas, total, maximo, n_filas, memoria) in etapas.items():
+            filas.append({
+                'etapa': etapa,
+                'llamadas': llamadas,
+                'segundos_total': round(total, 6),
+                'segundos_max': round(maximo, 6),
+                'filas': n_filas,
+                'filas_por_segundo': round(n_filas / total) if n_filas and total > 0 else None,
+                'memoria_mb': round(memoria / 2**20, 1) if memoria else None,
+            })
+        return sorted(filas, key=lambda f: f['segundos_total'], reverse=True)
+
+    def contadores(self):
+        with self._lock:
+            return dict(self._contadores)
+
+    def exportar_prometheus(self, prefijo='app'):
+        """Texto en el formato de exposición de Prometheus."""
+        resumen = self.resumen()
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f'# HELP {prefijo}_{nombre} {ayuda}')
+            lineas.append(f'# TYPE {prefijo}_{nombre} {tipo}')
+            for etiquetas, valor in valores:
+                lineas.append(f'{prefijo}_{nombre}{{{etiquetas}}} {valor}')
+
+        metrica('etapa_llamadas_total', 'counter', 'Veces que se ejecutó la etapa.',
+                [(f'etapa="{f["etapa"]}"', f['llamadas']) for f in resumen])
+        metrica('etapa_segundos_total', 'counter', 'Segundos acumulados en la etapa.',
+                [(f'etapa="{f["etapa"]}"', f['segundos_total']) for f in resumen])
+        metrica('etapa_segundos_max', 'gauge', 'Duración máxima de una ejecución de la etapa.',
+                [(f'etapa="{f["etapa"]}"', f['segundos_max']) for f in resumen])
+        metrica('etapa_filas_total', 'counter', 'Filas procesadas por la etapa.',
+                [(f'etapa="{f["etapa"]}"', f['filas']) for f in resumen])
+        metrica('etapa_memoria_rss_bytes', 'gauge', 'Memoria residente al terminar la última ejecución.',
+                [(f'etapa="{f["etapa"]}"', int(f['memoria_mb'] * 2**20)) for f in resumen if f['memoria_mb']])
+        metrica('eventos_total', 'counter', 'Contadores de eventos.',
+                [(f'nombre="{nombre}"', valor) for nombre, valor in sorted(self.contadores().items())])
+        return '\n'.join(lineas) + '\n'
+
+
+# Métricas únicas del proceso.
+metricas = Metricas(habilitada=os.getenv('INSTRUMENTACION') == '1')
+
+
+# --- 2. PANEL DE DIAGNÓSTICO (STREAMLIT) ---
+
+def panel_diagnostico(contenedor):
+    """
+    Muestra el panel de diagnóstico en `contenedor` (p. ej. st.sidebar):
+    la tabla por etapa y la exportación en formato Prometheus.
+
+    La medición es del proceso y la comparten todas las sesiones, así que
+    no se enciende desde la interfaz (una sesión la cambiaría para todas):
+    se activa al arrancar con INSTRUMENTACION=1.
+    """
+    import pandas as pd
+
+    panel = contenedor.expander('🩺 Diagnóstico')
+    if not metricas.habilitada:
+        panel.caption('La medición está desactivada. Arranque la app con `INSTRUMENTACION=1` para ver '
+                      'el tiempo, las filas y la memoria de cada etapa.')
+        return
+    panel.caption('Acumulado de todas las sesiones desde que arrancó el proceso (o desde el último reinicio).')
+    resumen = metricas.resumen()
+    if resumen:
+        panel.dataframe(pd.DataFrame(resumen), hide_index=True)
+    else:
+        panel.caption('Todavía no hay mediciones.')
+    contadores = metricas.contadores()
+    if contadores:
+        panel.json(contadores)
+    panel.download_button('⬇️ Métricas (Prometheus)', metricas.exportar_prometheus(),
+                          file_name='metricas.prom', mime='text/plain')
+    if panel.button('Reiniciar métricas'):
+        metricas.limpiar()
@@ -0,0 +1,152 @@
+# src/utils/lote_dl.py
+
+import time
+
+import pandas as pd
+
+from src.predictores.predicciones_DL import FEATURES, TARGETS, codificar_lote_dl, predecir_dl
+from src.utils.instrumentacion import metricas
+from src.utils.formatos_columnares import FORMATOS_SALIDA
+from src.utils.lote_streaming import ErrorValidacion, escritor_resultados, filas_con_error, leer_en_bloques
+
+# --- 1. PREDICCIÓN POR LOTES CON LA RED MLP (app2) ---
+# Mismo esquema que la carga de archivos de app.py: el archivo se lee por
+# bloques, cada bloque se valida, se codifica ('Area' con `le_area`, de una
+# vez para toda la columna) y la red se evalúa sobre el bloque completo en
+# una sola llamada. Los resultados se escriben al CSV de salida antes de
+# leer el bloque siguiente. Se mide el rendimiento en filas/segundo para
+# dimensionar las corridas nocturnas.
+
+FILAS_POR_BLOQUE = 100_000
+
+
+def procesar_bloque_dl(df, le_area=None, motor=None, desplazamiento=0):
+    """
+    Valida, codifica y predice un bloque del archivo.
+
+    Args:
+        df (pd.DataFrame): Bloque leído del archivo (debe tener las columnas FEATURES).
+        le_area: LabelEncoder de 'Area' (None si 'Area' ya viene numérica).
+        motor (str, opcional): Motor de `predecir_dl` ('keras' o 'numpy').
+        desplazamiento (int): Filas ya procesadas antes de este bloque
+            (solo para informar la fila exacta de un error).
+
+    Returns:
+        pd.DataFrame: Las columnas FEATURES del archivo seguidas de los 4 TARGETS.
+
+    Raises:
+        ErrorValidacion: Si faltan columnas o hay valores no reconocidos.
+    """
+    df.columns = df.columns.str.strip()
+    columnas_faltantes = [col for col in FEATURES if col not in df.columns]
+    if columnas_faltantes:
+        raise ErrorValidacion(f"Faltan las siguientes columnas en el archivo: **{', '.join(columnas_faltantes)}**")
+
+    with metricas.medir('codificar_lote_dl', filas=len(df)):
+        X, errores = codificar_lote_dl(df, le_area)
+    for columna in FEATURES:
+        if columna in errores:
+            if columna == 'Area' and le_area is not None:
+                mensaje = f"Valores válidos para 'Area': **{list(le_area.classes_)}**. "
+            else:
+                mensaje = "Se esperaban valores numéricos. "
+            raise ErrorValidacion(
+                f"Error en la columna '{columna}'. Se encontraron valores no reconocidos.",
+                mensaje + f"Filas con error (fila, valor): {filas_con_error(errores[columna], df[columna], desplazamiento)}",
+            )
+
+    with metricas.medir('predecir_dl', filas=len(X)):
+        predicciones = predecir_dl(X, motor)
+
+    df_resultado = df[FEATURES].reset_index(drop=True)
+    for i, columna in enumerate(TARGETS):
+        df_resultado[columna] = predicciones[:, i]
+    return df_resultado
+
+
+def predecir_archivo_dl_en_bloques(archivo, nombre_archivo, destino, le_area=None, motor=None,
+                                   filas_por_bloque=FILAS_POR_BLOQUE, progreso=None, filas_vista_previa=1000,
+                                   formato='csv'):
+    """
+    Predice un archivo completo por bloques y escribe los resultados en `destino`.
+
+    Args:
+        archivo: Archivo subido (objeto tipo archivo binario con seek).
+        nombre_archivo (str): Nombre original (para decidir CSV, Excel, Parquet o Arrow).
+        destino: Objeto tipo archivo binario donde se escriben los resultados.
+        le_area, motor: Ver `procesar_bloque_dl`.
+        progreso (callable, opcional): Recibe (fraccion, texto) después de cada bloque.
+        filas_vista_previa (int): Filas de resultados que se guardan para mostrar.
+        formato (str): 'csv', 'parquet' o 'arrow' (predicciones en float32).
+
+    Returns:
+        dict: 'filas', 'segundos', 'filas_por_segundo' (de punta a punta),
+            'filas_por_segundo_modelo' (validar, codificar y predecir, sin contar
+            la lectura ni la escritura) y 'vista_previa'.
+
+    Raises:
+        ErrorValidacion: Si algún bloque no pasa la validación.
+    """
+    filas = 0
+    segundos_modelo = 0.0
+    vista_previa = []
+    inicio = time.perf_counter()
+    escribir, cerrar = escritor_resultados(destino, formato, TARGETS)
+
+    for bloque, fraccion in leer_en_bloques(archivo, nombre_archivo, filas_por_bloque):
+        inicio_bloque = time.perf_counter()
+        resultado = procesar_bloque_dl(bloque, le_area, motor, filas)
+        segundos_modelo += time.perf_counter() - inicio_bloque
+
+        with metricas.medir(f'escribir_{formato}', filas=len(resultado)):
+            escribir(resultado)
+        filas += len(resultado)
+        if sum(len(v) for v in vista_previa) < filas_vista_previa:
+            vista_previa.append(resultado.head(filas_vista_previa))
+
+        if progreso is not None:
+            progreso(fraccion, f'{filas:,} filas procesadas')
+
+    cerrar()
+    segundos = time.perf_counter() - inicio
+    if progreso is not None:
+        progreso(1.0, f'{filas:,} filas procesadas')
+
+    return {
+        'filas': filas,
+        'segundos': segundos,
+        'filas_por_segundo': filas / segundos if segundos > 0 else 0.0,
+        'filas_por_segundo_modelo': filas / segundos_modelo if segundos_modelo > 0 else 0.0,
+        'vista_previa': pd.concat(vista_previa).head(filas_vista_previa) if vista_previa else pd.DataFrame(),
+    }
+
+
+if __name__ == '__main__':
+    # Corrida por lotes sin Streamlit (por ejemplo, la corrida nocturna):
+    #   python -m src.utils.lote_dl entrada.csv salida.csv [--motor numpy]
+    # El formato de salida sale de la extensión (.csv, .parquet o .arrow).
+    import os
+    import argparse
+
+    from src.predictores.predicciones_DL import MOTORES_DL, obtener_le_area
+
+    parser = argparse.ArgumentParser(description='Predicción por lotes con la red MLP de 9 variables.')
+    parser.add_argument('entrada', help='Archivo .csv, .xlsx, .parquet o .arrow con las columnas FEATURES.')
+    parser.add_argument('salida', help='Resultados (.csv, .parquet o .arrow).')
+    parser.add_argument('--motor', choices=MOTORES_DL, default=None)
+    parser.add_argument('--filas-por-bloque', type=int, default=FILAS_POR_BLOQUE)
+    args = parser.parse_args()
+    extension = os.path.splitext(args.salida)[1].lower()
+    formato = next((f for f, (ext, _) in FORMATOS_SALIDA.items() if ext == extension), 'csv')
+
+    try:
+        le_area = obtener_le_area()
+    except FileNotFoundError:
+        le_area = None
+
+    with open(args.entrada, 'rb') as entrada, open(args.salida, 'wb') as salida:
+        resumen = predecir_archivo_dl_en_bloques(
+            entrada, args.entrada, salida, le_area, args.motor, args.filas_por_bloque, formato=formato
+        )
+    print(f"{resumen['filas']:,} filas en {resumen['segundos']:.2f} s "
+          f"({resumen['filas_por_segundo']:,.0f} filas/s; modelo: {resumen['filas_por_segundo_modelo']:,.0f} filas/s)")
@@ -0,0 +1,371 @@
+# src/utils/lote_streaming.py
+
+import codecs
+import io
+import pickle
+import tempfile
+
+import pandas as pd
+
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP, codificar_lote
+from src.predictores.predicciones_ML import predict_all
+from src.utils.formatos_columnares import (
+    EXTENSIONES_ARROW, EXTENSIONES_PARQUET, EscritorColumnar, leer_arrow_en_bloques, leer_parquet_en_bloques
+)
+from src.utils.instrumentacion import metricas
+
+# --- 1. PREDICCIÓN POR LOTES EN STREAMING ---
+# En lugar de leer el archivo completo en memoria (dos veces, con chardet y
+# con pandas), se detecta la codificación con una muestra, se lee el archivo
+# por bloques y cada bloque se valida, se codifica, se predice y se escribe al
+# CSV de salida antes de pasar al siguiente. La memoria queda acotada por el
+# tamaño del bloque, no por el del archivo.
+
+COLUMNAS_NECESARIAS = ['Sexo', 'Area', 'Edad HTS', 'Edad Granja']
+COLUMNAS_PREDICCION = ['prePorcMort', 'prePorcCon', 'preICA', 'prePeProFin']
+# Columnas de entrada que se usan internamente pero no van al CSV de descarga.
+COLUMNAS_SOLO_INTERNAS = ['Area', 'Sexo', 'Edad Granja']
+
+FILAS_POR_BLOQUE = 50_000
+BYTES_MUESTRA_ENCODING = 64 * 1024
+
+
+class ErrorValidacion(Exception):
+    """El archivo no cumple con el formato esperado (columnas o valores)."""
+
+    def __init__(self, mensaje, detalle=None):
+        super().__init__(mensaje)
+        self.detalle = detalle
+
+
+def detectar_encoding(archivo, bytes_muestra=BYTES_MUESTRA_ENCODING):
+    """
+    Detecta la codificación de un archivo a partir de una muestra inicial
+    y deja el archivo posicionado al inicio. Una muestra sin acentos da
+    'ascii', que se trata como UTF-8 (los acentos pueden aparecer después).
+    """
+    import chardet  # Solo se necesita al subir un CSV.
+
+    with metricas.medir('detectar_encoding'):
+        muestra = archivo.read(bytes_muestra)
+        archivo.seek(0)
+        encoding = chardet.detect(muestra)['encoding'] or 'latin1'
+        return 'utf-8' if encoding.lower() == 'ascii' else encoding
+
+
+class LectorTolerante(io.TextIOBase):
+    """
+    Decodifica un archivo binario con `encoding` y, si más adelante aparece
+    un byte inválido (la muestra no alcanzó a verlo), sigue en latin1 desde
+    ese byte en vez de cortar la lectura a mitad del archivo.
+    """
+
+    def __init__(self, archivo, encoding, bytes_lectura=1 << 16):
+        self.archivo = archivo
+        self.bytes_lectura = bytes_lectura
+        self.encoding_actual = encoding
+        self._decodificador = codecs.getincrementaldecoder(encoding)()
+        self._texto = ''
+        self._fin = False
+
+    def readable(self):
+        return True
+
+    def _decodificar(self, bruto, final):
+        try:
+            return self._decodificador.decode(bruto, final)
+        except UnicodeDecodeError as e:
+            # e.object incluye los bytes que el decodificador tenía pendientes.
+            valido = e.object[:e.start].decode(self.encoding_actual)
+            self.encoding_actual = 'latin1'
+            self._decodificador = codecs.getincrementaldecoder('latin1')()
+            return valido + self._decodificador.decode(e.object[e.start:], final)
+
+    def read(self, n=-1):
+        while not self._fin and (n is None or n < 0 or len(self._texto) < n):
+            bruto = self.archivo.read(self.bytes_lectura)
+            self._fin = not bruto
+            self._texto += self._decodificar(bruto, self._fin)
+        if n is None or n < 0:
+            n = len(self._texto)
+        texto, self._texto = self._texto[:n], self._texto[n:]
+        return texto
+
+
+def _leer_excel_en_bloques(archivo, filas_por_bloque):
+    """Lee la primera hoja de un .xlsx/.xlsm fila por fila con openpyxl en modo solo lectura."""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        hoja = libro.active
+        total_filas = max((hoja.max_row or 1) - 1, 1)
+        filas = hoja.iter_rows(values_only=True)
+        encabezado = [str(c) if c is not None else '' for c in next(filas, [])]
+        bloque = []
+        leidas = 0
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) == filas_por_bloque:
+                leidas += len(bloque)
+                yield pd.DataFrame(bloque, columns=encabezado), min(leidas / total_filas, 1.0)
+                bloque = []
+        if bloque or not leidas:
+            yield pd.DataFrame(bloque, columns=encabezado), 1.0
+    finally:
+        libro.close()
+
+
+def _leer_csv_en_bloques(archivo, filas_por_bloque):
+    """Lee un CSV por bloques con pandas; el avance se estima con la posición del archivo."""
+    tamano_total = getattr(archivo, 'size', None)
+    texto = LectorTolerante(archivo, detectar_encoding(archivo))
+    for bloque in pd.read_csv(texto, chunksize=filas_por_bloque):
+        yield bloque, min(archivo.tell() / tamano_total, 1.0) if tamano_total else 0.0
+
+
+def leer_en_bloques(archivo, nombre_archivo, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Lee un archivo CSV, Excel, Parquet o Arrow IPC por bloques.
+
+    Args:
+        archivo: Objeto tipo archivo en modo binario (p. ej. el de st.file_uploader).
+        nombre_archivo (str): Nombre del archivo, para saber el formato.
+        filas_por_bloque (int): Filas de cada DataFrame devuelto.
+
+    Returns:
+        generator: Pares (bloque, fraccion) donde `fraccion` estima el avance (0 a 1).
+    """
+    nombre = nombre_archivo.lower()
+    if nombre.endswith('.csv'):
+        bloques, etapa = _leer_csv_en_bloques(archivo, filas_por_bloque), 'leer_csv'
+    elif nombre.endswith(EXTENSIONES_PARQUET):
+        bloques, etapa = leer_parquet_en_bloques(archivo, filas_por_bloque), 'leer_parquet'
+    elif nombre.endswith(EXTENSIONES_ARROW):
+        bloques, etapa = leer_arrow_en_bloques(archivo, filas_por_bloque), 'leer_arrow'
+    else:
+        bloques, etapa = _leer_excel_en_bloques(archivo, filas_por_bloque), 'leer_excel'
+    return metricas.medir_iterable(bloques, etapa, filas=lambda par: len(par[0]))
+
+
+def filas_con_error(filas, valores, desplazamiento, maximo=10):
+    """Pares (fila, valor) de los primeros errores (fila 1 = primera fila de datos)."""
+    return [(int(i) + desplazamiento + 1, valores.iloc[i]) for i in filas[:maximo]]
+
+
+def procesar_bloque(df, nombre_user, cargo_user, desplazamiento=0):
+    """
+    Valida, codifica y predice un bloque del archivo.
+
+    Args:
+        df (pd.DataFrame): Bloque leído del archivo.
+        nombre_user, cargo_user (str): Datos del usuario que sube el archivo.
+        desplazamiento (int): Filas ya procesadas antes de este bloque
+            (solo para informar la fila exacta de un error).
+
+    Returns:
+        pd.DataFrame: Bloque de resultados con las columnas de salida más
+            COLUMNAS_SOLO_INTERNAS (que se quitan antes de escribir el CSV).
+            `attrs['filas_unicas']` indica cuántas filas distintas se predijeron.
+
+    Raises:
+        ErrorValidacion: Si faltan columnas o hay valores no reconocidos.
+    """
+    df.columns = df.columns.str.strip()
+    columnas_faltantes = [col for col in COLUMNAS_NECESARIAS + ['Galpon'] if col not in df.columns]
+    if columnas_faltantes:
+        raise ErrorValidacion(f"Faltan las siguientes columnas en el archivo: **{', '.join(columnas_faltantes)}**")
+
+    # Codificación vectorizada: devuelve directamente el array float32 para
+    # los modelos y las posiciones de las filas con valores no reconocidos.
+    with metricas.medir('codificar_lote', filas=len(df)):
+        input_batch, errores = codificar_lote(df)
+
+    for columna, mapa in (('Sexo', SEXO_MAP), ('Area', AREA_MAP)):
+        if columna in errores:
+            raise ErrorValidacion(
+                f"Error en la columna '{columna}'. Se encontraron valores no reconocidos.",
+                f"Valores válidos para '{columna}': **{list(mapa.keys())}**. "
+                f"Filas con error (fila, valor): {filas_con_error(errores[columna], df[columna], desplazamiento)}",
+            )
+    for columna in ('Edad HTS', 'Edad Granja'):
+        if columna in errores:
+            raise ErrorValidacion(
+                f"Error en la columna '{columna}'. Se encontraron valores vacíos o no numéricos.",
+                f"Filas con error (fila, valor): {filas_con_error(errores[columna], df[columna], desplazamiento)}",
+            )
+
+    with metricas.medir('predict_all', filas=len(input_batch)):
+        resultados_df = predict_all(input_batch)
+
+    df_resultado = pd.DataFrame({
+        'Sexo': df['Sexo'].astype(str).str.strip().to_numpy(),
+        'Area': df['Area'].astype(str).str.strip().to_numpy(),
+        'Edad HTS': df['Edad HTS'].to_numpy(),
+        'Edad Granja': df['Edad Granja'].to_numpy(),
+        'Nombre Usuario': nombre_user if nombre_user else "No especificado",
+        'Cargo Usuario': cargo_user if cargo_user else "No especificado",
+        'Galpon': df['Galpon'].to_numpy(),
+    })
+    for col in COLUMNAS_PREDICCION:
+        df_resultado[col] = resultados_df[col].to_numpy()
+    df_resultado.attrs['filas_unicas'] = resultados_df.attrs.get('filas_unicas', len(resultados_df))
+    return df_resultado
+
+
+def a_registros_predicciones(resultado, fecha):
+    """
+    Convierte un bloque de resultados al esquema de la tabla 'predicciones'
+    de Supabase (el mismo que usa el formulario de una fila). Las
+    predicciones pasan a float64 y se redondean igual que en el formulario
+    para que el JSON no arrastre el ruido de float32.
+    """
+    return pd.DataFrame({
+        'created_at': fecha,
+        'nombre': resultado['Nombre Usuario'].to_numpy(),
+        'cargo': resultado['Cargo Usuario'].to_numpy(),
+        'areaAn': resultado['Area'].to_numpy(),
+        'sexo': resultado['Sexo'].to_numpy(),
+        'edadHTs': resultado['Edad HTS'].to_numpy(),
+        'edadventa': resultado['Edad Granja'].to_numpy(),
+        'prePorcMort': resultado['prePorcMort'].astype(float).round(2).to_numpy(),
+        'prePorcCon': resultado['prePorcCon'].astype(float).round(3).to_numpy(),
+        'preICA': resultado['preICA'].astype(float).round(2).to_numpy(),
+        'prePeProFin': resultado['prePeProFin'].astype(float).round(3).to_numpy(),
+    })
+
+
+class RegistrosDiferidos:
+    """
+    Callback `al_procesar_bloque` que guarda los registros de cada bloque
+    (ver `a_registros_predicciones`) en un temporal en disco en vez de
+    insertarlos. Se insertan con `leer()` recién cuando el archivo completo
+    pasó la validación, así un error en un bloque tardío no deja filas
+    guardadas a medias que se duplicarían al reenviar el archivo.
+
+    Args:
+        fecha (str): Fecha de creación de los registros.
+    """
+
+    def __init__(self, fecha):
+        self.fecha = fecha
+        self.bloques = 0
+        self._temporal = tempfile.TemporaryFile()
+
+    def __call__(self, resultado):
+        pickle.dump(a_registros_predicciones(resultado, self.fecha), self._temporal, protocol=pickle.HIGHEST_PROTOCOL)
+        self.bloques += 1
+
+    def leer(self):
+        """Devuelve los DataFrames de registros en el orden de los bloques."""
+        self._temporal.seek(0)
+        for _ in range(self.bloques):
+            yield pickle.load(self._temporal)
+
+    def cerrar(self):
+        self._temporal.close()
+
+
+def escritor_resultados(destino, formato, columnas_float32):
+    """
+    Prepara la escritura de resultados en `destino` con el formato pedido.
+    La usan también los lotes de app2 (`lote_dl`).
+
+    Args:
+        destino: Archivo binario de salida.
+        formato (str): 'csv', 'parquet' o 'arrow'.
+        columnas_float32 (list): Columnas que se guardan en float32 (formatos columnares).
+
+    Returns:
+        tuple: (escribir, cerrar); `escribir(bloque)` agrega un DataFrame y
+            `cerrar()` termina el archivo (pie de Parquet/Arrow).
+    """
+    if formato == 'csv':
+        escritos = [0]
+
+        def escribir_csv(resultado):
+            destino.write(resultado.to_csv(index=False, header=escritos[0] == 0).encode('utf-8'))
+            escritos[0] += 1
+        return escribir_csv, lambda: None
+    escritor = EscritorColumnar(destino, formato, columnas_float32)
+    return escritor.escribir, escritor.cerrar
+
+
+def predecir_archivo_en_bloques(archivo, nombre_archivo, destino,
+                                nombre_user=None, cargo_user=None,
+                                filas_por_bloque=FILAS_POR_BLOQUE, progreso=None, filas_vista_previa=1000,
+                                al_procesar_bloque=None, formato='csv'):
+    """
+    Procesa un archivo completo por bloques y escribe los resultados en `destino`.
+
+    Igual que la versión original, se conserva solo la primera fila de cada
+    'Galpon' (ahora también entre bloques distintos).
+
+    Args:
+        archivo: Archivo de entrada en modo binario.
+        nombre_archivo (str): Nombre del archivo (para saber el formato).
+        destino: Archivo binario de salida.
+        progreso (callable, opcional): Se llama como progreso(fraccion, texto)
+            después de cada bloque.
+        filas_vista_previa (int): Filas de resultados que se guardan para mostrar.
+        al_procesar_bloque (callable, opcional): Recibe cada bloque de
+            resultados ya sin duplicados (con COLUMNAS_SOLO_INTERNAS), por
+            ejemplo `RegistrosDiferidos` para guardarlos en Supabase.
+        formato (str): 'csv' (UTF-8), 'parquet' o 'arrow' (IPC); en los dos
+            últimos las predicciones van en float32 y las columnas de texto
+            como diccionarios (ver `formatos_columnares`).
+
+    Returns:
+        dict: Resumen con 'filas_leidas', 'filas_escritas', 'filas_unicas'
+            (filas que evaluaron los modelos tras quitar las combinaciones
+            repetidas de cada bloque), 'vista_previa' (DataFrame con las
+            primeras filas del resultado) y 'entrada_previa' (primeras filas
+            del archivo original).
+
+    Raises:
+        ErrorValidacion: Si algún bloque no pasa la validación.
+    """
+    galpones_vistos = set()
+    filas_leidas = filas_escritas = filas_unicas = 0
+    vista_previa = []
+    entrada_previa = None
+    escribir, cerrar = escritor_resultados(destino, formato, COLUMNAS_PREDICCION)
+
+    for bloque, fraccion in leer_en_bloques(archivo, nombre_archivo, filas_por_bloque):
+        if entrada_previa is None:
+            entrada_previa = bloque.head()
+
+        resultado = procesar_bloque(bloque, nombre_user, cargo_user, filas_leidas)
+        filas_leidas += len(bloque)
+        filas_unicas += resultado.attrs.get('filas_unicas', len(resultado))
+
+        # Quitamos duplicados de 'Galpon' dentro del bloque y contra los anteriores.
+        with metricas.medir('drop_duplicates', filas=len(resultado)):
+            resultado = resultado.drop_duplicates(subset=['Galpon'], keep='first')
+            resultado = resultado[~resultado['Galpon'].isin(galpones_vistos)]
+            galpones_vistos.update(resultado['Galpon'].tolist())
+
+        if al_procesar_bloque is not None:
+            al_procesar_bloque(resultado)
+        resultado = resultado.drop(columns=COLUMNAS_SOLO_INTERNAS)
+
+        with metricas.medir(f'escribir_{formato}', filas=len(resultado)):
+            escribir(resultado)
+        filas_escritas += len(resultado)
+        if sum(len(v) for v in vista_previa) < filas_vista_previa:
+            vista_previa.append(resultado.head(filas_vista_previa))
+
+        if progreso is not None:
+            progreso(fraccion, f'{filas_leidas:,} filas procesadas')
+
+    cerrar()
+    if progreso is not None:
+        progreso(1.0, f'{filas_leidas:,} filas procesadas')
+
+    return {
+        'filas_leidas': filas_leidas,
+        'filas_escritas': filas_escritas,
+        'filas_unicas': filas_unicas,
+        'vista_previa': pd.concat(vista_previa).head(filas_vista_previa) if vista_previa else pd.DataFrame(),
+        'entrada_previa': entrada_previa if entrada_previa is not None else pd.DataFrame(),
+    }
@@ -1,42 +1,472 @@
 # utils/sharepoint_utils.py
 
+import hashlib
 import io
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
 import pandas as pd
-from office365.runtime.auth.authentication_context import AuthenticationContext
-from office365.sharepoint.client_context import ClientContext
-from office365.sharepoint.files.file import File
 
-def append_a_excel_existente(site_url, username, password, carpeta_relativa, nombre_archivo_destino, df_nuevo):
+from src.utils.instrumentacion import metricas
+
+# --- 1. ACCESO A ARCHIVOS ---
+# El sumidero solo necesita listar, descargar, subir y borrar archivos. Esa
+# interfaz mínima la cumplen `ArchivosSharePoint` (office365) y
+# `ArchivosLocales` (src/utils/sharepoint_local.py), que sirve para probar
+# sin credenciales.
+
+
+class TiemposOperaciones:
+    """Acumula cuántas veces y cuánto tardó cada operación (auth, descarga, subida...)."""
+
+    def __init__(self):
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def medir(self, operacion):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            with self._lock:
+                cantidad, total, _ = self._datos.get(operacion, (0, 0.0, 0.0))
+                self._datos[operacion] = (cantidad + 1, total + segundos, segundos)
+
+    def resumen(self):
+        """Lista de dicts con operacion, cantidad, segundos_promedio y segundos_ultima."""
+        with self._lock:
+            return [
+                {'operacion': op, 'cantidad': n, 'segundos_promedio': round(total / n, 4),
+                 'segundos_ultima': round(ultima, 4)}
+                for op, (n, total, ultima) in sorted(self._datos.items())
+            ]
+
+
+class ArchivosSharePoint:
+    """Operaciones de archivos sobre un `ClientContext` ya autenticado."""
+
+    def __init__(self, ctx, tiempos=None):
+        self.ctx = ctx
+        self.tiempos = tiempos or TiemposOperaciones()
+
+    def listar(self, carpeta):
+        """Nombres de los archivos de la carpeta ([] si no existe)."""
+        try:
+            with self.tiempos.medir('listar'):
+                archivos = self.ctx.web.get_folder_by_server_relative_url(carpeta).files.get().execute_query()
+        except Exception:
+            return []
+        return [archivo.name for archivo in archivos]
+
+    def descargar(self, ruta):
+        """Contenido del archivo; FileNotFoundError si no existe."""
+        from office365.sharepoint.files.file import File
+
+        with self.tiempos.medir('descarga'):
+            response = File.open_binary(self.ctx, ruta)
+        if response.status_code == 404:
+            raise FileNotFoundError(ruta)
+        response.raise_for_status()
+        return response.content
+
+    def subir(self, carpeta, nombre, contenido):
+        """Crea o reemplaza `carpeta/nombre` (crea la carpeta si hace falta)."""
+        with self.tiempos.medir('subida'):
+            self.ctx.web.ensure_folder_path(carpeta).execute_query()
+            self.ctx.web.get_folder_by_server_relative_url(carpeta).upload_file(nombre, contenido).execute_query()
+
+    def eliminar(self, ruta):
+        with self.tiempos.medir('eliminar'):
+            self.ctx.web.get_file_by_server_relative_url(ruta).delete_object().execute_query()
+
+
+# --- 2. SUMIDERO DE SOLO AGREGADO ---
+# Antes cada guardado descargaba el libro completo, lo leía, le agregaba una
+# fila y lo volvía a subir: el costo crecía con el archivo y dos guardados
+# simultáneos podían pisarse. Ahora cada guardado sube un archivo de partes
+# pequeño con nombre único (fecha + id aleatorio), que nunca se sobrescribe.
+# Cada cierto tiempo las partes se consolidan en el libro en una sola
+# descarga/subida y se borran. La consolidación corre en un hilo aparte (el
+# guardado no la espera) y toma un candado en la carpeta de partes, para que
+# dos réplicas no suban cada una su versión del libro y se pisen.
+
+CARPETA_PARTES = 'predicciones_partes'
+# Segundos mínimos entre consolidaciones automáticas.
+INTERVALO_COMPACTACION = float(os.getenv('SHAREPOINT_INTERVALO_COMPACTACION', '600'))
+# Segundos que vale el candado de consolidación; si el proceso que lo tomó
+# muere, otro puede consolidar pasado ese tiempo.
+DURACION_CANDADO = float(os.getenv('SHAREPOINT_DURACION_CANDADO', '300'))
+
+# Última consolidación por destino, compartida por el proceso.
+_ultima_compactacion = {}
+_lock_compactacion = threading.Lock()
+
+
+class SumideroSharePoint:
     """
-    Agrega una nueva fila a un archivo Excel existente en SharePoint.
-    Si el archivo no existe, lo crea.
+    Agrega filas a un libro Excel de SharePoint mediante archivos de partes.
+
+    Args:
+        archivos: Objeto con listar/descargar/subir/eliminar (ver sección 1).
+        carpeta (str): Carpeta relativa del libro.
+        nombre_libro (str): Nombre del libro consolidado.
+        carpeta_partes (str): Subcarpeta donde se guardan las partes.
+        duracion_candado (float): Segundos de validez del candado de consolidación.
     """
+
+    def __init__(self, archivos, carpeta, nombre_libro='predicciones.xlsx', carpeta_partes=CARPETA_PARTES,
+                 duracion_candado=DURACION_CANDADO):
+        self.archivos = archivos
+        self.carpeta = carpeta.rstrip('/')
+        self.nombre_libro = nombre_libro
+        self.carpeta_partes = f"{self.carpeta}/{carpeta_partes}"
+        self.prefijo = os.path.splitext(nombre_libro)[0]
+        self.duracion_candado = duracion_candado
+
+    @property
+    def ruta_libro(self):
+        return f"{self.carpeta}/{self.nombre_libro}"
+
+    @property
+    def nombre_candado(self):
+        # No termina en .csv, así que `_partes` nunca lo confunde con una parte.
+        return f".{self.prefijo}.candado"
+
+    def agregar(self, df):
+        """
+        Guarda las filas de `df` (una o muchas) como una parte nueva.
+
+        Returns:
+            str: Nombre del archivo de partes creado.
+        """
+        nombre = f"{self.prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}.csv"
+        self.archivos.subir(self.carpeta_partes, nombre, df.to_csv(index=False).encode('utf-8'))
+        return nombre
+
+    def _partes(self):
+        # El nombre empieza con la fecha, así que ordenar por nombre respeta el orden de llegada.
+        return sorted(n for n in self.archivos.listar(self.carpeta_partes)
+                      if n.startswith(self.prefijo + '_') and n.endswith('.csv'))
+
+    def _leer_libro(self):
+        try:
+            return pd.read_excel(io.BytesIO(self.archivos.descargar(self.ruta_libro)))
+        except FileNotFoundError:
+            return None
+
+    def _leer_partes(self, partes):
+        return [pd.read_csv(io.BytesIO(self.archivos.descargar(f"{self.carpeta_partes}/{p}"))) for p in partes]
+
+    def leer(self):
+        """Libro consolidado más las partes pendientes, como un solo DataFrame."""
+        tablas = [self._leer_libro()] + self._leer_partes(self._partes())
+        tablas = [t for t in tablas if t is not None]
+        return pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame()
+
+    def _leer_candado(self):
+        """(dueño, vencimiento) del candado vigente, o None si no hay."""
+        try:
+            dueno, vence = self.archivos.descargar(f"{self.carpeta_partes}/{self.nombre_candado}").decode().split()
+            return (dueno, float(vence)) if float(vence) > time.time() else None
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _tomar_candado(self):
+        """Toma el candado de consolidación; devuelve su id, o None si otro proceso lo tiene."""
+        if self._leer_candado() is not None:
+            return None
+        dueno = uuid.uuid4().hex
+        vence = time.time() + self.duracion_candado
+        self.archivos.subir(self.carpeta_partes, self.nombre_candado, f"{dueno} {vence}".encode())
+        # La API no tiene escritura condicional: si dos procesos lo subieron
+        # a la vez, se queda el que quedó escrito.
+        actual = self._leer_candado()
+        return dueno if actual is not None and actual[0] == dueno else None
+
+    def _es_dueno(self, dueno):
+        actual = self._leer_candado()
+        return actual is not None and actual[0] == dueno
+
+    def _soltar_candado(self, dueno):
+        if self._es_dueno(dueno):
+            self.archivos.eliminar(f"{self.carpeta_partes}/{self.nombre_candado}")
+
+    def compactar(self):
+        """
+        Consolida las partes pendientes en el libro y las borra.
+
+        Solo se borran las partes que se leyeron, así que lo que llegue
+        durante la consolidación queda para la siguiente. Si otro proceso
+        tiene el candado (o lo perdimos antes de subir el libro) no se hace
+        nada y las partes esperan a la próxima consolidación.
+
+        Returns:
+            int: Cantidad de partes consolidadas.
+        """
+        if not self._partes():
+            return 0
+        dueno = self._tomar_candado()
+        if dueno is None:
+            metricas.contar('sharepoint_compactar_ocupado')
+            return 0
+        try:
+            partes = self._partes()
+            if not partes:
+                return 0
+            with metricas.medir('sharepoint_compactar') as medicion:
+                tablas = [self._leer_libro()] + self._leer_partes(partes)
+                df_final = pd.concat([t for t in tablas if t is not None], ignore_index=True)
+                medicion.agregar_filas(len(df_final))
+
+                output = io.BytesIO()
+                df_final.to_excel(output, index=False)
+                if not self._es_dueno(dueno):
+                    return 0
+                self.archivos.subir(self.carpeta, self.nombre_libro, output.getvalue())
+                for parte in partes:
+                    self.archivos.eliminar(f"{self.carpeta_partes}/{parte}")
+            return len(partes)
+        finally:
+            self._soltar_candado(dueno)
+
+    def _compactar_en_segundo_plano(self):
+        try:
+            self.compactar()
+        except Exception as e:
+            # Las filas siguen en sus partes; se consolidarán más tarde.
+            print(f"ADVERTENCIA: No se pudo consolidar {self.nombre_libro}. {e}")
+
+    def compactar_si_corresponde(self, intervalo=INTERVALO_COMPACTACION):
+        """
+        Lanza una consolidación en segundo plano si pasaron `intervalo`
+        segundos desde la última en este proceso. Un proceso recién iniciado
+        cuenta el intervalo desde la primera revisión de cada libro, así que
+        no consolida de inmediato al arrancar.
+
+        Returns:
+            threading.Thread | None: Hilo de la consolidación, o None si no correspondía.
+        """
+        with _lock_compactacion:
+            ahora = time.monotonic()
+            if ahora - _ultima_compactacion.setdefault(self.ruta_libro, ahora) < intervalo:
+                return None
+            _ultima_compactacion[self.ruta_libro] = ahora
+        hilo = threading.Thread(target=self._compactar_en_segundo_plano, daemon=True)
+        hilo.start()
+        return hilo
+
+
+# --- 3. SESIONES AUTENTICADAS ---
+# Autenticarse cuesta varias idas y vueltas a SharePoint antes de mover un
+# solo byte. El gestor guarda el ClientContext de cada (sitio, usuario) y lo
+# reutiliza en los guardados siguientes (también entre reruns de Streamlit,
+# porque vive en el proceso) hasta que el token vence.
+#
+# El gestor también consolida: cada libro que recibió partes queda anotado
+# y un hilo del proceso revisa cada tanto si le toca (ver
+# `compactar_si_corresponde`), aunque no vuelva a haber guardados. Usa la
+# sesión guardada, así que un libro cuya sesión venció se deja de revisar
+# hasta el próximo guardado; para consolidar sin la app está el comando
+# `compactar` (al final del módulo), pensado para una tarea programada.
+
+# Segundos que se reutiliza un token antes de volver a autenticarse.
+TTL_TOKEN = float(os.getenv('SHAREPOINT_TTL_TOKEN', '3000'))
+
+
+def _autenticar_office365(site_url, username, password):
+    """Devuelve un ClientContext autenticado, o None si las credenciales fallan."""
+    # office365 se importa al autenticarse, no al abrir la app.
+    from office365.runtime.auth.authentication_context import AuthenticationContext
+    from office365.sharepoint.client_context import ClientContext
+
     ctx_auth = AuthenticationContext(site_url)
     if not ctx_auth.acquire_token_for_user(username, password):
+        return None
+    return ClientContext(site_url, ctx_auth)
+
+
+class GestorSharePoint:
+    """
+    Caché thread-safe de contextos autenticados por (sitio, usuario).
+
+    Args:
+        autenticar (callable): (site_url, username, password) -> contexto o None.
+        ttl (float): Segundos de vida de cada contexto.
+        crear_archivos (callable): (contexto, tiempos) -> objeto de archivos
+            (ver sección 1); permite usar `ArchivosLocales` en pruebas.
+        intervalo_compactacion (float): Segundos mínimos entre consolidaciones
+            de cada libro.
+    """
+
+    def __init__(self, autenticar=_autenticar_office365, ttl=TTL_TOKEN, crear_archivos=ArchivosSharePoint,
+                 intervalo_compactacion=INTERVALO_COMPACTACION):
+        self.autenticar = autenticar
+        self.ttl = ttl
+        self.crear_archivos = crear_archivos
+        self.intervalo_compactacion = intervalo_compactacion
+        self.tiempos = TiemposOperaciones()
+        self._sesiones = {}
+        self._destinos = {}
+        self._hilo_compactacion = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(site_url, username, password):
+        # La contraseña entra solo como hash: si cambia, no se reutiliza la sesión.
+        return (site_url.rstrip('/'), username.lower(), hashlib.sha256(password.encode('utf-8')).hexdigest())
+
+    def obtener_archivos(self, site_url, username, password):
+        """
+        Devuelve el objeto de archivos listo para usar, autenticando solo si
+        no hay una sesión vigente para ese sitio y usuario.
+
+        Raises:
+            PermissionError: Si la autenticación falla.
+        """
+        clave = self._clave(site_url, username, password)
+        archivos = self._archivos_vigentes(clave)
+        if archivos is not None:
+            return archivos
+
+        with self.tiempos.medir('autenticacion'):
+            ctx = self.autenticar(site_url, username, password)
+        if ctx is None:
+            raise PermissionError("Error de autenticación")
+        archivos = self.crear_archivos(ctx, self.tiempos)
+        with self._lock:
+            self._sesiones[clave] = (archivos, time.monotonic() + self.ttl)
+        return archivos
+
+    def _archivos_vigentes(self, clave):
+        with self._lock:
+            sesion = self._sesiones.get(clave)
+        return sesion[0] if sesion is not None and time.monotonic() < sesion[1] else None
+
+    def invalidar(self, site_url, username, password):
+        """Descarta la sesión (por ejemplo si el servidor rechazó el token)."""
+        with self._lock:
+            self._sesiones.pop(self._clave(site_url, username, password), None)
+
+    def registrar_destino(self, site_url, username, password, carpeta, nombre_libro):
+        """
+        Anota un libro que recibió partes para consolidarlo periódicamente.
+        El hilo de consolidación se inicia con el primer libro anotado.
+        """
+        destino = (self._clave(site_url, username, password), carpeta, nombre_libro)
+        with self._lock:
+            self._destinos[destino] = None
+            if self._hilo_compactacion is None:
+                self._hilo_compactacion = threading.Thread(
+                    target=self._compactar_periodicamente, name='compactacion_sharepoint', daemon=True
+                )
+                self._hilo_compactacion.start()
+
+    def _compactar_periodicamente(self):
+        # Se revisa varias veces por intervalo: revisar una sola vez podía
+        # atrasar la consolidación hasta casi el doble del intervalo.
+        espera = max(min(self.intervalo_compactacion / 4, 60), 0.01)
+        while not self._detener.wait(espera):
+            self.compactar_destinos()
+
+    def compactar_destinos(self):
+        """
+        Consolida los libros anotados a los que les toca (ver
+        `SumideroSharePoint.compactar_si_corresponde`) y olvida los que ya
+        no tienen una sesión vigente.
+
+        Returns:
+            int: Libros en los que se lanzó una consolidación.
+        """
+        with self._lock:
+            destinos = list(self._destinos)
+        lanzadas = 0
+        for destino in destinos:
+            clave, carpeta, nombre_libro = destino
+            archivos = self._archivos_vigentes(clave)
+            if archivos is None:
+                # Sin sesión no hay con qué consolidar: el próximo guardado lo vuelve a anotar.
+                with self._lock:
+                    self._destinos.pop(destino, None)
+                continue
+            hilo = SumideroSharePoint(archivos, carpeta, nombre_libro).compactar_si_corresponde(
+                self.intervalo_compactacion
+            )
+            if hilo is not None:
+                hilo.join()
+                lanzadas += 1
+        return lanzadas
+
+    def detener_compactacion(self):
+        """Detiene el hilo de consolidación periódica (si se inició)."""
+        self._detener.set()
+        if self._hilo_compactacion is not None:
+            self._hilo_compactacion.join()
+
+    def estadisticas(self):
+        with self._lock:
+            sesiones = len(self._sesiones)
+            destinos = len(self._destinos)
+        return {'sesiones': sesiones, 'libros_en_consolidacion': destinos, 'operaciones': self.tiempos.resumen()}
+
+
+# Gestor único del proceso.
+gestor_sharepoint = GestorSharePoint()
+
+
+def append_a_excel_existente(site_url, username, password, carpeta_relativa, nombre_archivo_destino, df_nuevo):
+    """
+    Agrega filas (una o un DataFrame completo) al Excel de SharePoint.
+    Las filas quedan en un archivo de partes y el gestor las consolida en el
+    libro periódicamente (ver `SumideroSharePoint` y `GestorSharePoint`). La
+    sesión autenticada se reutiliza entre guardados.
+    """
+    try:
+        with metricas.medir('sharepoint_agregar', filas=len(df_nuevo)):
+            archivos = gestor_sharepoint.obtener_archivos(site_url, username, password)
+            sumidero = SumideroSharePoint(archivos, carpeta_relativa, nombre_archivo_destino)
+            try:
+                sumidero.agregar(df_nuevo)
+            except Exception:
+                # El token guardado pudo vencer antes de tiempo: se reintenta una vez con sesión nueva.
+                metricas.contar('sharepoint_reintentos')
+                gestor_sharepoint.invalidar(site_url, username, password)
+                archivos = gestor_sharepoint.obtener_archivos(site_url, username, password)
+                sumidero = SumideroSharePoint(archivos, carpeta_relativa, nombre_archivo_destino)
+                sumidero.agregar(df_nuevo)
+    except PermissionError:
         return False, "Error de autenticación"
 
-    ctx = ClientContext(site_url, ctx_auth)
-    folder = ctx.web.get_folder_by_server_relative_url(carpeta_relativa)
-    file_url = f"{carpeta_relativa}/{nombre_archivo_destino}"
-    
+    gestor_sharepoint.registrar_destino(site_url, username, password, carpeta_relativa, nombre_archivo_destino)
+    return True, f"{len(df_nuevo)} fila(s) agregada(s) correctamente"
+
+
+if __name__ == '__main__':
+    # Consolidación sin la app, por ejemplo desde una tarea programada (cron):
+    #   SHAREPOINT_PASSWORD=... python -m src.utils.sharepointUtill compactar <sitio> <usuario> <carpeta> [libro]
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Consolida las partes pendientes en el libro de SharePoint.')
+    parser.add_argument('accion', choices=['compactar'])
+    parser.add_argument('sitio', help='URL del sitio (ej. https://empresa.sharepoint.com/sites/tu-sitio)')
+    parser.add_argument('usuario')
+    parser.add_argument('carpeta', help='Ruta relativa de la carpeta del libro')
+    parser.add_argument('libro', nargs='?', default='predicciones.xlsx')
+    args = parser.parse_args()
+    contrasena = os.getenv('SHAREPOINT_PASSWORD')
+    if not contrasena:
+        sys.exit('Falta la variable de entorno SHAREPOINT_PASSWORD.')
+
     try:
-        # Intentar descargar el archivo existente
-        response = File.open_binary(ctx, file_url)
-        bytes_file_obj = io.BytesIO()
-        bytes_file_obj.write(response.content)
-        bytes_file_obj.seek(0)
-
-        df_existente = pd.read_excel(bytes_file_obj)
-        df_final = pd.concat([df_existente, df_nuevo], ignore_index=True)
-    except Exception:
-        # Si no existe, usamos solo el nuevo
-        df_final = df_nuevo
-
-    # Guardar nuevo DataFrame en memoria
-    output = io.BytesIO()
-    df_final.to_excel(output, index=False)
-    output.seek(0)
-
-    # Subir el archivo actualizado
-    File.save_binary(folder.upload_file(nombre_archivo_destino, output.read()).execute_query())
-    return True, "Archivo actualizado correctamente"
+        archivos = gestor_sharepoint.obtener_archivos(args.sitio, args.usuario, contrasena)
+    except PermissionError:
+        sys.exit('Error de autenticación')
+    consolidadas = SumideroSharePoint(archivos, args.carpeta, args.libro).compactar()
+    print(f'{consolidadas} parte(s) consolidada(s) en {args.libro}')
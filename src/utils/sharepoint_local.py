@@ -0,0 +1,56 @@
+# src/utils/sharepoint_local.py
+
+import os
+import threading
+
+# --- 1. SUSTITUTO LOCAL DE LA API DE ARCHIVOS DE SHAREPOINT ---
+# Cumple la misma interfaz que `ArchivosSharePoint` (listar, descargar,
+# subir, eliminar) pero sobre un directorio local. Las rutas relativas del
+# sitio ('/sites/x/Shared Documents/...') se guardan bajo `directorio`.
+
+
+class ArchivosLocales:
+    """
+    Archivos de SharePoint simulados en disco.
+
+    Args:
+        directorio (str): Carpeta raíz donde se guardan los archivos.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self.descargas = 0
+        self.subidas = 0
+
+    def _ruta(self, ruta_relativa):
+        return os.path.join(self.directorio, ruta_relativa.lstrip('/'))
+
+    def listar(self, carpeta):
+        ruta = self._ruta(carpeta)
+        if not os.path.isdir(ruta):
+            return []
+        return [n for n in os.listdir(ruta) if os.path.isfile(os.path.join(ruta, n))]
+
+    def descargar(self, ruta):
+        with self._lock:
+            self.descargas += 1
+        try:
+            with open(self._ruta(ruta), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(ruta) from None
+
+    def subir(self, carpeta, nombre, contenido):
+        with self._lock:
+            self.subidas += 1
+        destino = self._ruta(carpeta)
+        os.makedirs(destino, exist_ok=True)
+        # Escritura atómica: un lector nunca ve el archivo a medias.
+        temporal = os.path.join(destino, f".{nombre}.tmp")
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, os.path.join(destino, nombre))
+
+    def eliminar(self, ruta):
+        os.remove(self._ruta(ruta))
@@ -0,0 +1,184 @@
+# src/utils/supabase_local.py
+
+import copy
+import itertools
+import threading
+from datetime import datetime
+
+# --- 1. SUSTITUTO LOCAL DE SUPABASE ---
+# Imita la parte del cliente de supabase-py que usa la app
+# (table(...).select/insert/delete/filtros/order/limit/execute) guardando las filas
+# en memoria. Sirve para desarrollar sin credenciales (SUPABASE_LOCAL=1),
+# para pruebas y para los benchmarks de persistencia.
+
+
+def _comparar(operador):
+    """En `or_` los valores llegan como texto; se convierten al tipo de la columna."""
+    def comparar(valor, referencia):
+        if valor is None:
+            return False
+        if not isinstance(valor, str):
+            referencia = type(valor)(referencia)
+        return operador(valor, referencia)
+    return comparar
+
+
+_OPERADORES = {
+    'eq': _comparar(lambda a, b: a == b),
+    'lt': _comparar(lambda a, b: a < b),
+    'lte': _comparar(lambda a, b: a <= b),
+    'gt': _comparar(lambda a, b: a > b),
+    'gte': _comparar(lambda a, b: a >= b),
+}
+
+
+class RespuestaLocal:
+    """Equivalente mínimo de la respuesta de postgrest (`.data`, `.count`)."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+        self.error = None
+
+
+class ConsultaLocal:
+    """Constructor de consultas encadenables sobre una tabla en memoria."""
+
+    def __init__(self, cliente, tabla):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._operacion = 'select'
+        self._columnas = None
+        self._filas_nuevas = None
+        self._filtros = []
+        self._orden = []
+        self._limite = None
+        self._contar = False
+
+    # --- operaciones ---
+    def select(self, columnas='*', count=None):
+        self._operacion = 'select'
+        self._columnas = None if columnas.strip() == '*' else [c.strip() for c in columnas.split(',')]
+        self._contar = count is not None
+        return self
+
+    def insert(self, filas):
+        self._operacion = 'insert'
+        self._filas_nuevas = [filas] if isinstance(filas, dict) else list(filas)
+        return self
+
+    def delete(self):
+        self._operacion = 'delete'
+        return self
+
+    # --- filtros ---
+    def _filtro(self, columna, comparar):
+        self._filtros.append((columna, comparar))
+        return self
+
+    def eq(self, columna, valor):
+        return self._filtro(columna, lambda v: v == valor)
+
+    def gt(self, columna, valor):
+        return self._filtro(columna, lambda v: v is not None and v > valor)
+
+    def gte(self, columna, valor):
+        return self._filtro(columna, lambda v: v is not None and v >= valor)
+
+    def lt(self, columna, valor):
+        return self._filtro(columna, lambda v: v is not None and v < valor)
+
+    def lte(self, columna, valor):
+        return self._filtro(columna, lambda v: v is not None and v <= valor)
+
+    def is_(self, columna, valor):
+        """Solo `is_(columna, 'null')`, como se usa para comparar con NULL en PostgREST."""
+        return self._filtro(columna, lambda v: v is None if valor == 'null' else v is valor)
+
+    def in_(self, columna, valores):
+        valores = set(valores)
+        return self._filtro(columna, lambda v: v in valores)
+
+    def or_(self, filtros):
+        """Filtro OR con la sintaxis de PostgREST: 'col.op.valor,col.op.valor'."""
+        condiciones = []
+        for parte in filtros.split(','):
+            columna, operador, valor = parte.strip().split('.', 2)
+            condiciones.append((columna, _OPERADORES[operador], valor.strip('"')))
+        self._filtros.append((None, lambda fila: any(op(fila.get(c), v) for c, op, v in condiciones)))
+        return self
+
+    def order(self, columna, desc=False):
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def _cumple(self, fila):
+        return all(comparar(fila) if columna is None else comparar(fila.get(columna))
+                   for columna, comparar in self._filtros)
+
+    def execute(self):
+        if self._operacion == 'insert':
+            return RespuestaLocal(self._cliente._insertar(self._tabla, self._filas_nuevas))
+        if self._operacion == 'delete':
+            return RespuestaLocal(self._cliente._borrar(self._tabla, self._cumple))
+
+        filas = [f for f in self._cliente._filas(self._tabla) if self._cumple(f)]
+        total = len(filas)
+        # Orden estable: se aplica del último criterio al primero.
+        for columna, desc in reversed(self._orden):
+            filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+        if self._limite is not None:
+            filas = filas[:self._limite]
+        if self._columnas is not None:
+            filas = [{c: f.get(c) for c in self._columnas} for f in filas]
+        return RespuestaLocal(filas, total if self._contar else None)
+
+
+class ClienteSupabaseLocal:
+    """
+    Cliente en memoria compatible con los usos de la app.
+
+    Args:
+        fallos_insert (int): Cantidad de inserciones que fallarán a propósito
+            antes de empezar a funcionar (para probar reintentos).
+    """
+
+    def __init__(self, fallos_insert=0):
+        self._tablas = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.fallos_insert = fallos_insert
+        self.llamadas_insert = 0
+
+    def table(self, nombre):
+        return ConsultaLocal(self, nombre)
+
+    def _filas(self, tabla):
+        with self._lock:
+            return [dict(f) for f in self._tablas.get(tabla, [])]
+
+    def _insertar(self, tabla, filas):
+        with self._lock:
+            self.llamadas_insert += 1
+            if self.fallos_insert > 0:
+                self.fallos_insert -= 1
+                raise ConnectionError('Fallo simulado de inserción')
+            insertadas = []
+            for fila in filas:
+                fila = copy.deepcopy(fila)
+                fila.setdefault('id', next(self._ids))
+                fila.setdefault('created_at', datetime.now().strftime('%Y-%m-%d %H:%M'))
+                insertadas.append(fila)
+            self._tablas.setdefault(tabla, []).extend(insertadas)
+            return [dict(f) for f in insertadas]
+
+    def _borrar(self, tabla, cumple):
+        with self._lock:
+            filas = self._tablas.get(tabla, [])
+            borradas = [dict(f) for f in filas if cumple(f)]
+            self._tablas[tabla] = [f for f in filas if not cumple(f)]
+            return borradas
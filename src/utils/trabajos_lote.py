@@ -0,0 +1,319 @@
+# src/utils/trabajos_lote.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.utils.formatos_columnares import FORMATOS_SALIDA
+from src.utils.lote_streaming import (
+    COLUMNAS_PREDICCION, COLUMNAS_SOLO_INTERNAS, FILAS_POR_BLOQUE, ErrorValidacion,
+    escritor_resultados, leer_en_bloques, procesar_bloque
+)
+
+# --- 1. TRABAJOS POR LOTES EN SEGUNDO PLANO, CON PUNTOS DE CONTROL ---
+# La carga de archivos de app.py corre dentro del script de Streamlit: si el
+# navegador se recarga o hay un rerun a mitad de camino, se pierde todo.
+# Aquí cada archivo se procesa en un hilo aparte, por bloques, y cada bloque
+# terminado se guarda en disco como Parquet (columnar) antes de anotar el
+# avance en `estado.json`. Si el proceso se cae, el trabajo se reanuda desde
+# el último bloque anotado; la interfaz solo consulta el estado.
+#
+#   <TRABAJOS_DIR>/<id>/entrada.<ext>      copia del archivo subido
+#   <TRABAJOS_DIR>/<id>/estado.json        estado y avance (se escribe atómicamente)
+#   <TRABAJOS_DIR>/<id>/partes/*.parquet   un archivo por bloque terminado
+#   <TRABAJOS_DIR>/<id>/resultado.<ext>    resultado final (CSV, Parquet o Arrow)
+#
+# El resultado se arma a partir de las partes en el formato pedido al
+# enviar el trabajo; si después se pide otro formato, se arma a demanda.
+# El id sale del contenido del archivo y del usuario: volver a subir el
+# mismo archivo (p. ej. tras recargar la página) retoma el mismo trabajo.
+
+DIRECTORIO = os.getenv('TRABAJOS_DIR') or os.path.join(tempfile.gettempdir(), 'predicciones_trabajos')
+HILOS = int(os.getenv('TRABAJOS_HILOS', '1'))
+# Los trabajos terminados (o con error) se borran pasado este tiempo.
+TTL_HORAS = float(os.getenv('TRABAJOS_TTL_HORAS', '24'))
+
+PENDIENTE, EN_CURSO, COMPLETADO, ERROR = 'pendiente', 'en_curso', 'completado', 'error'
+
+
+def _escribir_atomico(ruta, escribir):
+    temporal = f'{ruta}.{threading.get_ident()}.tmp'
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def _para_parquet(df):
+    """
+    Las columnas de texto de un Excel pueden mezclar números y cadenas, y
+    Parquet exige un solo tipo por columna: se guardan como texto (el CSV
+    final queda igual).
+    """
+    df = df.copy()
+    for columna in df.columns[df.dtypes == object]:
+        df[columna] = df[columna].where(df[columna].isna(), df[columna].astype(str))
+    return df
+
+
+class GestorTrabajos:
+    """
+    Ejecuta trabajos de predicción por lotes en hilos en segundo plano.
+
+    Args:
+        directorio (str): Carpeta donde se guardan los trabajos.
+        hilos (int): Trabajos simultáneos.
+        filas_por_bloque (int): Filas de cada bloque (y de cada punto de control).
+    """
+
+    def __init__(self, directorio=DIRECTORIO, hilos=HILOS, filas_por_bloque=FILAS_POR_BLOQUE):
+        self.directorio = directorio
+        self.filas_por_bloque = filas_por_bloque
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='trabajo_lote')
+        self._activos = set()
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    # --- Rutas y estado ---
+
+    def _ruta(self, id_trabajo, *partes):
+        return os.path.join(self.directorio, id_trabajo, *partes)
+
+    def estado(self, id_trabajo):
+        """Estado del trabajo (dict leído de estado.json) o None si no existe."""
+        try:
+            with open(self._ruta(id_trabajo, 'estado.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _guardar_estado(self, id_trabajo, estado):
+        estado['actualizado'] = time.time()
+
+        def escribir(ruta):
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(estado, f, ensure_ascii=False)
+        _escribir_atomico(self._ruta(id_trabajo, 'estado.json'), escribir)
+
+    def _ruta_parte(self, id_trabajo, indice):
+        return self._ruta(id_trabajo, 'partes', f'parte_{indice:06d}.parquet')
+
+    # --- Envío y reanudación ---
+
+    def enviar(self, archivo, nombre_archivo, nombre_user=None, cargo_user=None, formato='csv'):
+        """
+        Copia el archivo al directorio de trabajos y lo encola (si no existía ya).
+
+        Args:
+            formato (str): Formato del resultado: 'csv', 'parquet' o 'arrow'.
+
+        Returns:
+            str: Id del trabajo (el mismo para el mismo archivo y usuario).
+        """
+        if formato not in FORMATOS_SALIDA:
+            raise ValueError(f"Formato de salida desconocido: '{formato}'. Opciones: {', '.join(FORMATOS_SALIDA)}")
+        sha = hashlib.sha256()
+        archivo.seek(0)
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            sha.update(bloque)
+        sha.update(f'\x1f{nombre_user}\x1f{cargo_user}\x1f{self.filas_por_bloque}'.encode('utf-8'))
+        id_trabajo = sha.hexdigest()[:16]
+
+        if self.estado(id_trabajo) is None:
+            extension = os.path.splitext(nombre_archivo)[1].lower()
+            os.makedirs(self._ruta(id_trabajo, 'partes'), exist_ok=True)
+
+            def copiar(ruta):
+                archivo.seek(0)
+                with open(ruta, 'wb') as f:
+                    shutil.copyfileobj(archivo, f)
+            _escribir_atomico(self._ruta(id_trabajo, f'entrada{extension}'), copiar)
+            archivo.seek(0)
+            self._guardar_estado(id_trabajo, {
+                'id': id_trabajo,
+                'estado': PENDIENTE,
+                'nombre_archivo': nombre_archivo,
+                'entrada': f'entrada{extension}',
+                'nombre_user': nombre_user,
+                'cargo_user': cargo_user,
+                'filas_por_bloque': self.filas_por_bloque,
+                'formato': formato,
+                'bloques_completados': 0,
+                'filas_leidas': 0,
+                'filas_escritas': 0,
+                'filas_unicas': 0,
+                'fraccion': 0.0,
+                'reanudaciones': 0,
+                'error': None,
+                'detalle': None,
+                'creado': time.time(),
+            })
+        self._lanzar(id_trabajo)
+        return id_trabajo
+
+    def _lanzar(self, id_trabajo):
+        estado = self.estado(id_trabajo)
+        if estado is None or estado['estado'] in (COMPLETADO, ERROR):
+            return
+        with self._lock:
+            if id_trabajo in self._activos:
+                return
+            self._activos.add(id_trabajo)
+        self._ejecutor.submit(self._ejecutar, id_trabajo)
+
+    def reanudar_pendientes(self):
+        """
+        Vuelve a encolar los trabajos que quedaron sin terminar (p. ej. tras
+        una caída del proceso) y borra los terminados hace más de TTL_HORAS.
+
+        Returns:
+            list: Ids de los trabajos reanudados.
+        """
+        reanudados = []
+        limite = time.time() - TTL_HORAS * 3600
+        for id_trabajo in sorted(os.listdir(self.directorio)):
+            estado = self.estado(id_trabajo)
+            if estado is None:
+                continue
+            if estado['estado'] in (COMPLETADO, ERROR):
+                if estado['actualizado'] < limite:
+                    shutil.rmtree(self._ruta(id_trabajo), ignore_errors=True)
+                continue
+            self._lanzar(id_trabajo)
+            reanudados.append(id_trabajo)
+        return reanudados
+
+    # --- Ejecución ---
+
+    def _ejecutar(self, id_trabajo):
+        try:
+            self._procesar(id_trabajo)
+        except ErrorValidacion as e:
+            self._marcar_error(id_trabajo, str(e), e.detalle)
+        except Exception as e:
+            self._marcar_error(id_trabajo, f'Error inesperado: {e}', None)
+        finally:
+            with self._lock:
+                self._activos.discard(id_trabajo)
+
+    def _marcar_error(self, id_trabajo, mensaje, detalle):
+        estado = self.estado(id_trabajo)
+        if estado is None:
+            return
+        estado.update(estado=ERROR, error=mensaje, detalle=detalle)
+        self._guardar_estado(id_trabajo, estado)
+
+    def _procesar(self, id_trabajo):
+        estado = self.estado(id_trabajo)
+        completados = estado['bloques_completados']
+        if estado['estado'] == EN_CURSO:
+            estado['reanudaciones'] += 1
+        estado['estado'] = EN_CURSO
+        self._guardar_estado(id_trabajo, estado)
+
+        # Los 'Galpon' ya escritos se recuperan de las partes (solo esa
+        # columna). Se comparan como texto, que es como quedan en Parquet.
+        galpones_vistos = set()
+        for indice in range(completados):
+            parte = pd.read_parquet(self._ruta_parte(id_trabajo, indice), columns=['Galpon'])
+            galpones_vistos.update(parte['Galpon'].astype(str).tolist())
+
+        with open(self._ruta(id_trabajo, estado['entrada']), 'rb') as archivo:
+            bloques = leer_en_bloques(archivo, estado['nombre_archivo'], estado['filas_por_bloque'])
+            for indice, (bloque, fraccion) in enumerate(bloques):
+                if indice < completados:
+                    # Bloque ya guardado en un punto de control anterior.
+                    continue
+                resultado = procesar_bloque(bloque, estado['nombre_user'], estado['cargo_user'], estado['filas_leidas'])
+                filas_unicas = resultado.attrs.get('filas_unicas', len(resultado))
+                resultado = resultado.drop_duplicates(subset=['Galpon'], keep='first')
+                galpones = resultado['Galpon'].astype(str)
+                resultado = resultado[~galpones.isin(galpones_vistos)]
+                galpones_vistos.update(galpones[resultado.index].tolist())
+                resultado = _para_parquet(resultado.drop(columns=COLUMNAS_SOLO_INTERNAS).reset_index(drop=True))
+
+                # Primero la parte y después el estado: una parte sin anotar
+                # (caída entre ambos pasos) se vuelve a escribir al reanudar.
+                _escribir_atomico(self._ruta_parte(id_trabajo, indice),
+                                  lambda ruta: resultado.to_parquet(ruta, index=False))
+                estado['bloques_completados'] = indice + 1
+                estado['filas_leidas'] += len(bloque)
+                estado['filas_escritas'] += len(resultado)
+                estado['filas_unicas'] += filas_unicas
+                estado['fraccion'] = fraccion
+                self._guardar_estado(id_trabajo, estado)
+
+        self._escribir_resultado(id_trabajo, estado['bloques_completados'], estado.get('formato', 'csv'))
+        estado.update(estado=COMPLETADO, fraccion=1.0)
+        self._guardar_estado(id_trabajo, estado)
+
+    def _ruta_resultado(self, id_trabajo, formato):
+        return self._ruta(id_trabajo, 'resultado' + FORMATOS_SALIDA[formato][0])
+
+    def _escribir_resultado(self, id_trabajo, n_partes, formato):
+        """Arma el resultado a partir de las partes, de a una por vez."""
+        def escribir(ruta):
+            with open(ruta, 'wb') as f:
+                escribir_bloque, cerrar = escritor_resultados(f, formato, COLUMNAS_PREDICCION)
+                for indice in range(n_partes):
+                    escribir_bloque(pd.read_parquet(self._ruta_parte(id_trabajo, indice)))
+                cerrar()
+        _escribir_atomico(self._ruta_resultado(id_trabajo, formato), escribir)
+
+    # --- Resultados ---
+
+    def ruta_resultado(self, id_trabajo, formato=None):
+        """
+        Ruta del resultado final, o None si el trabajo no terminó.
+
+        Args:
+            formato (str, opcional): 'csv', 'parquet' o 'arrow'; por defecto,
+                el pedido al enviar el trabajo. Si es otro, se arma en ese
+                momento a partir de las partes.
+        """
+        estado = self.estado(id_trabajo)
+        if estado is None or estado['estado'] != COMPLETADO:
+            return None
+        formato = formato or estado.get('formato', 'csv')
+        ruta = self._ruta_resultado(id_trabajo, formato)
+        if not os.path.exists(ruta):
+            self._escribir_resultado(id_trabajo, estado['bloques_completados'], formato)
+        return ruta
+
+    def vista_previa(self, id_trabajo, filas=1000):
+        """Primeras filas ya calculadas (aunque el trabajo siga en curso)."""
+        estado = self.estado(id_trabajo)
+        if not estado or not estado['bloques_completados']:
+            return pd.DataFrame()
+        return pd.read_parquet(self._ruta_parte(id_trabajo, 0)).head(filas)
+
+
+# Gestor único del proceso.
+gestor_trabajos = GestorTrabajos()
+
+
+if __name__ == '__main__':
+    # Sin Streamlit: reanudar lo pendiente o procesar un archivo y esperar.
+    #   python -m src.utils.trabajos_lote reanudar
+    #   python -m src.utils.trabajos_lote enviar entrada.csv
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('reanudar', 'enviar'):
+        sys.exit('Uso: python -m src.utils.trabajos_lote reanudar | enviar <archivo>')
+    if sys.argv[1] == 'reanudar':
+        ids = gestor_trabajos.reanudar_pendientes()
+    else:
+        with open(sys.argv[2], 'rb') as entrada:
+            ids = [gestor_trabajos.enviar(entrada, os.path.basename(sys.argv[2]))]
+    gestor_trabajos._ejecutor.shutdown(wait=True)
+    for id_trabajo in ids:
+        estado = gestor_trabajos.estado(id_trabajo)
+        print(f"{id_trabajo}: {estado['estado']} ({estado['filas_leidas']:,} filas, "
+              f"{estado['reanudaciones']} reanudaciones) {estado['error'] or ''}")
+        if estado['estado'] == COMPLETADO:
+            print(f'  Resultado: {gestor_trabajos.ruta_resultado(id_trabajo)}')
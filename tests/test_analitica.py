@@ -0,0 +1,124 @@
+# tests/test_analitica.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.analitica import TABLA_AGREGADOS, TABLA_PREDICCIONES, AgregadosPredicciones, _fila, agregar_registros
+from src.utils.supabase_local import ClienteSupabaseLocal
+
+
+def _registros(n, semilla=0, mes='2025-01'):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'created_at': f'{mes}-15 10:00',
+        'areaAn': rng.choice(['Calidad', 'Coccidia'], n),
+        'sexo': rng.choice(['Ma', 'He'], n),
+        'preICA': rng.normal(1.6, 0.1, n).round(2),
+        'prePorcMort': rng.normal(4, 1, n).round(2),
+        'prePeProFin': rng.normal(2.8, 0.2, n).round(3),
+    })
+
+
+def _esperado(df):
+    df = df.assign(mes=df['created_at'].str[:7])
+    return df.groupby(['areaAn', 'sexo', 'mes']).agg(n=('preICA', 'size'), preICA_media=('preICA', 'mean'))
+
+
+def _comparar(resumen, df):
+    obtenido = resumen.set_index(['areaAn', 'sexo', 'mes'])[['n', 'preICA_media']]
+    esperado = _esperado(df)
+    pd.testing.assert_frame_equal(obtenido.sort_index(), esperado.sort_index(), check_dtype=False)
+
+
+@pytest.fixture
+def cliente():
+    return ClienteSupabaseLocal()
+
+
+@pytest.fixture
+def agregados():
+    agregados = AgregadosPredicciones()
+    agregados._cola.espera_lote = 0.01
+    agregados._cola.espera_base = 0.01
+    yield agregados
+    agregados._cola.cerrar()
+
+
+def _filas_agregados(cliente):
+    return cliente.table(TABLA_AGREGADOS).select('*').execute().data
+
+
+def test_registrar_y_consultar_con_una_fila_por_grupo(cliente, agregados):
+    df = _registros(300)
+    agregados.registrar(df.iloc[:100], cliente)
+    agregados.vaciar()
+    agregados.registrar(df.iloc[100:], cliente)
+    agregados.vaciar()
+
+    _comparar(agregados.consultar(cliente), df)
+    # La tabla crece con los grupos, no con los guardados.
+    assert len(_filas_agregados(cliente)) == 4
+
+
+def test_guardados_de_una_fila_no_agregan_filas(cliente, agregados):
+    df = _registros(20, semilla=1)
+    for registro in df.to_dict('records'):
+        agregados.registrar([registro], cliente)
+        agregados.vaciar()
+
+    _comparar(agregados.consultar(cliente), df)
+    assert len(_filas_agregados(cliente)) == len(_esperado(df))
+
+
+def test_reintento_no_pierde_ni_duplica(cliente, agregados):
+    df = _registros(50, semilla=2)
+    agregados.registrar(df.iloc[:25], cliente)
+    agregados.vaciar()
+    # La inserción de la fila fusionada falla una vez después de borrar las anteriores.
+    cliente.fallos_insert = 1
+    agregados.registrar(df.iloc[25:], cliente)
+    agregados.vaciar()
+
+    assert agregados.estadisticas()['reintentos'] == 1
+    _comparar(agregados.consultar(cliente), df)
+
+
+def test_compactar_fusiona_filas_delta(cliente, agregados):
+    df = _registros(200, semilla=3)
+    # Filas delta como las que escribían las versiones anteriores: una por lote y grupo.
+    for inicio in range(0, 200, 50):
+        filas = [_fila(c, a) for c, a in agregar_registros(df.iloc[inicio:inicio + 50]).items()]
+        cliente.table(TABLA_AGREGADOS).insert(filas).execute()
+    antes_resumen = agregados.consultar(cliente)
+
+    antes, despues = agregados.compactar(cliente)
+    assert (antes, despues) == (16, 4)
+    pd.testing.assert_frame_equal(agregados.consultar(cliente), antes_resumen)
+    _comparar(antes_resumen, df)
+
+
+def test_backfill_recalcula_desde_predicciones(cliente, agregados):
+    df = pd.concat([_registros(150, semilla=4), _registros(50, semilla=5, mes='2025-02')], ignore_index=True)
+    cliente.table(TABLA_PREDICCIONES).insert(df.to_dict('records')).execute()
+    # Agregados viejos y equivocados: el backfill los reemplaza.
+    filas = [_fila(c, a) for c, a in agregar_registros(df.iloc[:10]).items()]
+    cliente.table(TABLA_AGREGADOS).insert(filas).execute()
+
+    assert agregados.backfill(cliente) == 200
+    _comparar(agregados.consultar(cliente), df)
+
+
+def test_backfill_conserva_agregados_escritos_mientras_corre(cliente, agregados):
+    df = _registros(100, semilla=6)
+    cliente.table(TABLA_PREDICCIONES).insert(df.to_dict('records')).execute()
+    tardio = _registros(10, semilla=7, mes='2025-03')
+
+    def escribir_otro_proceso(_):
+        # Predicción y agregado que otro proceso guarda después de que el backfill tomó sus límites.
+        cliente.table(TABLA_PREDICCIONES).insert(tardio.to_dict('records')).execute()
+        filas = [_fila(c, a) for c, a in agregar_registros(tardio).items()]
+        cliente.table(TABLA_AGREGADOS).insert(filas).execute()
+
+    agregados.backfill(cliente, progreso=escribir_otro_proceso)
+    _comparar(agregados.consultar(cliente), pd.concat([df, tardio], ignore_index=True))
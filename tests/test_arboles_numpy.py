@@ -0,0 +1,77 @@
+# tests/test_arboles_numpy.py
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('xgboost')
+
+from src.predictores import arboles_numpy  # noqa: E402
+from src.predictores.predicciones_ML import obtener_modelos, version_modelos  # noqa: E402
+
+# Mismos árboles, mismo orden de suma en float32: la diferencia debería ser nula.
+TOLERANCIA = 1e-5
+
+
+@pytest.fixture(scope='module')
+def modelos():
+    return obtener_modelos()
+
+
+@pytest.fixture(scope='module')
+def motor(modelos, tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp('arboles') / 'arboles.npz')
+    arboles_numpy.exportar_arboles(modelos, ruta)
+    return arboles_numpy.MotorNumpy(ruta)
+
+
+def _esperado(modelos, X):
+    return np.column_stack([modelo.predict(X) for modelo in modelos])
+
+
+def _lote(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.integers(0, 8, n), rng.integers(0, 2, n), rng.choice([14, 21, 28, 35], n),
+        # Edades no enteras y fuera del rango del formulario.
+        rng.uniform(-100, 6000, n),
+    ]).astype(np.float32)
+
+
+def test_paridad_con_xgboost(modelos, motor):
+    X = _lote(10_000)
+    np.testing.assert_allclose(motor.predecir(X), _esperado(modelos, X), rtol=TOLERANCIA, atol=TOLERANCIA)
+
+
+def test_paridad_en_los_umbrales(modelos, motor):
+    # Cada par (variable, umbral) distinto, exacto y a un paso de float32 hacia cada lado.
+    rng = np.random.default_rng(1)
+    pares = np.unique(np.column_stack([motor.feature, motor.umbral]), axis=0)
+    features, umbrales = pares[:, 0].astype(np.intp), pares[:, 1].astype(np.float32)
+    X = np.repeat(_lote(len(pares), semilla=2), 3, axis=0)
+    valores = np.concatenate([np.nextafter(umbrales, -np.inf), umbrales, np.nextafter(umbrales, np.inf)])
+    filas = np.arange(len(X))
+    X[filas, np.tile(features, 3)] = valores
+    X = X[rng.permutation(len(X))]
+    assert np.any(umbrales != np.round(umbrales)), 'se esperaban umbrales no enteros'
+    np.testing.assert_allclose(motor.predecir(X), _esperado(modelos, X), rtol=TOLERANCIA, atol=TOLERANCIA)
+
+
+def test_paridad_con_nan(modelos, motor):
+    # Con NaN el recorrido sigue default_left en cada nodo.
+    X = _lote(4_000, semilla=3)
+    rng = np.random.default_rng(4)
+    X[rng.random(X.shape) < 0.3] = np.nan
+    X[:10] = np.nan
+    np.testing.assert_allclose(motor.predecir(X), _esperado(modelos, X), rtol=TOLERANCIA, atol=TOLERANCIA)
+
+
+def test_exportacion_versionada_al_dia(modelos):
+    ruta = arboles_numpy.ruta_arboles(version_modelos())
+    assert os.path.exists(ruta), (
+        f'Falta {ruta}: los modelos cambiaron. Regenerar con `python -m src.predictores.arboles_numpy`.'
+    )
+    X = _lote(2_000, semilla=5)
+    resultado = arboles_numpy.MotorNumpy(ruta).predecir(X)
+    np.testing.assert_allclose(resultado, _esperado(modelos, X), rtol=TOLERANCIA, atol=TOLERANCIA)
@@ -0,0 +1,50 @@
+# tests/test_cache_archivos.py
+
+import io
+
+import pandas as pd
+import pytest
+
+from src.utils import cache_archivos as modulo
+from src.utils.cache_archivos import CacheArchivos, predecir_archivo_cacheado
+
+
+def _archivo():
+    filas = ['Galpon,Sexo,Area,Edad HTS,Edad Granja']
+    filas += [f'G{i},Ma,Calidad,{10 + i % 5},35' for i in range(200)]
+    return io.BytesIO(('\n'.join(filas) + '\n').encode('utf-8'))
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = CacheArchivos(directorio=str(tmp_path))
+    monkeypatch.setattr(modulo, 'cache_archivos', cache)
+    return cache
+
+
+@pytest.mark.parametrize('formato, leer', [('csv', pd.read_csv), ('parquet', pd.read_parquet)])
+def test_cada_formato_se_guarda_con_su_extension(cache, tmp_path, formato, leer):
+    if formato == 'parquet':
+        pytest.importorskip('pyarrow')
+    salida, _, desde_cache = predecir_archivo_cacheado(_archivo(), 'lote.csv', formato=formato)
+    assert not desde_cache
+    esperado = leer(io.BytesIO(salida.read()))
+
+    nombres = {p.name for p in tmp_path.iterdir()}
+    assert any(n.endswith(f'.{formato}') for n in nombres)
+    assert any(n.endswith(f'.{formato}.pkl') for n in nombres)
+
+    # Desde disco (sin el nivel en memoria) vuelve el mismo formato.
+    cache.limpiar()
+    salida, _, desde_cache = predecir_archivo_cacheado(_archivo(), 'lote.csv', formato=formato)
+    assert desde_cache
+    pd.testing.assert_frame_equal(leer(salida), esperado)
+
+
+def test_formatos_distintos_no_comparten_entrada(cache):
+    pytest.importorskip('pyarrow')
+    predecir_archivo_cacheado(_archivo(), 'lote.csv', formato='csv')
+    salida, _, desde_cache = predecir_archivo_cacheado(_archivo(), 'lote.csv', formato='parquet')
+    assert not desde_cache
+    assert salida.read(4) == b'PAR1'
+    assert cache.estadisticas()['entradas'] == 2
@@ -0,0 +1,95 @@
+# tests/test_cache_predicciones.py
+
+import os
+
+import numpy as np
+import pytest
+
+from src.predictores import cache_predicciones
+from src.predictores.cache_predicciones import CachePredicciones
+from src.predictores.registro_modelos import _Entrada, registro
+
+
+def test_descarta_la_entrada_menos_usada():
+    cache = CachePredicciones(tamano_max=3)
+    for clave in 'abc':
+        cache.guardar(clave, clave.upper())
+    # Usar 'a' la deja como la más reciente: la próxima en salir es 'b'.
+    assert cache.obtener('a') == 'A'
+    cache.guardar('d', 'D')
+    assert cache.obtener('b') is None
+    assert [cache.obtener(clave) for clave in 'acd'] == ['A', 'C', 'D']
+    # Volver a guardar una clave existente también la renueva.
+    cache.guardar('a', 'A2')
+    cache.guardar('e', 'E')
+    assert cache.obtener('c') is None and cache.obtener('a') == 'A2'
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas['entradas'] == 3
+    assert (estadisticas['aciertos'], estadisticas['fallos']) == (5, 2)
+    assert estadisticas['tasa_aciertos'] == round(5 / 7, 3)
+
+
+def test_limpiar_vacia_y_cuenta_invalidaciones():
+    cache = CachePredicciones(tamano_max=2)
+    cache.guardar('a', 1)
+    cache.limpiar()
+    assert cache.obtener('a') is None
+    assert cache.estadisticas()['entradas'] == 0
+    assert cache.estadisticas()['invalidaciones'] == 1
+
+
+def _recargar(nombre, ruta, contenido):
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    # Otro mtime aunque la escritura caiga en el mismo tick del reloj.
+    estado = os.stat(ruta)
+    os.utime(ruta, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1_000_000))
+    return registro.obtener(nombre)
+
+
+@pytest.fixture
+def registro_de_prueba(tmp_path, monkeypatch):
+    """Apunta 'ica' y un artefacto ajeno a archivos temporales del registro real."""
+    monkeypatch.setattr(registro, 'intervalo_verificacion', 0.0)
+    rutas = {}
+    for nombre in ('ica', 'escalador_de_prueba'):
+        rutas[nombre] = str(tmp_path / f'{nombre}.bin')
+        with open(rutas[nombre], 'wb') as f:
+            f.write(b'v1')
+        monkeypatch.setitem(registro._entradas, nombre, _Entrada(rutas[nombre], lambda ruta: open(ruta, 'rb').read()))
+        registro.obtener(nombre)
+    return rutas
+
+
+def test_recargar_un_modelo_ml_limpia_la_cache(registro_de_prueba):
+    cache = cache_predicciones.cache
+    cache.guardar(('prueba', 1), 'valor')
+    invalidaciones = cache.estadisticas()['invalidaciones']
+
+    assert _recargar('ica', registro_de_prueba['ica'], b'v2') == b'v2'
+    assert cache.obtener(('prueba', 1)) is None
+    assert cache.estadisticas()['invalidaciones'] == invalidaciones + 1
+
+
+def test_recargar_otro_artefacto_no_limpia_la_cache(registro_de_prueba):
+    cache = cache_predicciones.cache
+    cache.guardar(('prueba', 2), 'valor')
+    invalidaciones = cache.estadisticas()['invalidaciones']
+
+    assert _recargar('escalador_de_prueba', registro_de_prueba['escalador_de_prueba'], b'v2') == b'v2'
+    # El mismo contenido con otro mtime no es una recarga.
+    _recargar('ica', registro_de_prueba['ica'], b'v1')
+    assert cache.obtener(('prueba', 2)) == 'valor'
+    assert cache.estadisticas()['invalidaciones'] == invalidaciones
+
+
+def test_predict_all_cacheado_devuelve_copias():
+    pytest.importorskip('xgboost')
+    fila = np.array([[1, 1, 14, 30]], dtype=np.float32)
+    primera = cache_predicciones.predict_all_cacheado(fila)
+    aciertos = cache_predicciones.cache.estadisticas()['aciertos']
+    primera.iloc[0, 0] = -1.0
+    segunda = cache_predicciones.predict_all_cacheado(fila.tolist())
+    assert cache_predicciones.cache.estadisticas()['aciertos'] == aciertos + 1
+    assert segunda.iloc[0, 0] != -1.0
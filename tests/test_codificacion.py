@@ -0,0 +1,63 @@
+# tests/test_codificacion.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.predictores.codificacion import AREA_MAP, SEXO_MAP, codificar_fila, codificar_lote
+
+
+def _lote(areas, sexos, index=None):
+    n = len(areas)
+    return pd.DataFrame({
+        'Area': areas, 'Sexo': sexos, 'Edad HTS': [14] * n, 'Edad Granja': list(range(n)),
+    }, index=index)
+
+
+def test_lote_valido_coincide_con_el_formulario():
+    areas, sexos = list(AREA_MAP), ['Ma', 'He'] * 4
+    X, errores = codificar_lote(_lote(areas, sexos))
+    assert errores == {}
+    assert X.dtype == np.float32 and X.flags['C_CONTIGUOUS']
+    esperado = np.vstack([codificar_fila(a, s, 14, i) for i, (a, s) in enumerate(zip(areas, sexos))])
+    np.testing.assert_array_equal(X, esperado)
+
+
+def test_posiciones_de_areas_y_sexos_desconocidos():
+    areas = ['Calidad', 'Calidadd', ' Coccidia ', None, 'calidad', 'Coccidia']
+    sexos = ['Ma', 'He', 'Macho', 'He', 'Ma', np.nan]
+    # El índice no es 0..N-1 a propósito: los errores son posiciones, no etiquetas.
+    X, errores = codificar_lote(_lote(areas, sexos, index=range(100, 106)))
+    assert set(errores) == {'Area', 'Sexo'}
+    np.testing.assert_array_equal(errores['Area'], [1, 3, 4])
+    np.testing.assert_array_equal(errores['Sexo'], [2, 5])
+    # Los espacios alrededor se ignoran.
+    assert X[2, 0] == AREA_MAP['Coccidia']
+    assert np.isnan(X[errores['Area'], 0]).all() and np.isnan(X[errores['Sexo'], 1]).all()
+
+
+def test_columnas_categoricas_dan_las_mismas_posiciones():
+    areas = ['Coccidia', 'Otra', 'Calidad', 'Otra']
+    sexos = ['He', 'Ma', 'X', 'Ma']
+    df = _lote(areas, sexos).astype({'Area': 'category', 'Sexo': 'category'})
+    X, errores = codificar_lote(df)
+    np.testing.assert_array_equal(errores['Area'], [1, 3])
+    np.testing.assert_array_equal(errores['Sexo'], [2])
+    np.testing.assert_array_equal(X[[0, 2], 0], [AREA_MAP['Coccidia'], AREA_MAP['Calidad']])
+    np.testing.assert_array_equal(X[[0, 1], 1], [SEXO_MAP['He'], SEXO_MAP['Ma']])
+
+
+def test_edades_no_numericas():
+    df = _lote(['Calidad'] * 3, ['Ma'] * 3)
+    df['Edad HTS'] = ['14', 'catorce', 21]
+    df['Edad Granja'] = [1, 2, None]
+    X, errores = codificar_lote(df)
+    np.testing.assert_array_equal(errores['Edad HTS'], [1])
+    np.testing.assert_array_equal(errores['Edad Granja'], [2])
+    assert X[0, 2] == 14 and X[2, 2] == 21
+
+
+@pytest.mark.parametrize('area, sexo', [('Otra', 'Ma'), ('Calidad', 'M')])
+def test_formulario_rechaza_valores_desconocidos(area, sexo):
+    with pytest.raises(ValueError):
+        codificar_fila(area, sexo, 14, 30)
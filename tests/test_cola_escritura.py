@@ -0,0 +1,122 @@
+# tests/test_cola_escritura.py
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.utils import cola_escritura
+from src.utils.CRUD import crear_predicciones_bulk
+from src.utils.analitica import agregados
+from src.utils.cola_escritura import ColaEscritura
+from src.utils.supabase_local import ClienteSupabaseLocal
+
+
+class ClienteContador(ClienteSupabaseLocal):
+    """Cliente local que anota el tamaño de cada insert por tabla."""
+
+    def __init__(self, **opciones):
+        super().__init__(**opciones)
+        self.inserts = []
+
+    def _insertar(self, tabla, filas):
+        self.inserts.append((tabla, len(filas)))
+        return super()._insertar(tabla, filas)
+
+
+def _registro(i):
+    return {'created_at': '2025-01-01 10:00', 'nombre': 'ana', 'cargo': 'vet', 'areaAn': 'Calidad', 'sexo': 'Ma',
+            'edadHTs': 14, 'edadventa': 30 + i, 'prePorcMort': 4.1, 'prePorcCon': 3.2, 'preICA': 1.6,
+            'prePeProFin': 2.8}
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    # Anota las esperas entre reintentos del hilo de la cola sin dormirlas.
+    registradas = []
+    dormir = time.sleep
+
+    def sleep(segundos):
+        if threading.current_thread().name == 'cola_escritura':
+            registradas.append(segundos)
+        dormir(min(segundos, 0.001))
+
+    monkeypatch.setattr(cola_escritura.time, 'sleep', sleep)
+    return registradas
+
+
+def _cola(insertar, **opciones):
+    opciones = {'espera_lote': 0.01, **opciones}
+    return ColaEscritura(insertar, **opciones)
+
+
+def test_bulk_inserta_en_bloques_de_500():
+    cliente = ClienteContador()
+    assert crear_predicciones_bulk([_registro(i) for i in range(1234)], cliente=cliente) == 1234
+    agregados.vaciar()
+
+    assert [n for tabla, n in cliente.inserts if tabla == 'predicciones'] == [500, 500, 234]
+    assert len(cliente.table('predicciones').select('id').execute().data) == 1234
+
+
+def test_reintenta_con_espera_exponencial(esperas):
+    cliente = ClienteSupabaseLocal(fallos_insert=3)
+    cola = _cola(lambda filas: cliente.table('predicciones').insert(filas).execute(), espera_base=0.5)
+    for i in range(5):
+        cola.encolar(_registro(i))
+    assert cola.vaciar(timeout=5)
+    cola.cerrar()
+
+    assert esperas == [0.5, 1.0, 2.0]
+    estadisticas = cola.estadisticas()
+    assert (estadisticas['escritas'], estadisticas['reintentos'], estadisticas['fallidas']) == (5, 3, 0)
+    assert len(cliente.table('predicciones').select('id').execute().data) == 5
+
+
+def test_filas_fallidas_acotadas_y_reintentables(esperas):
+    cliente = ClienteSupabaseLocal(fallos_insert=10 ** 6)
+    cola = _cola(lambda filas: cliente.table('predicciones').insert(filas).execute(), reintentos=2,
+                 tamano_lote=5, max_fallidas=3)
+    for i in range(5):
+        cola.encolar(_registro(i))
+    assert cola.vaciar(timeout=5)
+
+    estadisticas = cola.estadisticas()
+    assert (estadisticas['fallidas'], estadisticas['descartadas']) == (3, 2)
+    assert 'Fallo simulado' in estadisticas['ultimo_error']
+    # Se conservan las más recientes.
+    assert [f['edadventa'] for f in cola.fallidas] == [32, 33, 34]
+
+    cliente.fallos_insert = 0
+    assert cola.reintentar_fallidas() == 3
+    assert cola.vaciar(timeout=5)
+    cola.cerrar()
+    assert cola.estadisticas()['fallidas'] == 0
+    assert len(cliente.table('predicciones').select('id').execute().data) == 3
+
+
+def test_cerrar_escribe_lo_pendiente_sin_esperar_el_lote():
+    escritas = []
+    cola = ColaEscritura(escritas.extend, espera_lote=30)
+    for i in range(3):
+        cola.encolar(i)
+    inicio = time.monotonic()
+    cola.cerrar()
+    assert escritas == [0, 1, 2]
+    assert time.monotonic() - inicio < 5
+
+
+def test_al_salir_del_proceso_se_vacia_la_cola(tmp_path):
+    destino = tmp_path / 'escritas.txt'
+    codigo = (
+        "from src.utils.cola_escritura import ColaEscritura\n"
+        f"destino = open({str(destino)!r}, 'a')\n"
+        "cola = ColaEscritura(lambda filas: destino.write(''.join(f'{f}\\n' for f in filas)) and destino.flush(),"
+        " espera_lote=30)\n"
+        "for i in range(4):\n"
+        "    cola.encolar(i)\n"
+    )
+    subprocess.run([sys.executable, '-c', codigo], check=True, timeout=60)
+    assert destino.read_text().split() == ['0', '1', '2', '3']
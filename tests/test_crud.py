@@ -0,0 +1,114 @@
+# tests/test_crud.py
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip('streamlit')
+
+from src.utils import CRUD  # noqa: E402
+from src.utils.CRUD import COLUMNAS_HISTORIAL, cache_paginas, consultar_pagina  # noqa: E402
+from src.utils.supabase_local import ClienteSupabaseLocal, ConsultaLocal  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def sin_cache():
+    cache_paginas.limpiar()
+    yield
+    cache_paginas.limpiar()
+
+
+@pytest.fixture
+def cliente():
+    # 60 filas en solo 4 fechas distintas: muchas comparten created_at y el
+    # orden dentro de cada fecha lo decide el id.
+    cliente = ClienteSupabaseLocal()
+    cliente.table('predicciones').insert([
+        {
+            'created_at': f'2025-01-{10 + i % 4:02d} 08:00',
+            'nombre': 'ana' if i % 3 else 'luis',
+            'cargo': 'Técnico',
+            'areaAn': 'Calidad' if i % 2 else 'Coccidia',
+            'sexo': 'Ma' if i % 5 else 'He',
+            'edadHTs': 14,
+            'edadventa': i,
+            'prePorcMort': 1.0, 'prePorcCon': 2.0, 'preICA': 1.5, 'prePeProFin': 2.8,
+        }
+        for i in range(60)
+    ]).execute()
+    return cliente
+
+
+def _todas(cliente, filtros=None, tamano=7, **kwargs):
+    paginas, cursor = [], None
+    while True:
+        filas, cursor = consultar_pagina(filtros, cursor, tamano, cliente=cliente, **kwargs)
+        paginas.append(filas)
+        if cursor is None:
+            return paginas
+
+
+def _esperadas(cliente, condicion=lambda fila: True):
+    filas = [f for f in cliente.table('predicciones').select('*').execute().data if condicion(f)]
+    return sorted(filas, key=lambda f: (f['created_at'], f['id']), reverse=True)
+
+
+def test_paginas_sin_duplicados_ni_huecos_con_fechas_repetidas(cliente):
+    paginas = _todas(cliente)
+    assert [len(p) for p in paginas] == [7] * 8 + [4]
+    ids = [f['id'] for p in paginas for f in p]
+    assert ids == [f['id'] for f in _esperadas(cliente)]
+    assert len(set(ids)) == 60
+
+
+def test_ultima_pagina_exacta_no_tiene_siguiente(cliente):
+    paginas = _todas(cliente, tamano=20)
+    assert [len(p) for p in paginas] == [20, 20, 20]
+
+
+def test_expresion_del_cursor(cliente, monkeypatch):
+    expresiones = []
+    or_original = ConsultaLocal.or_
+
+    def registrar(self, filtros):
+        expresiones.append(filtros)
+        return or_original(self, filtros)
+    monkeypatch.setattr(ConsultaLocal, 'or_', registrar)
+
+    primera, cursor = consultar_pagina(None, None, 5, cliente=cliente)
+    assert expresiones == []
+    assert cursor == (primera[-1]['created_at'], primera[-1]['id'])
+    consultar_pagina(None, cursor, 5, cliente=cliente)
+    # Fecha entre comillas (lleva espacios y dos puntos); id sin comillas.
+    assert expresiones == [f'created_at.lt."{cursor[0]}",id.lt.{cursor[1]}']
+
+
+def test_filtros(cliente):
+    filtros = {'areaAn': 'Calidad', 'sexo': 'Ma', 'nombre': 'ana',
+               'desde': date(2025, 1, 11), 'hasta': date(2025, 1, 12)}
+    filas = [f for p in _todas(cliente, filtros, tamano=3) for f in p]
+    esperadas = _esperadas(cliente, lambda f: f['areaAn'] == 'Calidad' and f['sexo'] == 'Ma' and f['nombre'] == 'ana'
+                           and '2025-01-11' <= f['created_at'] < '2025-01-13')
+    assert esperadas
+    assert [f['id'] for f in filas] == [f['id'] for f in esperadas]
+
+
+def test_filtros_vacios_se_ignoran(cliente):
+    filtros = {'areaAn': None, 'sexo': '', 'nombre': '', 'desde': None, 'hasta': None}
+    assert len([f for p in _todas(cliente, filtros, tamano=50) for f in p]) == 60
+
+
+def test_proyeccion_agrega_las_columnas_del_cursor(cliente):
+    filas, cursor = consultar_pagina(None, None, 5, columnas=['nombre', 'preICA'], cliente=cliente)
+    assert list(filas[0]) == ['nombre', 'preICA', 'created_at', 'id']
+    assert cursor is not None
+    filas, _ = consultar_pagina(None, None, 5, cliente=cliente)
+    assert list(filas[0]) == COLUMNAS_HISTORIAL
+
+
+def test_paginas_en_cache(cliente, monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(CRUD, 'obtener_cliente', lambda: llamadas.append(1) or cliente)
+    primera = consultar_pagina(None, None, 5)
+    assert consultar_pagina(None, None, 5) == primera
+    assert len(llamadas) == 1
@@ -0,0 +1,42 @@
+# tests/test_deduplicacion.py
+
+import numpy as np
+
+from src.predictores.deduplicacion import filas_unicas
+
+
+def test_orden_de_primera_aparicion():
+    X = np.array([[3, 1], [1, 0], [3, 1], [2, 0], [1, 0], [1, 1]], dtype=np.float64)
+    unicas, inversa = filas_unicas(X)
+    np.testing.assert_array_equal(unicas, [[3, 1], [1, 0], [2, 0], [1, 1]])
+    np.testing.assert_array_equal(inversa, [0, 1, 0, 2, 1, 3])
+
+
+def test_reconstruye_el_lote():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(0, 8, 50_000), rng.integers(0, 2, 50_000),
+        rng.choice([14, 21, 28, 35], 50_000), rng.integers(0, 60, 50_000),
+    ]).astype(np.float64)
+    unicas, inversa = filas_unicas(X)
+    np.testing.assert_array_equal(unicas[inversa], X)
+    assert len(unicas) == len(np.unique(X, axis=0))
+
+
+def test_filas_con_nan():
+    # NaN es un valor más: dos filas con NaN en la misma columna son iguales.
+    X = np.array([[1, np.nan], [1, 2], [np.nan, np.nan], [1, np.nan], [np.nan, np.nan]])
+    unicas, inversa = filas_unicas(X)
+    assert len(unicas) == 3
+    np.testing.assert_array_equal(inversa, [0, 1, 2, 0, 2])
+    np.testing.assert_array_equal(unicas[inversa], X)
+
+
+def test_lote_vacio_y_sin_repetidas():
+    unicas, inversa = filas_unicas(np.empty((0, 4)))
+    assert unicas.shape == (0, 4) and len(inversa) == 0
+
+    X = np.arange(12, dtype=np.float64).reshape(4, 3)
+    unicas, inversa = filas_unicas(X)
+    np.testing.assert_array_equal(unicas, X)
+    np.testing.assert_array_equal(inversa, np.arange(4))
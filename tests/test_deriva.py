@@ -0,0 +1,103 @@
+# tests/test_deriva.py
+
+import numpy as np
+import pytest
+
+from src.predictores import deriva
+from src.predictores.deriva import NIVELES, PSI_ALTA, PSI_MODERADA, MonitorDeriva, construir_referencia
+
+VARIABLES = ['area', 'edad', 'peso']
+AREAS = {0: 'Calidad', 1: 'Coccidia', 2: 'C. tóxico'}
+
+
+def _entradas(n, semilla=0, desplazamiento_peso=0.0, areas=(0, 1, 2)):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.choice(areas, n), rng.choice([14, 21, 28, 35], n), rng.normal(2.5 + desplazamiento_peso, 0.2, n),
+    ]).astype(np.float64)
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.setattr(deriva, 'ESPERA_SIN_REFERENCIA', 0.0)
+    ruta = str(tmp_path / deriva.NOMBRE_REFERENCIA)
+    construir_referencia(_entradas(50_000), VARIABLES, 0, AREAS).guardar(ruta)
+    # El registro es del proceso: cada prueba usa su propio nombre.
+    return MonitorDeriva('Prueba', f'referencia_{tmp_path.name}', ruta, activo=True, vida_media_filas=1e9)
+
+
+def _fila(evaluacion, variable, area='Todas'):
+    return evaluacion[(evaluacion['variable'] == variable) & (evaluacion['area'] == area)].iloc[0]
+
+
+def test_misma_distribucion_es_estable(monitor):
+    monitor.observar(_entradas(20_000, semilla=1))
+    evaluacion = monitor.evaluar()
+    assert set(evaluacion['area']) == {'Todas', 'Calidad', 'Coccidia', 'C. tóxico'}
+    assert (evaluacion['nivel'] == 'estable').all()
+    assert (evaluacion['psi'] < PSI_MODERADA).all()
+    # El área no se evalúa dentro de cada área (es constante).
+    assert 'area' not in set(evaluacion.loc[evaluacion['area'] != 'Todas', 'variable'])
+
+
+def test_distribucion_desplazada_da_alerta_alta(monitor):
+    monitor.observar(_entradas(20_000, semilla=2, desplazamiento_peso=0.4))
+    evaluacion = monitor.evaluar()
+    peso = _fila(evaluacion, 'peso')
+    assert peso['psi'] >= PSI_ALTA and peso['nivel'] == 'alta'
+    assert peso['fuera_de_rango'] > deriva.FUERA_DE_RANGO_MAX
+    assert _fila(evaluacion, 'edad')['nivel'] == 'estable'
+
+    alertas = monitor.alertas()
+    assert set(alertas['variable']) == {'peso'}
+    assert alertas['psi'].is_monotonic_decreasing
+    assert monitor.alertas('alta')['nivel'].eq('alta').all()
+
+
+def test_niveles_segun_umbrales(monitor):
+    monitor.observar(_entradas(20_000, semilla=3, desplazamiento_peso=0.1))
+    for fila in monitor.evaluar().itertuples():
+        esperado = 2 if fila.psi >= PSI_ALTA else 1 if fila.psi >= PSI_MODERADA or fila.fuera_de_rango > 0.01 else 0
+        assert fila.nivel == NIVELES[esperado]
+
+
+def test_fuera_de_rango_sin_cambio_de_forma(monitor):
+    # Un 5 % de las filas por encima del máximo de entrenamiento alcanza para avisar.
+    X = _entradas(20_000, semilla=4)
+    X[:1000, 2] = 10.0
+    monitor.observar(X)
+    peso = _fila(monitor.evaluar(), 'peso')
+    assert peso['fuera_de_rango'] == pytest.approx(0.05, abs=0.002)
+    assert peso['nivel'] != 'estable'
+
+
+def test_areas_con_pocas_filas_no_se_evaluan(monitor):
+    monitor.observar(_entradas(1000, semilla=5, areas=(0,)))
+    monitor.observar(_entradas(50, semilla=6, areas=(1,)))
+    assert set(monitor.evaluar(min_filas=200)['area']) == {'Todas', 'Calidad'}
+
+
+def test_lo_viejo_pierde_peso(monitor):
+    monitor.vida_media_filas = 1000
+    monitor.observar(_entradas(5000, semilla=7, desplazamiento_peso=0.4))
+    assert _fila(monitor.evaluar(), 'peso')['nivel'] == 'alta'
+    for semilla in range(8, 18):
+        monitor.observar(_entradas(5000, semilla=semilla))
+    assert _fila(monitor.evaluar(), 'peso')['nivel'] == 'estable'
+
+
+def test_lotes_grandes_se_muestrean_con_su_peso(monitor):
+    monitor.observar(_entradas(deriva.MAX_FILAS_OBSERVADAS * 3, semilla=19))
+    assert monitor.filas_observadas == deriva.MAX_FILAS_OBSERVADAS * 3
+    assert _fila(monitor.evaluar(), 'peso')['filas'] == pytest.approx(deriva.MAX_FILAS_OBSERVADAS * 3, rel=1e-6)
+
+
+def test_sin_referencia_no_mide_y_avisa_una_vez(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(deriva, 'ESPERA_SIN_REFERENCIA', 0.0)
+    monitor = MonitorDeriva('Prueba', f'referencia_ausente_{tmp_path.name}', str(tmp_path / 'no_existe.npz'), activo=True)
+    monitor.observar(_entradas(1000))
+    monitor.observar(_entradas(1000))
+    assert monitor.evaluar().empty
+    assert monitor.estadisticas()['referencia'] is None
+    assert monitor.llamadas == 0
+    assert capsys.readouterr().out.count('ADVERTENCIA') == 1
@@ -0,0 +1,73 @@
+# tests/test_escenarios.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.predictores import escenarios
+from src.predictores.codificacion import codificar_fila
+from src.predictores.escenarios import COLUMNAS_PREDICCION, extremos_ica, predict_grid
+from src.predictores.predicciones_ML import predict_all
+
+# El motor NumPy no necesita xgboost y usa los árboles exportados del repo.
+OPCIONES = dict(motor='numpy', n_workers=1)
+
+
+@pytest.mark.parametrize('edades_hts, edades_venta', [((), range(30, 40)), ((14, 21), [])])
+def test_rangos_vacios(edades_hts, edades_venta):
+    with pytest.raises(ValueError, match='vacíos'):
+        predict_grid('Calidad', 'Ma', edades_venta, edades_hts, **OPCIONES)
+
+
+def test_area_desconocida():
+    with pytest.raises(ValueError, match='Área'):
+        predict_grid('Otra', 'Ma', range(30, 40), **OPCIONES)
+
+
+def test_limite_de_escenarios(monkeypatch):
+    monkeypatch.setattr(escenarios, 'MAX_ESCENARIOS', 12)
+    # 4 x 4 = 16 > 12: se rechaza antes de evaluar nada.
+    with pytest.raises(ValueError, match='16 escenarios'):
+        predict_grid('Calidad', 'Ma', range(30, 34), **OPCIONES)
+    # Justo en el límite sí se evalúa.
+    assert len(predict_grid('Calidad', 'Ma', range(30, 33), **OPCIONES)) == 12
+
+
+def test_grilla_igual_a_predecir_cada_fila():
+    curvas = predict_grid('Coccidia', 'He', range(0, 200, 7), edades_hts=(21, 35), **OPCIONES)
+    assert len(curvas) == 2 * len(range(0, 200, 7))
+    # Edad HTS varía más lento que la edad de granja.
+    assert curvas['Edad HTS'].is_monotonic_increasing
+    assert curvas.groupby('Edad HTS')['Edad Granja'].apply(lambda s: s.is_monotonic_increasing).all()
+    assert curvas['Edad Granja'].dtype.kind == 'i'
+
+    filas = np.vstack([
+        codificar_fila('Coccidia', 'He', hts, edad) for hts, edad in zip(curvas['Edad HTS'], curvas['Edad Granja'])
+    ])
+    esperado = predict_all(filas, deduplicar=False, monitorear=False, **OPCIONES)
+    np.testing.assert_array_equal(curvas[COLUMNAS_PREDICCION].to_numpy(), esperado.to_numpy())
+
+
+def test_extremos_son_el_minimo_y_maximo_reales():
+    curvas = predict_grid('Calidad', 'Ma', range(0, 5001, 50), **OPCIONES)
+    extremos = extremos_ica(curvas)
+    assert len(extremos) == 2 * len(escenarios.EDADES_HTS)
+    for (hts, criterio), fila in extremos.set_index(['Edad HTS', 'criterio']).iterrows():
+        grupo = curvas[curvas['Edad HTS'] == hts]
+        ica = grupo['preICA'].min() if criterio == 'min' else grupo['preICA'].max()
+        assert fila['preICA'] == ica
+        # La fila elegida existe en la grilla con esas mismas predicciones.
+        elegida = grupo[grupo['Edad Granja'] == fila['Edad Granja']]
+        assert elegida[COLUMNAS_PREDICCION].iloc[0].tolist() == fila[COLUMNAS_PREDICCION].tolist()
+
+
+def test_extremos_con_empates_toman_la_menor_edad():
+    curvas = pd.DataFrame({
+        'Edad HTS': [14, 14, 14, 14, 21, 21],
+        'Edad Granja': [30, 31, 32, 33, 30, 31],
+        'prePorcMort': 0.0, 'prePorcCon': 0.0, 'prePeProFin': 0.0,
+        'preICA': [1.5, 1.2, 1.2, 1.8, 1.4, 1.4],
+    })
+    extremos = extremos_ica(curvas).set_index(['Edad HTS', 'criterio'])['Edad Granja']
+    assert extremos.to_dict() == {(14, 'min'): 31, (14, 'max'): 33, (21, 'min'): 30, (21, 'max'): 30}
+    assert extremos_ica(pd.DataFrame()).empty
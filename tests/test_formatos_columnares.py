@@ -0,0 +1,142 @@
+# tests/test_formatos_columnares.py
+
+import io
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq  # noqa: E402
+
+from src.utils.formatos_columnares import (  # noqa: E402
+    EscritorColumnar, leer_arrow_en_bloques, leer_parquet_en_bloques
+)
+
+PREDICCIONES = ['preICA', 'prePeProFin']
+
+
+def _bloque(areas, galpones, inicio=0):
+    return pd.DataFrame({
+        'Area': areas,
+        'Galpon': galpones,
+        'Edad HTS': range(inicio, inicio + len(areas)),
+        'preICA': [1.5] * len(areas),
+        'prePeProFin': [2.25] * len(areas),
+    })
+
+
+def _escribir(formato, bloques):
+    destino = io.BytesIO()
+    escritor = EscritorColumnar(destino, formato, PREDICCIONES)
+    for bloque in bloques:
+        escritor.escribir(bloque)
+    escritor.cerrar()
+    return destino.getvalue()
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'arrow'])
+def test_cerrar_sin_bloques_deja_un_archivo_vacio_con_esquema(formato):
+    datos = _escribir(formato, [])
+    assert datos
+    if formato == 'parquet':
+        tabla = pq.read_table(io.BytesIO(datos))
+    else:
+        tabla = pa.ipc.open_file(io.BytesIO(datos)).read_all()
+    assert tabla.num_rows == 0
+    assert tabla.schema.names == PREDICCIONES
+    assert all(tipo == pa.float32() for tipo in tabla.schema.types)
+
+
+def test_arrow_con_deltas_de_diccionario_en_varios_bloques():
+    bloques = [
+        _bloque(['Calidad', 'Coccidia', 'Calidad'], ['G1', 'G2', None]),
+        # Valores repetidos, nuevos y nulos mezclados.
+        _bloque(['Coccidia', 'C. tóxico', 'S. esquelético'], ['G3', 'G1', 'G4'], inicio=3),
+        _bloque(['I. Respiratoria', 'Calidad'], [None, 'G5'], inicio=6),
+    ]
+    lector = pa.ipc.open_file(io.BytesIO(_escribir('arrow', bloques)))
+    assert lector.num_record_batches == 3
+    assert pa.types.is_dictionary(lector.schema.field('Area').type)
+    assert lector.schema.field('preICA').type == pa.float32()
+
+    # El diccionario crece bloque a bloque (deltas) sin reordenar los valores
+    # ya vistos: los códigos de los primeros bloques siguen siendo válidos.
+    areas = [lector.get_batch(i).column('Area') for i in range(3)]
+    assert areas[2].dictionary.to_pylist() == ['Calidad', 'Coccidia', 'C. tóxico', 'S. esquelético', 'I. Respiratoria']
+    assert [a.indices.to_pylist() for a in areas] == [[0, 1, 0], [1, 2, 3], [4, 0]]
+
+    leido = lector.read_all().to_pandas()
+    esperado = pd.concat(bloques, ignore_index=True)
+    assert leido['Area'].astype(object).tolist() == esperado['Area'].tolist()
+    assert leido['Galpon'].astype(object).where(leido['Galpon'].notna(), None).tolist() == esperado['Galpon'].tolist()
+    assert leido['Edad HTS'].tolist() == list(range(8))
+
+
+def test_parquet_un_row_group_por_bloque():
+    bloques = [_bloque(['Calidad'] * 2, ['G1', 'G2']), _bloque(['Coccidia'], ['G3'], inicio=2)]
+    archivo = pq.ParquetFile(io.BytesIO(_escribir('parquet', bloques)))
+    assert archivo.metadata.num_row_groups == 2
+    assert archivo.read().column('Galpon').to_pylist() == ['G1', 'G2', 'G3']
+
+
+def _parquet(df):
+    destino = io.BytesIO()
+    df.to_parquet(destino, index=False)
+    destino.seek(0)
+    return destino
+
+
+def _arrow(df, stream=False, filas_por_lote=None):
+    destino = io.BytesIO()
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    abrir = pa.ipc.new_stream if stream else pa.ipc.new_file
+    with abrir(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla, max_chunksize=filas_por_lote)
+    destino.seek(0)
+    return destino
+
+
+def _leer(bloques):
+    bloques = list(bloques)
+    return pd.concat([bloque for bloque, _ in bloques], ignore_index=True), [len(b) for b, _ in bloques], \
+        [fraccion for _, fraccion in bloques]
+
+
+ENTRADA = pd.DataFrame({'Sexo': ['Ma', 'He'] * 1250, 'Edad Granja': range(2500)})
+
+
+def test_leer_parquet_en_bloques():
+    df, tamanos, fracciones = _leer(leer_parquet_en_bloques(_parquet(ENTRADA), 1000))
+    pd.testing.assert_frame_equal(df, ENTRADA)
+    assert tamanos == [1000, 1000, 500]
+    assert fracciones == sorted(fracciones) and fracciones[-1] == 1.0
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_leer_arrow_corta_lotes_grandes(stream):
+    # Un solo record batch de 2500 filas sale en bloques de 1000.
+    df, tamanos, fracciones = _leer(leer_arrow_en_bloques(_arrow(ENTRADA, stream), 1000))
+    pd.testing.assert_frame_equal(df, ENTRADA)
+    assert tamanos == [1000, 1000, 500]
+    if not stream:
+        assert fracciones[-1] == 1.0
+
+
+def test_leer_arrow_en_varios_lotes():
+    df, tamanos, fracciones = _leer(leer_arrow_en_bloques(_arrow(ENTRADA, filas_por_lote=600), 1000))
+    pd.testing.assert_frame_equal(df, ENTRADA)
+    assert tamanos == [600, 600, 600, 600, 100]
+    assert fracciones == sorted(fracciones) and fracciones[-1] == 1.0
+
+
+@pytest.mark.parametrize('leer, armar', [
+    (leer_parquet_en_bloques, _parquet),
+    (leer_arrow_en_bloques, _arrow),
+    (leer_arrow_en_bloques, lambda df: _arrow(df, stream=True)),
+])
+def test_lectores_con_archivo_vacio(leer, armar):
+    bloques = list(leer(armar(ENTRADA.head(0)), 1000))
+    assert len(bloques) == 1
+    bloque, fraccion = bloques[0]
+    assert bloque.empty and list(bloque.columns) == ['Sexo', 'Edad Granja']
+    assert fraccion == 1.0
@@ -0,0 +1,98 @@
+# tests/test_lote_dl.py
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los escaladores y el encoder de 'Area' son objetos de scikit-learn.
+pytest.importorskip('sklearn')
+
+from src.predictores.predicciones_DL import FEATURES, TARGETS, codificar_lote_dl, obtener_le_area, predecir_dl  # noqa: E402
+from src.utils.lote_dl import predecir_archivo_dl_en_bloques  # noqa: E402
+from src.utils.lote_streaming import ErrorValidacion  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def le_area():
+    return obtener_le_area()
+
+
+def _entrada(le_area, filas=2500, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'PorcMortSem4': rng.uniform(0, 2, filas).round(3),
+        'PorcMortSem5': rng.uniform(0, 2, filas).round(3),
+        'PorcMortSem6': rng.uniform(0, 2, filas).round(3),
+        'PesoSem4': rng.uniform(1.5, 2.5, filas).round(3),
+        'PesoSem5': rng.uniform(2.0, 3.0, filas).round(3),
+        'Pob Inicial': rng.integers(5_000, 30_000, filas),
+        'Edad HTS': rng.choice([14, 21, 28, 35], filas),
+        'Edad Granja': rng.integers(0, 5_000, filas),
+        'Area': rng.choice(le_area.classes_, filas),
+    })[FEATURES]
+
+
+def _csv(df):
+    return io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+
+
+def _predecir(archivo, le_area, nombre='lote.csv', **kwargs):
+    destino = io.BytesIO()
+    resumen = predecir_archivo_dl_en_bloques(archivo, nombre, destino, le_area=le_area, motor='numpy', **kwargs)
+    destino.seek(0)
+    return destino, resumen
+
+
+def test_bloques_dan_lo_mismo_que_el_lote_completo(le_area):
+    entrada = _entrada(le_area)
+    avances = []
+    destino, resumen = _predecir(_csv(entrada), le_area, filas_por_bloque=1000, filas_vista_previa=10,
+                                 progreso=lambda fraccion, texto: avances.append(fraccion))
+
+    resultado = pd.read_csv(destino)
+    assert resumen['filas'] == len(resultado) == 2500
+    assert list(resultado.columns) == FEATURES + TARGETS
+    assert resultado['Area'].tolist() == entrada['Area'].tolist()
+    X, errores = codificar_lote_dl(entrada, le_area)
+    assert not errores
+    np.testing.assert_allclose(resultado[TARGETS].to_numpy(), predecir_dl(X, 'numpy', monitorear=False), rtol=1e-5)
+
+    assert len(resumen['vista_previa']) == 10
+    assert resumen['filas_por_segundo'] > 0 and resumen['filas_por_segundo_modelo'] > 0
+    # Un aviso por bloque y el último en 1.0.
+    assert len(avances) == 4 and avances[-1] == 1.0
+
+
+def test_error_informa_la_fila_del_archivo(le_area):
+    entrada = _entrada(le_area)
+    entrada.loc[1500, 'Area'] = 'Area inexistente'
+    entrada.loc[2100, 'Area'] = 'Otra'
+    with pytest.raises(ErrorValidacion) as error:
+        _predecir(_csv(entrada), le_area, filas_por_bloque=1000)
+    # Fila 1 = primera fila de datos, contando los bloques anteriores.
+    assert "'Area'" in str(error.value)
+    assert "(1501, 'Area inexistente')" in error.value.detalle
+
+
+def test_valor_no_numerico(le_area):
+    entrada = _entrada(le_area, filas=10).astype({'PesoSem4': object})
+    entrada.loc[3, 'PesoSem4'] = 'dos'
+    with pytest.raises(ErrorValidacion) as error:
+        _predecir(_csv(entrada), le_area)
+    assert "(4, 'dos')" in error.value.detalle
+
+
+def test_faltan_columnas(le_area):
+    with pytest.raises(ErrorValidacion, match='Pob Inicial'):
+        _predecir(_csv(_entrada(le_area, filas=10).drop(columns=['Pob Inicial'])), le_area)
+
+
+def test_salida_parquet_en_float32(le_area):
+    pytest.importorskip('pyarrow')
+    entrada = _entrada(le_area, filas=1500)
+    destino, resumen = _predecir(_csv(entrada), le_area, filas_por_bloque=1000, formato='parquet')
+    resultado = pd.read_parquet(destino)
+    assert len(resultado) == resumen['filas'] == 1500
+    assert all(str(resultado[columna].dtype) == 'float32' for columna in TARGETS)
@@ -0,0 +1,81 @@
+# tests/test_lote_streaming.py
+
+import io
+
+import pandas as pd
+import pytest
+
+from src.utils.lote_streaming import (
+    ErrorValidacion, LectorTolerante, RegistrosDiferidos, leer_en_bloques, predecir_archivo_en_bloques
+)
+
+
+def _csv_con_acento_tardio(encoding, filas_sin_acento=5000):
+    filas = ['Galpon,Sexo,Area,Edad HTS,Edad Granja']
+    filas += [f'G{i},Ma,Calidad,10,30' for i in range(filas_sin_acento)]
+    filas.append('G-final,He,S. esquelético,12,35')
+    return ('\r\n'.join(filas) + '\r\n').encode(encoding)
+
+
+def _leer_todo(datos, nombre='lote.csv', filas_por_bloque=1000):
+    bloques = [bloque for bloque, _ in leer_en_bloques(io.BytesIO(datos), nombre, filas_por_bloque)]
+    return pd.concat(bloques, ignore_index=True)
+
+
+def test_acento_tardio_utf8():
+    # La muestra inicial solo ve ASCII; el acento UTF-8 llega después.
+    df = _leer_todo(_csv_con_acento_tardio('utf-8'))
+    assert len(df) == 5001
+    assert df['Area'].iloc[-1] == 'S. esquelético'
+    assert (df['Area'].iloc[:-1] == 'Calidad').all()
+
+
+def test_acento_tardio_latin1():
+    df = _leer_todo(_csv_con_acento_tardio('latin1'))
+    assert len(df) == 5001
+    assert df['Area'].iloc[-1] == 'S. esquelético'
+
+
+def test_lector_tolerante_cambia_a_latin1_en_byte_invalido():
+    datos = 'Calidad\n'.encode('utf-8') * 3 + 'S. esquelético\n'.encode('latin1')
+    lector = LectorTolerante(io.BytesIO(datos), 'utf-8', bytes_lectura=7)
+    assert lector.read() == 'Calidad\n' * 3 + 'S. esquelético\n'
+    assert lector.encoding_actual == 'latin1'
+
+
+def test_lector_tolerante_respeta_caracteres_partidos_entre_lecturas():
+    datos = ('é' * 50 + '\n').encode('utf-8')
+    lector = LectorTolerante(io.BytesIO(datos), 'utf-8', bytes_lectura=3)
+    assert lector.read(10) + lector.read() == 'é' * 50 + '\n'
+    assert lector.encoding_actual == 'utf-8'
+
+
+def _csv_con_error_tardio(filas_validas=2500):
+    filas = ['Galpon,Sexo,Area,Edad HTS,Edad Granja']
+    filas += [f'G{i},Ma,Calidad,10,30' for i in range(filas_validas)]
+    filas.append('G-final,Ma,Area inexistente,10,30')
+    return ('\n'.join(filas) + '\n').encode('utf-8')
+
+
+def test_registros_diferidos_no_guarda_nada_si_falla_un_bloque_tardio():
+    registros = RegistrosDiferidos('2026-01-01 00:00')
+    with pytest.raises(ErrorValidacion):
+        predecir_archivo_en_bloques(io.BytesIO(_csv_con_error_tardio()), 'lote.csv', io.BytesIO(),
+                                    filas_por_bloque=1000, al_procesar_bloque=registros)
+    # Los bloques válidos quedaron en el temporal, pero nada salió hacia la base.
+    assert registros.bloques == 2
+    registros.cerrar()
+
+
+def test_registros_diferidos_devuelve_los_bloques_en_orden():
+    registros = RegistrosDiferidos('2026-01-01 00:00')
+    resumen = predecir_archivo_en_bloques(io.BytesIO(_csv_con_acento_tardio('utf-8', 2500)), 'lote.csv',
+                                          io.BytesIO(), filas_por_bloque=1000, al_procesar_bloque=registros)
+    bloques = list(registros.leer())
+    registros.cerrar()
+
+    assert [len(b) for b in bloques] == [1000, 1000, 501]
+    todos = pd.concat(bloques, ignore_index=True)
+    assert len(todos) == resumen['filas_escritas']
+    assert todos['areaAn'].iloc[-1] == 'S. esquelético'
+    assert (todos['created_at'] == '2026-01-01 00:00').all()
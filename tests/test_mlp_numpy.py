@@ -0,0 +1,60 @@
+# tests/test_mlp_numpy.py
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('h5py')
+pytest.importorskip('tensorflow')
+
+from src.predictores import mlp_numpy  # noqa: E402
+from src.predictores.predicciones_DL import (  # noqa: E402
+    FEATURES, RUTA_KERAS, obtener_escaladores, obtener_modelo_keras, version_mlp
+)
+
+# El motor trabaja en float32 y Keras también; la diferencia observada
+# ronda 1e-5 en la escala original de los objetivos.
+TOLERANCIA_ABS = 1e-4
+TOLERANCIA_REL = 1e-5
+
+
+@pytest.fixture(scope='module')
+def entradas():
+    X_scaler, _ = obtener_escaladores()
+    rng = np.random.default_rng(0)
+    X = rng.normal(X_scaler.mean_, X_scaler.scale_, size=(2000, len(FEATURES)))
+    return pd.DataFrame(X, columns=FEATURES)
+
+
+def _verificar(motor, entradas):
+    X_scaler, y_scaler = obtener_escaladores()
+    esperado = y_scaler.inverse_transform(obtener_modelo_keras().predict(X_scaler.transform(entradas), verbose=0))
+    obtenido = motor.predecir(entradas.to_numpy())
+    np.testing.assert_allclose(obtenido, esperado, rtol=TOLERANCIA_REL, atol=TOLERANCIA_ABS)
+
+    resultado = mlp_numpy.verificar_paridad(motor, obtener_modelo_keras(), X_scaler, y_scaler, entradas)
+    assert max(resultado['error_abs_max']) < TOLERANCIA_ABS
+
+
+def test_paridad_exportacion_nueva(tmp_path, entradas):
+    ruta = str(tmp_path / 'mlp.npz')
+    mlp_numpy.exportar_mlp(RUTA_KERAS, *obtener_escaladores(), ruta)
+    _verificar(mlp_numpy.MotorMLP(ruta), entradas)
+
+
+def test_paridad_red_versionada(entradas):
+    ruta = mlp_numpy.ruta_mlp(version_mlp())
+    if not os.path.exists(ruta):
+        pytest.skip(f'{ruta} no está exportada')
+    _verificar(mlp_numpy.MotorMLP(ruta), entradas)
+
+
+def test_predecir_por_bloques_igual_que_de_una_vez(tmp_path, entradas, monkeypatch):
+    ruta = str(tmp_path / 'mlp.npz')
+    mlp_numpy.exportar_mlp(RUTA_KERAS, *obtener_escaladores(), ruta)
+    motor = mlp_numpy.MotorMLP(ruta)
+    completo = motor.predecir(entradas.to_numpy())
+    monkeypatch.setattr(mlp_numpy, 'FILAS_POR_BLOQUE', 333)
+    np.testing.assert_array_equal(motor.predecir(entradas.to_numpy()), completo)
@@ -0,0 +1,63 @@
+# tests/test_motor_fusionado.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip('xgboost')
+
+from src.predictores import motor_fusionado  # noqa: E402
+from src.predictores.motor_fusionado import FILAS_MINIMAS_PARALELO, MotorFusionado  # noqa: E402
+from src.predictores.predicciones_ML import obtener_modelos  # noqa: E402
+
+TAMANOS = [1, FILAS_MINIMAS_PARALELO - 1, FILAS_MINIMAS_PARALELO, FILAS_MINIMAS_PARALELO + 1, 3 * FILAS_MINIMAS_PARALELO]
+
+
+@pytest.fixture(scope='module')
+def modelos():
+    return obtener_modelos()
+
+
+@pytest.fixture(scope='module')
+def motor(modelos):
+    return MotorFusionado(modelos)
+
+
+def _lote(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.integers(0, 8, n), rng.integers(0, 2, n), rng.choice([14, 21, 28, 35], n), rng.uniform(0, 5000, n),
+    ])
+
+
+def _esperado(modelos, X):
+    return np.column_stack([modelo.predict(X) for modelo in modelos])
+
+
+@pytest.mark.parametrize('n', TAMANOS)
+def test_igual_a_predict_a_ambos_lados_del_umbral(motor, modelos, n, monkeypatch):
+    # Forzamos varios hilos aunque la máquina tenga una sola CPU.
+    monkeypatch.setattr(motor_fusionado, '_N_HILOS', 4)
+    X = _lote(n, semilla=n)
+    salida = motor.predecir(X)
+    assert salida.shape == (n, 4) and salida.dtype == np.float32
+    np.testing.assert_array_equal(salida, _esperado(modelos, X))
+
+
+def test_serie_y_paralelo_dan_lo_mismo(motor, monkeypatch):
+    X = _lote(3 * FILAS_MINIMAS_PARALELO, semilla=1)
+    monkeypatch.setattr(motor_fusionado, '_N_HILOS', 1)
+    en_serie = motor.predecir(X)
+    monkeypatch.setattr(motor_fusionado, '_N_HILOS', 4)
+    np.testing.assert_array_equal(motor.predecir(X), en_serie)
+
+
+def test_llamadas_concurrentes_comparten_el_pool(motor, modelos, monkeypatch):
+    monkeypatch.setattr(motor_fusionado, '_N_HILOS', 4)
+    lotes = [_lote(FILAS_MINIMAS_PARALELO + i, semilla=i) for i in range(6)]
+    with ThreadPoolExecutor(max_workers=6) as sesiones:
+        salidas = list(sesiones.map(motor.predecir, lotes))
+    for X, salida in zip(lotes, salidas):
+        np.testing.assert_array_equal(salida, _esperado(modelos, X))
+    assert motor_fusionado._obtener_pool() is motor_fusionado._pool
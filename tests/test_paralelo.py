@@ -0,0 +1,54 @@
+# tests/test_paralelo.py
+
+import threading
+
+import numpy as np
+import pytest
+
+from src.predictores import paralelo, predicciones_ML
+
+
+@pytest.fixture
+def lote():
+    rng = np.random.default_rng(0)
+    return np.column_stack([
+        rng.integers(0, 8, 4000), rng.integers(0, 2, 4000), rng.integers(10, 20, 4000), rng.integers(25, 45, 4000)
+    ]).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def pools_limpios():
+    paralelo.cerrar_pool()
+    yield
+    paralelo.cerrar_pool()
+
+
+def test_configuraciones_distintas_no_se_cancelan_entre_si(lote):
+    esperado = predicciones_ML._predecir_modelos(lote, None, n_workers=1)
+    resultados, errores = {}, []
+
+    def predecir(n_workers):
+        try:
+            resultados[n_workers] = paralelo.predecir_en_paralelo(lote, n_workers)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=predecir, args=(n,)) for n in (2, 3)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    for resultado in resultados.values():
+        np.testing.assert_allclose(resultado, esperado, rtol=1e-6)
+    assert set(paralelo._pools) == {(2, None), (3, None)}
+
+
+def test_cierra_solo_pools_ociosos_por_encima_del_maximo(lote, monkeypatch):
+    monkeypatch.setattr(paralelo, 'MAX_POOLS', 1)
+    paralelo.predecir_en_paralelo(lote[:100], 2)
+    with paralelo._usar_pool(3, None) as pool:
+        # El pool de 2 estaba ocioso y se cerró; el que está en uso sigue.
+        assert list(paralelo._pools) == [(3, None)]
+        assert pool.submit(sum, [1, 2]).result() == 3
@@ -0,0 +1,43 @@
+# tests/test_servicio.py
+
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from servicio import ServicioPredicciones
+from src.predictores.microlotes import AgrupadorMicrolotes, PeticionDemasiadoGrande
+
+
+def test_agrupador_rechaza_peticiones_mas_grandes_que_max_pendientes():
+    agrupador = AgrupadorMicrolotes(lambda X: X * 2, max_pendientes=8)
+    np.testing.assert_array_equal(agrupador.predecir(np.ones((8, 3))), np.full((8, 3), 2.0))
+    with pytest.raises(PeticionDemasiadoGrande, match='9 filas'):
+        agrupador.predecir(np.ones((9, 3)))
+    # No cuenta como saturación: la cola estaba vacía.
+    assert agrupador.estadisticas()['rechazadas'] == 0
+
+
+@pytest.fixture
+def servicio():
+    servidor = ServicioPredicciones(('127.0.0.1', 0), max_pendientes=4)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_servicio_responde_413_si_la_peticion_no_cabe_nunca(servicio):
+    registros = [{'Area': 'Calidad', 'Sexo': 'Ma', 'Edad HTS': 14, 'Edad Granja': 35}] * 5
+    conexion = http.client.HTTPConnection(*servicio.server_address)
+    conexion.request('POST', '/predecir', json.dumps({'registros': registros}),
+                     {'Content-Type': 'application/json'})
+    respuesta = conexion.getresponse()
+    cuerpo = json.loads(respuesta.read())
+
+    assert respuesta.status == 413
+    assert respuesta.getheader('Retry-After') is None
+    assert '5 filas' in cuerpo['error'] and 'máximo por petición es 4' in cuerpo['error']
@@ -0,0 +1,191 @@
+# tests/test_sharepoint.py
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.utils import sharepointUtill
+from src.utils.sharepointUtill import GestorSharePoint, SumideroSharePoint
+from src.utils.sharepoint_local import ArchivosLocales
+
+CARPETA = '/sites/pruebas/Shared Documents'
+
+
+def _filas(n, desde=0):
+    return pd.DataFrame({'Area': ['Calidad'] * n, 'preICA': [1.5 + i for i in range(desde, desde + n)]})
+
+
+@pytest.fixture(autouse=True)
+def sin_compactaciones_previas(monkeypatch):
+    monkeypatch.setattr(sharepointUtill, '_ultima_compactacion', {})
+
+
+@pytest.fixture
+def archivos(tmp_path):
+    return ArchivosLocales(str(tmp_path))
+
+
+@pytest.fixture
+def gestor(monkeypatch, tmp_path):
+    autenticaciones = []
+
+    def autenticar(site_url, username, password):
+        autenticaciones.append(username)
+        return str(tmp_path)
+
+    gestor = GestorSharePoint(autenticar=autenticar, crear_archivos=lambda ctx, tiempos: ArchivosLocales(ctx))
+    gestor.autenticaciones = autenticaciones
+    monkeypatch.setattr(sharepointUtill, 'gestor_sharepoint', gestor)
+    yield gestor
+    gestor.detener_compactacion()
+
+
+def test_agregar_crea_una_parte_por_guardado(archivos):
+    sumidero = SumideroSharePoint(archivos, CARPETA)
+    sumidero.agregar(_filas(1))
+    sumidero.agregar(_filas(3, desde=1))
+
+    assert len(sumidero._partes()) == 2
+    leido = sumidero.leer()
+    assert leido['preICA'].tolist() == _filas(4)['preICA'].tolist()
+
+
+def test_compactar_consolida_y_borra_las_partes(archivos):
+    sumidero = SumideroSharePoint(archivos, CARPETA)
+    sumidero.agregar(_filas(2))
+    sumidero.agregar(_filas(2, desde=2))
+
+    assert sumidero.compactar() == 2
+    assert sumidero._partes() == []
+    assert sumidero._leer_candado() is None
+
+    sumidero.agregar(_filas(1, desde=4))
+    leido = sumidero.leer()
+    assert leido['preICA'].tolist() == _filas(5)['preICA'].tolist()
+    assert sumidero.compactar() == 1
+    pd.testing.assert_frame_equal(sumidero.leer(), _filas(5))
+
+
+def test_compactar_respeta_el_candado_de_otro_proceso(archivos):
+    sumidero = SumideroSharePoint(archivos, CARPETA)
+    otro = SumideroSharePoint(ArchivosLocales(archivos.directorio), CARPETA)
+    sumidero.agregar(_filas(2))
+
+    dueno = otro._tomar_candado()
+    assert dueno is not None
+    assert sumidero.compactar() == 0
+    assert len(sumidero._partes()) == 1
+
+    otro._soltar_candado(dueno)
+    assert sumidero.compactar() == 1
+
+
+def test_candado_vencido_no_bloquea(archivos):
+    sumidero = SumideroSharePoint(archivos, CARPETA)
+    abandonado = SumideroSharePoint(archivos, CARPETA, duracion_candado=-1)
+    sumidero.agregar(_filas(1))
+
+    assert abandonado._tomar_candado() is None  # Nace vencido: nadie lo tiene.
+    archivos.subir(sumidero.carpeta_partes, sumidero.nombre_candado, f"otro {time.time() - 1}".encode())
+    assert sumidero.compactar() == 1
+
+
+def test_compactaciones_concurrentes_no_pierden_filas(tmp_path):
+    sumideros = [SumideroSharePoint(ArchivosLocales(str(tmp_path)), CARPETA) for _ in range(4)]
+    for i, sumidero in enumerate(sumideros):
+        sumidero.agregar(_filas(1, desde=i))
+
+    hilos = [threading.Thread(target=s.compactar) for s in sumideros]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    sumideros[0].compactar()
+
+    assert sorted(sumideros[0].leer()['preICA']) == sorted(_filas(4)['preICA'])
+
+
+def test_proceso_nuevo_no_compacta_en_su_primer_guardado(archivos):
+    sumidero = SumideroSharePoint(archivos, CARPETA)
+    sumidero.agregar(_filas(1))
+
+    assert sumidero.compactar_si_corresponde(intervalo=600) is None
+    assert len(sumidero._partes()) == 1
+
+
+def test_compactar_si_corresponde_corre_en_segundo_plano(archivos):
+    sumidero = SumideroSharePoint(archivos, CARPETA)
+    sumidero.agregar(_filas(2))
+
+    hilo = sumidero.compactar_si_corresponde(intervalo=0)
+    assert isinstance(hilo, threading.Thread)
+    hilo.join()
+    assert sumidero._partes() == []
+    assert len(sumidero.leer()) == 2
+
+
+def test_append_reutiliza_la_sesion(gestor):
+    for i in range(3):
+        ok, mensaje = sharepointUtill.append_a_excel_existente(
+            'https://pruebas', 'usuario', 'clave', CARPETA, 'predicciones.xlsx', _filas(1, desde=i)
+        )
+        assert ok, mensaje
+
+    assert gestor.autenticaciones == ['usuario']
+    assert gestor.estadisticas()['sesiones'] == 1
+    archivos = gestor.obtener_archivos('https://pruebas', 'usuario', 'clave')
+    leido = SumideroSharePoint(archivos, CARPETA).leer()
+    assert leido['preICA'].tolist() == _filas(3)['preICA'].tolist()
+
+
+def test_append_autentica_de_nuevo_si_cambia_la_clave_o_vence(gestor):
+    gestor.obtener_archivos('https://pruebas', 'usuario', 'clave')
+    gestor.obtener_archivos('https://pruebas', 'usuario', 'otra')
+    gestor.ttl = -1
+    gestor.invalidar('https://pruebas', 'usuario', 'clave')
+    gestor.obtener_archivos('https://pruebas', 'usuario', 'clave')
+    gestor.obtener_archivos('https://pruebas', 'usuario', 'clave')
+
+    assert len(gestor.autenticaciones) == 4
+
+
+def test_append_con_credenciales_invalidas(monkeypatch):
+    gestor = GestorSharePoint(autenticar=lambda *args: None, crear_archivos=lambda ctx, tiempos: ctx)
+    monkeypatch.setattr(sharepointUtill, 'gestor_sharepoint', gestor)
+
+    ok, mensaje = sharepointUtill.append_a_excel_existente(
+        'https://pruebas', 'usuario', 'mala', CARPETA, 'predicciones.xlsx', _filas(1)
+    )
+    assert not ok
+    assert mensaje == "Error de autenticación"
+
+
+def test_el_gestor_consolida_sin_nuevos_guardados(gestor, tmp_path):
+    gestor.intervalo_compactacion = 0.05
+    ok, mensaje = sharepointUtill.append_a_excel_existente(
+        'https://pruebas', 'usuario', 'clave', CARPETA, 'predicciones.xlsx', _filas(3)
+    )
+    assert ok, mensaje
+    assert gestor.estadisticas()['libros_en_consolidacion'] == 1
+
+    # Ningún guardado más: la consolidación la hace el hilo del gestor.
+    sumidero = SumideroSharePoint(ArchivosLocales(str(tmp_path)), CARPETA)
+    limite = time.monotonic() + 10
+    while sumidero._partes() and time.monotonic() < limite:
+        time.sleep(0.02)
+    assert sumidero._partes() == []
+    pd.testing.assert_frame_equal(sumidero._leer_libro(), _filas(3))
+
+
+def test_el_gestor_olvida_los_libros_sin_sesion_vigente(gestor):
+    gestor.intervalo_compactacion = 0
+    sharepointUtill.append_a_excel_existente(
+        'https://pruebas', 'usuario', 'clave', CARPETA, 'predicciones.xlsx', _filas(1)
+    )
+    gestor.detener_compactacion()
+    gestor.invalidar('https://pruebas', 'usuario', 'clave')
+
+    assert gestor.compactar_destinos() == 0
+    assert gestor.estadisticas()['libros_en_consolidacion'] == 0
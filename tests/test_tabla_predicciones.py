@@ -0,0 +1,74 @@
+# tests/test_tabla_predicciones.py
+
+import numpy as np
+import pytest
+
+from src.predictores import tabla_predicciones
+from src.predictores.tabla_predicciones import EDAD_VENTA_MAX, cargar_tabla, consultar_tabla, construir_tabla
+
+DENTRO = [[1, 0, 14, 0], [8, 1, 35, EDAD_VENTA_MAX], [3, 1, 21, 120], [5, 0, 28, 42.0]]
+FUERA = [
+    [0, 0, 14, 10], [9, 1, 14, 10],  # área
+    [2, 2, 14, 10], [2, -1, 14, 10],  # sexo
+    [2, 0, 15, 10], [2, 0, 0, 10], [2, 0, 42, 10],  # edad HTS que no es de la grilla
+    [2, 0, 14, -1], [2, 0, 14, EDAD_VENTA_MAX + 1], [2, 0, 14, 10.5],  # edad de venta
+    [2.5, 0, 14, 10], [2, 0, 14, np.nan],
+]
+
+
+def _predecir_sintetico(X):
+    # Cada columna es una función distinta de la fila, así un índice mal armado no pasa.
+    X = np.asarray(X, dtype=np.float64)
+    return np.column_stack([X[:, 0] + X[:, 3], X[:, 1] * 100 + X[:, 2], X[:, 2] - X[:, 0], X[:, 3] / 7])
+
+
+@pytest.fixture(scope='module')
+def tabla(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp('tabla') / 'tabla.npy')
+    return cargar_tabla(ruta, predecir=_predecir_sintetico)
+
+
+def test_sin_tabla_ni_predictor_devuelve_none(tmp_path):
+    assert cargar_tabla(str(tmp_path / 'no_existe.npy')) is None
+
+
+def test_grilla_y_tabla_tienen_la_misma_forma(tmp_path):
+    grilla = tabla_predicciones.generar_grilla()
+    assert len(grilla) == np.prod(tabla_predicciones.FORMA_TABLA)
+    tabla = construir_tabla(_predecir_sintetico, str(tmp_path / 'tabla.npy'))
+    assert tabla.shape == tabla_predicciones.FORMA_TABLA + (4,) and tabla.dtype == np.float32
+
+
+def test_filas_dentro_del_dominio_coinciden_con_el_predictor(tabla):
+    en_tabla, valores = consultar_tabla(tabla, np.array(DENTRO))
+    assert en_tabla.all()
+    np.testing.assert_array_equal(valores, _predecir_sintetico(DENTRO).astype(np.float32))
+
+
+def test_filas_fuera_del_dominio_quedan_para_el_modelo(tabla):
+    lote = np.array(FUERA[:6] + DENTRO + FUERA[6:], dtype=np.float64)
+    en_tabla, valores = consultar_tabla(tabla, lote)
+    assert en_tabla.tolist() == [False] * 6 + [True] * len(DENTRO) + [False] * (len(FUERA) - 6)
+    np.testing.assert_array_equal(valores, _predecir_sintetico(DENTRO).astype(np.float32))
+
+
+def test_grilla_completa_al_azar(tabla):
+    grilla = tabla_predicciones.generar_grilla()
+    muestra = grilla[np.random.default_rng(0).choice(len(grilla), 5000, replace=False)]
+    en_tabla, valores = consultar_tabla(tabla, muestra)
+    assert en_tabla.all()
+    np.testing.assert_array_equal(valores, _predecir_sintetico(muestra).astype(np.float32))
+
+
+def test_predict_all_con_tabla_igual_a_los_modelos():
+    pytest.importorskip('xgboost')
+    from src.predictores.predicciones_ML import predict_all
+
+    rng = np.random.default_rng(1)
+    grilla = tabla_predicciones.generar_grilla()
+    lote = np.concatenate([grilla[rng.choice(len(grilla), 500)], np.array(FUERA[:-1], dtype=np.float64)])
+    rng.shuffle(lote)
+    opciones = dict(motor='sklearn', n_workers=1, deduplicar=False, monitorear=False)
+    con_tabla = predict_all(lote, modo_tabla=True, **opciones)
+    sin_tabla = predict_all(lote, modo_tabla=False, **opciones)
+    np.testing.assert_array_equal(con_tabla.to_numpy(), sin_tabla.to_numpy())
@@ -0,0 +1,145 @@
+# tests/test_trabajos_lote.py
+
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from src.utils import trabajos_lote
+from src.utils.trabajos_lote import COMPLETADO, EN_CURSO, ERROR, GestorTrabajos
+
+
+def _csv(filas=300, galpones=150):
+    # Los galpones se repiten entre bloques; la primera aparición tiene Edad HTS 14.
+    lineas = ['Galpon,Sexo,Area,Edad HTS,Edad Granja']
+    lineas += [f"{i % galpones},{'Ma' if i % 2 else 'He'},Calidad,{14 + 7 * (i // galpones)},30" for i in range(filas)]
+    return ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+def _gestor(directorio, lanzar=True):
+    gestor = GestorTrabajos(str(directorio), hilos=1, filas_por_bloque=100)
+    if not lanzar:
+        gestor._lanzar = lambda id_trabajo: None
+    return gestor
+
+
+def _esperar(gestor):
+    gestor._ejecutor.shutdown(wait=True)
+
+
+def _resultado_sin_caida(directorio):
+    gestor = _gestor(directorio)
+    id_trabajo = gestor.enviar(io.BytesIO(_csv()), 'lote.csv')
+    _esperar(gestor)
+    return pd.read_csv(gestor.ruta_resultado(id_trabajo))
+
+
+def _caer_al_anotar(gestor, monkeypatch, bloques):
+    """Simula una caída justo después de escribir la parte `bloques - 1` y antes de anotarla."""
+    guardar = gestor._guardar_estado
+
+    def guardar_o_caer(id_trabajo, estado):
+        if estado['bloques_completados'] == bloques:
+            raise RuntimeError('caída')
+        guardar(id_trabajo, estado)
+    monkeypatch.setattr(gestor, '_guardar_estado', guardar_o_caer)
+
+
+def test_caida_entre_la_parte_y_el_estado_se_reanuda_sin_duplicar(tmp_path, monkeypatch):
+    esperado = _resultado_sin_caida(tmp_path / 'limpio')
+
+    gestor = _gestor(tmp_path / 'caida', lanzar=False)
+    id_trabajo = gestor.enviar(io.BytesIO(_csv()), 'lote.csv')
+    _caer_al_anotar(gestor, monkeypatch, bloques=2)
+    with pytest.raises(RuntimeError):
+        gestor._procesar(id_trabajo)
+
+    estado = gestor.estado(id_trabajo)
+    assert estado['estado'] == EN_CURSO and estado['bloques_completados'] == 1
+    # La parte del segundo bloque quedó escrita pero sin anotar.
+    assert os.path.exists(gestor._ruta_parte(id_trabajo, 1))
+
+    reanudado = _gestor(tmp_path / 'caida')
+    assert reanudado.reanudar_pendientes() == [id_trabajo]
+    _esperar(reanudado)
+    estado = reanudado.estado(id_trabajo)
+    assert estado['estado'] == COMPLETADO
+    assert estado['reanudaciones'] == 1
+    assert estado['filas_leidas'] == 300 and estado['filas_escritas'] == 150
+
+    resultado = pd.read_csv(reanudado.ruta_resultado(id_trabajo))
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_reanudar_no_repite_galpones_de_partes_anteriores(tmp_path, monkeypatch):
+    # Caída después del primer bloque: los galpones del segundo y tercero
+    # repiten los del primero y tienen que descartarse al reanudar.
+    gestor = _gestor(tmp_path, lanzar=False)
+    id_trabajo = gestor.enviar(io.BytesIO(_csv()), 'lote.csv')
+    _caer_al_anotar(gestor, monkeypatch, bloques=2)
+    with pytest.raises(RuntimeError):
+        gestor._procesar(id_trabajo)
+
+    reanudado = _gestor(tmp_path)
+    reanudado.reanudar_pendientes()
+    _esperar(reanudado)
+
+    resultado = pd.read_csv(reanudado.ruta_resultado(id_trabajo))
+    assert len(resultado) == 150
+    assert resultado['Galpon'].is_unique
+    assert sorted(resultado['Galpon']) == list(range(150))
+    assert (resultado['Edad HTS'] == 14).all()
+
+
+def test_ttl_borra_solo_los_trabajos_terminados_vencidos(tmp_path, monkeypatch):
+    monkeypatch.setattr(trabajos_lote, 'TTL_HORAS', 1)
+    gestor = _gestor(tmp_path, lanzar=False)
+    ids = {}
+    for nombre, estado_final in [('viejo_ok', COMPLETADO), ('viejo_error', ERROR),
+                                 ('reciente', COMPLETADO), ('viejo_en_curso', EN_CURSO)]:
+        ids[nombre] = gestor.enviar(io.BytesIO(_csv() + nombre.encode()), 'lote.csv')
+        ruta = gestor._ruta(ids[nombre], 'estado.json')
+        with open(ruta, encoding='utf-8') as f:
+            estado = json.load(f)
+        estado['estado'] = estado_final
+        if nombre != 'reciente':
+            estado['actualizado'] = time.time() - 2 * 3600
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+
+    assert gestor.reanudar_pendientes() == [ids['viejo_en_curso']]
+    assert gestor.estado(ids['viejo_ok']) is None
+    assert gestor.estado(ids['viejo_error']) is None
+    assert not os.path.exists(gestor._ruta(ids['viejo_ok']))
+    assert gestor.estado(ids['reciente'])['estado'] == COMPLETADO
+    # Los trabajos sin terminar se reanudan aunque sean viejos.
+    assert gestor.estado(ids['viejo_en_curso']) is not None
+
+
+def test_resultado_en_el_formato_pedido(tmp_path):
+    pytest.importorskip('pyarrow')
+    gestor = _gestor(tmp_path)
+    id_trabajo = gestor.enviar(io.BytesIO(_csv()), 'lote.csv', formato='parquet')
+    _esperar(gestor)
+
+    ruta_parquet = gestor.ruta_resultado(id_trabajo)
+    assert ruta_parquet.endswith('resultado.parquet')
+    parquet = pd.read_parquet(ruta_parquet)
+    # Otro formato se arma a demanda a partir de las partes.
+    ruta_csv = gestor.ruta_resultado(id_trabajo, 'csv')
+    assert ruta_csv.endswith('resultado.csv')
+    csv = pd.read_csv(ruta_csv)
+    arrow = pd.read_feather(gestor.ruta_resultado(id_trabajo, 'arrow'))
+
+    assert len(parquet) == len(csv) == len(arrow) == 150
+    assert str(parquet['preICA'].dtype) == 'float32'
+    pd.testing.assert_series_equal(parquet['preICA'], csv['preICA'].astype('float32'))
+    assert arrow['Galpon'].astype(str).tolist() == parquet['Galpon'].astype(str).tolist()
+
+
+def test_formato_desconocido(tmp_path):
+    with pytest.raises(ValueError):
+        _gestor(tmp_path).enviar(io.BytesIO(_csv()), 'lote.csv', formato='xlsx')